@@ -0,0 +1,91 @@
+"""
+Benchmark the embedding backends.
+
+Each backend runs in a fresh process, so its peak RSS is not shared with the
+other. Reports load time, single-query latency (as used by /search), batch
+throughput on synthetic abstracts (as used by the worker) and peak RSS.
+
+Usage:
+    python scripts/bench_embedder.py [--backends torch onnx] [--texts 512] [--queries 200]
+"""
+
+import argparse
+import multiprocessing
+import random
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+
+from src.embedder import MODEL_NAME
+from src.embedder.backends import load_backend
+
+WORDS = (
+    "graph neural network retrieval augmented generation citation transformer attention "
+    "embedding benchmark language model knowledge dataset training inference scientific "
+    "literature we propose method results show state of the art approach evaluate"
+).split()
+
+
+def make_texts(count: int, seed: int = 0) -> list[str]:
+    """Generate abstract-like texts of 50 to 250 words."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(50, 250))) for _ in range(count)]
+
+
+def run(
+    backend: str, model_name: str, texts: int, queries: int, batch_size: int
+) -> dict[str, float]:
+    start = perf_counter()
+    model = load_backend(backend, model_name)
+    load_seconds = perf_counter() - start
+
+    model.encode(make_texts(8, seed=1), batch_size=8)  # warm up
+
+    latencies = []
+    for query in make_texts(queries, seed=2):
+        query = " ".join(query.split()[:8])
+        start = perf_counter()
+        model.encode([query])
+        latencies.append(perf_counter() - start)
+
+    corpus = make_texts(texts)
+    start = perf_counter()
+    model.encode(corpus, batch_size=batch_size)
+    batch_seconds = perf_counter() - start
+
+    return {
+        "load_s": load_seconds,
+        "query_p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "query_p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        "texts_per_s": texts / batch_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--model", default=MODEL_NAME, help="model name or local path")
+    parser.add_argument("--texts", type=int, default=512, help="abstracts in the throughput run")
+    parser.add_argument("--queries", type=int, default=200, help="queries in the latency run")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, float]] = {}
+    for backend in args.backends:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[backend] = pool.submit(
+                run, backend, args.model, args.texts, args.queries, args.batch_size
+            ).result()
+
+    columns = list(next(iter(results.values())))
+    print(f"{'backend':>8} " + " ".join(f"{c:>13}" for c in columns))
+    for backend, row in results.items():
+        print(f"{backend:>8} " + " ".join(f"{row[c]:13.1f}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark the embedded local vector store.
+
+Fills a temporary store with clustered random vectors (topics, like paper
+embeddings), then reports the time to open it, exact search latency, and, with
+--hnsw, HNSW build time, latency and recall@k against the exact scan. Queries
+are noisy copies of stored vectors.
+
+Usage:
+    python scripts/bench_local_vector.py [--vectors 1000000] [--queries 50] [--hnsw]
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from src.models import Paper
+from src.store.local_vector import LocalVectorStore
+from src.store.vector import VECTOR_DIM
+
+CHUNK = 50_000  # papers per index call while filling the store
+TOPICS = 1_000
+
+
+def make_vectors(rng: np.random.Generator, centers: np.ndarray, count: int) -> np.ndarray:
+    topics = centers[rng.integers(0, len(centers), count)]
+    noise = rng.standard_normal((count, centers.shape[1]), dtype=np.float32)
+    vectors: np.ndarray = topics + 0.3 * noise
+    return vectors
+
+
+def percentiles(seconds: list[float]) -> str:
+    p50, p95 = np.percentile(seconds, [50, 95]) * 1000
+    return f"p50 {p50:7.1f} ms, p95 {p95:7.1f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--hnsw", action="store_true", help="also build and query an HNSW graph")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((TOPICS, VECTOR_DIM), dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(directory=Path(tmp))
+        start = perf_counter()
+        for lo in range(0, args.vectors, CHUNK):
+            hi = min(lo + CHUNK, args.vectors)
+            papers = [
+                Paper(id=f"p{i}", url="", title=f"Title {i}", abstract="", authors=[])
+                for i in range(lo, hi)
+            ]
+            store.index(papers, make_vectors(rng, centers, hi - lo))
+        print(f"fill:  {args.vectors:,} x {VECTOR_DIM} in {perf_counter() - start:.1f}s")
+
+        start = perf_counter()
+        store = LocalVectorStore(directory=Path(tmp))
+        print(f"open:  {(perf_counter() - start) * 1000:.1f} ms")
+
+        queries = make_vectors(rng, centers, args.queries)
+        store.search(queries[0], top_k=args.top_k)  # page the vectors in
+        exact: list[set[str]] = []
+        timings: list[float] = []
+        for query in queries:
+            start = perf_counter()
+            exact.append({r.id for r in store.search(query, top_k=args.top_k)})
+            timings.append(perf_counter() - start)
+        print(f"exact: {percentiles(timings)}")
+
+        if args.hnsw:
+            store.hnsw = True
+            start = perf_counter()
+            store.update_hnsw()
+            print(f"hnsw build: {perf_counter() - start:.1f}s")
+
+            timings, recall = [], []
+            for query, truth in zip(queries, exact):
+                start = perf_counter()
+                found = {r.id for r in store.search(query, top_k=args.top_k)}
+                timings.append(perf_counter() - start)
+                recall.append(len(found & truth) / len(truth))
+            print(f"hnsw:  {percentiles(timings)}, recall@{args.top_k} {np.mean(recall):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark Qdrant client reuse and transports against a running Qdrant.
+
+Compares search and upsert latency when building a new client (and store) per
+call, as `get_vector_store()` used to, against the shared client over REST and
+over gRPC. Writes to a scratch collection, which is dropped afterwards.
+
+Usage:
+    docker run -p 6333:6333 -p 6334:6334 qdrant/qdrant
+    python scripts/bench_qdrant.py [--host localhost] [--calls 200] [--batch 8]
+        [--transports rest grpc]
+"""
+
+import argparse
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from src.config import QDRANT_GRPC_PORT, QDRANT_TIMEOUT
+from src.store.vector import VECTOR_DIM, point_id
+
+COLLECTION = "bench_qdrant"
+
+
+def percentiles(seconds: list[float]) -> str:
+    p50, p95 = np.percentile(seconds, [50, 95]) * 1000
+    return f"p50 {p50:7.2f} ms, p95 {p95:7.2f} ms"
+
+
+def timed(calls: int, fn: Callable[[int], None]) -> list[float]:
+    fn(0)  # warm up
+    timings = []
+    for i in range(calls):
+        start = perf_counter()
+        fn(i)
+        timings.append(perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=8, help="points per upsert")
+    parser.add_argument("--transports", nargs="+", default=["rest", "grpc"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.calls + 1, args.batch, VECTOR_DIM), dtype=np.float32)
+
+    def connect(prefer_grpc: bool) -> QdrantClient:
+        return QdrantClient(
+            host=args.host,
+            port=args.port,
+            grpc_port=QDRANT_GRPC_PORT,
+            prefer_grpc=prefer_grpc,
+            timeout=QDRANT_TIMEOUT,
+        )
+
+    admin = connect(False)
+    if admin.collection_exists(COLLECTION):
+        admin.delete_collection(COLLECTION)
+    admin.create_collection(COLLECTION, VectorParams(size=VECTOR_DIM, distance=Distance.COSINE))
+
+    def upsert(client: QdrantClient, i: int) -> None:
+        points = [
+            PointStruct(id=point_id(f"{i}-{j}"), vector=v.tolist(), payload={"paper_id": f"{i}"})
+            for j, v in enumerate(vectors[i])
+        ]
+        client.upsert(COLLECTION, points)
+
+    def search(client: QdrantClient, i: int) -> None:
+        client.query_points(COLLECTION, query=vectors[i][0].tolist(), limit=5)
+
+    def per_call(op: Callable[[QdrantClient, int], None]) -> Callable[[int], None]:
+        # What every get_vector_store() call used to do: new client, health check, ensure
+        def run(i: int) -> None:
+            client = connect(False)
+            client.get_collections()
+            client.collection_exists(COLLECTION)
+            op(client, i)
+            client.close()
+
+        return run
+
+    try:
+        pooled = {transport: connect(transport == "grpc") for transport in args.transports}
+        for name, op in (("upsert", upsert), ("search", search)):
+            print(f"{name} ({args.batch} points)" if name == "upsert" else name)
+            print(f"  new client per call: {percentiles(timed(args.calls, per_call(op)))}")
+            for transport, client in pooled.items():
+                latencies = timed(args.calls, lambda i, op=op, client=client: op(client, i))
+                print(f"  shared {transport:>4} client: {percentiles(latencies)}")
+    finally:
+        admin.delete_collection(COLLECTION)
+
+
+if __name__ == "__main__":
+    main()
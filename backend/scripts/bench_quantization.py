@@ -0,0 +1,135 @@
+"""
+Measure the recall@k trade-off of Qdrant vector quantization.
+
+Against a running Qdrant, creates one scratch collection per quantization mode
+(none, scalar, binary) through QdrantVectorStore's collection settings, fills it
+with clustered random vectors and compares search results with the exact top k
+computed in numpy, with and without rescoring.
+
+With --simulate, no Qdrant is needed: the same quantization schemes are applied
+in numpy and searched exhaustively, which isolates the quantization error from
+the HNSW error.
+
+Usage:
+    python scripts/bench_quantization.py [--vectors 100000] [--queries 200] [--simulate]
+"""
+
+import argparse
+from time import sleep
+
+import numpy as np
+from numpy.typing import NDArray
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    CollectionStatus,
+    Distance,
+    HnswConfigDiff,
+    PointStruct,
+    VectorParams,
+)
+
+from src.config import QDRANT_HNSW_EF_CONSTRUCT, QDRANT_HNSW_M, QDRANT_OVERSAMPLING
+from src.store.vector import VECTOR_DIM, quantization_config, search_params
+
+MODES = ("none", "scalar", "binary")
+BYTES_PER_VECTOR = {"none": VECTOR_DIM * 4, "scalar": VECTOR_DIM, "binary": VECTOR_DIM // 8}
+TOPICS = 1_000
+UPSERT_BATCH = 1_000
+
+
+def make_vectors(rng: np.random.Generator, centers: NDArray[np.float32], count: int):
+    vectors = centers[rng.integers(0, len(centers), count)]
+    vectors = vectors + 0.3 * rng.standard_normal((count, centers.shape[1]), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall(found: list[list[int]], truth: NDArray[np.intp]) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def simulate(
+    mode: str, data: NDArray[np.float32], queries: NDArray[np.float32], k: int, rescore: bool
+) -> list[list[int]]:
+    """Exhaustive search over quantized vectors, optionally rescoring with the originals."""
+    if mode == "scalar":
+        lo, hi = np.quantile(data, [0.005, 0.995])
+        codes = np.round((np.clip(data, lo, hi) - lo) / (hi - lo) * 255)
+        approx = (codes * (hi - lo) / 255 + lo).astype(np.float32) @ queries.T
+    elif mode == "binary":
+        approx = np.where(data > 0, 1.0, -1.0).astype(np.float32) @ np.where(queries > 0, 1, -1).T
+    else:
+        approx = data @ queries.T
+    limit = int(k * QDRANT_OVERSAMPLING) if rescore and mode != "none" else k
+    found = []
+    for q in range(len(queries)):
+        candidates = np.argpartition(-approx[:, q], limit)[:limit]
+        scores = data[candidates] @ queries[q] if rescore else approx[candidates, q]
+        found.append(list(candidates[np.argsort(-scores)][:k]))
+    return found
+
+
+def fill(client: QdrantClient, name: str, mode: str, data: NDArray[np.float32]) -> None:
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=VECTOR_DIM, distance=Distance.COSINE, on_disk=True),
+        hnsw_config=HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT),
+        quantization_config=quantization_config(mode),
+    )
+    for lo in range(0, len(data), UPSERT_BATCH):
+        points = [
+            PointStruct(id=i, vector=data[i].tolist())
+            for i in range(lo, min(lo + UPSERT_BATCH, len(data)))
+        ]
+        client.upsert(name, points, wait=False)
+    while client.get_collection(name).status != CollectionStatus.GREEN:
+        sleep(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--hnsw-ef", type=int, default=128)
+    parser.add_argument("--simulate", action="store_true", help="quantize in numpy, no Qdrant")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((TOPICS, VECTOR_DIM), dtype=np.float32)
+    data = make_vectors(rng, centers, args.vectors)
+    queries = make_vectors(rng, centers, args.queries)
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, : args.top_k]
+
+    client = None if args.simulate else QdrantClient(host=args.host, port=args.port)
+    print(f"{'mode':>6} {'bytes/vec':>9} {'recall@k':>9} {'rescored':>9}")
+    for mode in MODES:
+        row = []
+        for rescore in (False, True):
+            if client is None:
+                found = simulate(mode, data, queries, args.top_k, rescore)
+            else:
+                name = f"bench_quantization_{mode}"
+                if not rescore:
+                    fill(client, name, mode, data)
+                params = search_params(args.hnsw_ef, rescore, mode)
+                found = [
+                    [
+                        int(p.id)
+                        for p in client.query_points(
+                            name, q.tolist(), limit=args.top_k, search_params=params
+                        ).points
+                    ]
+                    for q in queries
+                ]
+            row.append(recall(found, truth))
+        print(f"{mode:>6} {BYTES_PER_VECTOR[mode]:>9} {row[0]:>9.3f} {row[1]:>9.3f}")
+        if client is not None:
+            client.delete_collection(f"bench_quantization_{mode}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark the PaperIndex lookups behind /api/status.
+
+Polls 1,000 paper IDs against a temporary SQLite index, once with a `get` per ID
+(the old /status behaviour) and once with a single `get_many`.
+
+Usage:
+    python scripts/bench_status.py [--papers 20000] [--ids 1000] [--rounds 5]
+"""
+
+import argparse
+import random
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from src.models import PaperState, PaperStatus
+from src.store.index import PaperIndex
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=20_000, help="papers in the index")
+    parser.add_argument("--ids", type=int, default=1_000, help="ids polled per request")
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds per method")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = PaperIndex(db_path=Path(tmp) / "bench.db")
+        paper_ids = [f"2401.{i:05d}v1" for i in range(args.papers)]
+        index.set_many([PaperState(id=pid, status=PaperStatus.EMBEDDED) for pid in paper_ids])
+
+        # Poll a mix of known and unknown IDs, like the frontend does for nodes in view
+        polled = random.sample(paper_ids, args.ids - args.ids // 10)
+        polled += [f"missing-{i}" for i in range(args.ids // 10)]
+
+        timings: dict[str, float] = {}
+        for name, poll in (
+            ("get (per id)", lambda: [index.get(pid) for pid in polled]),
+            ("get_many", lambda: index.get_many(polled)),
+        ):
+            poll()  # warm up
+            start = perf_counter()
+            for _ in range(args.rounds):
+                poll()
+            timings[name] = (perf_counter() - start) / args.rounds
+
+        for name, seconds in timings.items():
+            print(f"{name:>14}: {seconds * 1000:8.1f} ms per {args.ids} ids")
+        print(f"{'speedup':>14}: {timings['get (per id)'] / timings['get_many']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,28 @@
-import random
-
 from fastapi import APIRouter, HTTPException, Query
 from loguru import logger
 
-from src.factories import SearchResponseFactory
+from src.arxiv import get_response_cache
+from src.embedder import get_embedding_cache, get_engine, get_query_cache
 from src.models import (
     IngestEvent,
     PaperState,
     SearchResponse,
 )
 from src.pipeline import run_pipeline
-from src.store import get_paper_index, health_check
+from src.store import core, get_paper_index, health_check
 
 router = APIRouter()
 
+MAX_SEARCH_HOPS = 3  # graph hops a search may expand; each hop multiplies the papers reached
+
 
 @router.get("/pipeline", response_model=list[IngestEvent])
-def pipeline(query: str) -> list[IngestEvent]:
+def pipeline(query: str, since: bool = False) -> list[IngestEvent]:
     """
     Run the pipeline with the given query and return a list of IngestEvent objects.
+    If `since` is set, only papers newer than the last run for this query are fetched.
     """
-    return list(run_pipeline(query))
+    return list(run_pipeline(query, since=since))
 
 
 @router.get("/health")
@@ -31,16 +33,29 @@ def health():
     return ok
 
 
+@router.get("/stats")
+def stats() -> dict[str, dict[str, int | float]]:
+    """
+    Return cache and embedding throughput counters, for sizing and tuning.
+    """
+    return {
+        "arxiv_cache": get_response_cache().stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "embedding_engine": get_engine().stats(),
+        "query_cache": get_query_cache().stats(),
+    }
+
+
 @router.get("/status")
 def status(paper_id: list[str] = Query(...)) -> list[dict[str, str | bool]]:
     """
     Return the status of one or more papers from the PaperIndex.
     """
-    index = get_paper_index()
+    states = get_paper_index().get_many(paper_id)
     results: list[dict[str, str | bool]] = []
 
     for pid in paper_id:
-        state: PaperState | None = index.get(pid)
+        state: PaperState | None = states.get(pid)
         if not state:
             results.append({"id": pid, "status": "NOT_FOUND", "in_graph": False})
         else:
@@ -56,10 +71,15 @@ def status(paper_id: list[str] = Query(...)) -> list[dict[str, str | bool]]:
 
 
 @router.get("/search", response_model=SearchResponse)
-def search(query: str = Query(..., min_length=1)):
-    # TODO: Replace this mock logic with real vector search + graph logic
+def search(
+    query: str = Query(..., min_length=1), hops: int = Query(1, ge=0, le=MAX_SEARCH_HOPS)
+) -> SearchResponse:
+    """
+    Search papers by vector similarity, expanded `hops` edges in the paper graph,
+    and return them with the edges between them.
+    """
     logger.debug(f"Received search query: {query}")
-    num_results = random.randint(1, 10)
-    num_nodes = random.randint(5, 15)
-    logger.debug(f"Returning {num_results} results and {num_nodes} graph nodes")
-    return SearchResponseFactory(num_results=num_results, num_nodes=num_nodes)
+    results = core.search(query, expand_hops=hops)
+    graph = core.result_graph(results)
+    logger.debug(f"Returning {len(results)} results and {len(graph.edges)} graph edges")
+    return SearchResponse(results=graph.nodes, graph=graph)
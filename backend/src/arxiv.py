@@ -1,12 +1,240 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
 import xml.etree.ElementTree as ET
-from typing import Any
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from time import monotonic, sleep, time
+from typing import Any, Iterator
 
 import requests
 from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from src.config import ARXIV_CACHE_DIR, ARXIV_CACHE_MAX_BYTES, ARXIV_CACHE_TTL
 from src.models import Paper
 
-NAMESPACE = {"atom": "http://www.w3.org/2005/Atom"}
+NAMESPACE = {"atom": "http://www.w3.org/2005/Atom", "arxiv": "http://arxiv.org/schemas/atom"}
+ENTRY_TAG = f"{{{NAMESPACE['atom']}}}entry"
+
+ARXIV_API_URL = os.getenv("ARXIV_API_URL", "http://export.arxiv.org/api/query")
+PAGE_SIZE = 100  # results per request; arXiv allows up to 2000 but recommends small pages
+POLITE_DELAY = 3.0  # seconds between consecutive requests, per arXiv API guidelines
+REQUEST_TIMEOUT = 30  # seconds
+
+_session: requests.Session | None = None
+_cache: "ResponseCache | None" = None
+
+
+def get_session() -> requests.Session:
+    """
+    Return a process-wide HTTP session with connection pooling and retries.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=3,
+            backoff_factor=POLITE_DELAY,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
+        _session = requests.Session()
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw Atom responses, keyed by request URL and parameters.
+
+    Entries younger than `ttl` are served without touching the network. Stale
+    entries are revalidated with If-None-Match / If-Modified-Since when the server
+    sent an ETag or Last-Modified header. The cache is capped at `max_bytes` and
+    evicts least recently used entries first.
+    """
+
+    def __init__(
+        self,
+        directory: Path = ARXIV_CACHE_DIR,
+        ttl: float = ARXIV_CACHE_TTL,
+        max_bytes: int = ARXIV_CACHE_MAX_BYTES,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+        # key -> body size, least recently used first
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        bodies = sorted(self.directory.glob("*.xml"), key=lambda p: p.stat().st_mtime)
+        for body in bodies:
+            self._entries[body.stem] = body.stat().st_size
+        self._size = sum(self._entries.values())
+
+    @staticmethod
+    def key(url: str, params: dict[str, Any]) -> str:
+        """Return the cache key for a request."""
+        raw = json.dumps([url, sorted(params.items())], default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _body(self, key: str) -> Path:
+        return self.directory / f"{key}.xml"
+
+    def _meta(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _read_meta(self, key: str) -> dict[str, Any] | None:
+        try:
+            meta: dict[str, Any] = json.loads(self._meta(key).read_text())
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    def _touch(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        os.utime(self._body(key))
+
+    def lookup(self, url: str, params: dict[str, Any]) -> Path | None:
+        """
+        Return the cached body for a request if it is still fresh.
+
+        Args:
+            url (str): The request URL.
+            params (dict[str, Any]): The query parameters.
+
+        Returns:
+            Path | None: Path to the cached Atom body, or None if missing or stale.
+        """
+        key = self.key(url, params)
+        meta = self._read_meta(key)
+        if meta is None or not self._body(key).exists():
+            return None
+        if time() - meta["fetched_at"] >= self.ttl:
+            return None
+        self._touch(key)
+        self.hits += 1
+        return self._body(key)
+
+    def fetch(
+        self,
+        session: requests.Session,
+        url: str,
+        params: dict[str, Any],
+        timeout: float = REQUEST_TIMEOUT,
+    ) -> Path:
+        """
+        Fetch a request through the cache, revalidating stale entries.
+
+        Args:
+            session (requests.Session): HTTP session used on a miss.
+            url (str): The request URL.
+            params (dict[str, Any]): The query parameters.
+            timeout (float): Request timeout in seconds.
+
+        Returns:
+            Path: Path to the cached Atom body.
+        """
+        if (fresh := self.lookup(url, params)) is not None:
+            return fresh
+
+        key = self.key(url, params)
+        meta = self._read_meta(key) if self._body(key).exists() else None
+        headers: dict[str, str] = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        with session.get(url, params=params, headers=headers, timeout=timeout, stream=True) as r:
+            if r.status_code == 304 and meta is not None:
+                logger.debug(f"arXiv cache revalidated {key[:12]}")
+                self.revalidations += 1
+                meta["fetched_at"] = time()
+                self._meta(key).write_text(json.dumps(meta))
+                self._touch(key)
+                return self._body(key)
+
+            r.raise_for_status()
+            self.misses += 1
+            r.raw.decode_content = True
+            # Write to a temporary file first so readers never see a partial body
+            with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as f:
+                try:
+                    for chunk in iter(lambda: r.raw.read(64 * 1024), b""):
+                        f.write(chunk)
+                except Exception:
+                    Path(f.name).unlink(missing_ok=True)
+                    raise
+            os.replace(f.name, self._body(key))
+            self._meta(key).write_text(
+                json.dumps(
+                    {
+                        "etag": r.headers.get("ETag"),
+                        "last_modified": r.headers.get("Last-Modified"),
+                        "fetched_at": time(),
+                    }
+                )
+            )
+
+        self._add(key, self._body(key).stat().st_size)
+        return self._body(key)
+
+    def _add(self, key: str, size: int) -> None:
+        """Record a new entry and evict least recently used ones past the size cap."""
+        with self._lock:
+            self._size += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                self._body(old).unlink(missing_ok=True)
+                self._meta(old).unlink(missing_ok=True)
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int | float]:
+        """Return hit/miss counters and the current size of the cache."""
+        lookups = self.hits + self.revalidations + self.misses
+        return {
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hit_rate": (self.hits + self.revalidations) / lookups if lookups else 0.0,
+        }
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Return the process-wide arXiv response cache.
+
+    Returns:
+        ResponseCache: The shared cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
 
 
 def get_text(node: ET.Element | None, required: bool = False) -> str:
@@ -31,36 +259,249 @@ def get_text(node: ET.Element | None, required: bool = False) -> str:
     return node.text.strip()
 
 
-def fetch_papers(query: str, max_results: int = 5) -> list[Paper]:
-    api_url = "http://export.arxiv.org/api/query"
-    params: dict[str, Any] = {
-        "search_query": f"all:{query}",
-        "start": 0,
-        "max_results": max_results,
-    }
+def parse_datetime(node: ET.Element | None) -> datetime | None:
+    """
+    Parse an Atom timestamp (e.g. 2024-01-02T17:59:59Z) into a UTC datetime.
+
+    Args:
+        node (ET.Element | None): The XML node holding the timestamp.
+
+    Returns:
+        datetime | None: The parsed timestamp, or None if the node is missing.
+    """
+    text = get_text(node)
+    if not text:
+        return None
+    return datetime.fromisoformat(text).astimezone(timezone.utc)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a search query so equivalent queries share a cursor or cache entry.
+
+    Args:
+        query (str): The raw search query.
+
+    Returns:
+        str: The lower-cased query with collapsed whitespace.
+    """
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def parse_entry(entry: ET.Element) -> Paper:
+    """
+    Build a Paper from a single Atom <entry> element.
+
+    Args:
+        entry (ET.Element): The <entry> element.
+
+    Returns:
+        Paper: The parsed paper.
+    """
+    url: str = get_text(entry.find("atom:id", NAMESPACE), required=True)
+    paper_id: str = url.partition("/abs/")[-1]
+    title: str = get_text(entry.find("atom:title", NAMESPACE), required=True)
+    abstract: str = get_text(entry.find("atom:summary", NAMESPACE), required=True)
+    authors: list[str] = [
+        get_text(author.find("atom:name", NAMESPACE), required=True)
+        for author in entry.findall("atom:author", NAMESPACE)
+    ]
+    published = parse_datetime(entry.find("atom:published", NAMESPACE))
+    updated = parse_datetime(entry.find("atom:updated", NAMESPACE))
+    category = entry.find("arxiv:primary_category", NAMESPACE)
+    if category is None:
+        category = entry.find("atom:category", NAMESPACE)
+
+    logger.debug(f"Paper ID: {url}")
+    return Paper(
+        id=paper_id,
+        url=url,
+        title=title,
+        abstract=abstract,
+        authors=authors,
+        published=published,
+        updated=updated,
+        primary_category=category.get("term") if category is not None else None,
+    )
+
+
+def iter_entries(stream: Any) -> Iterator[Paper]:
+    """
+    Incrementally parse an Atom feed, yielding one Paper per <entry>.
+
+    Each entry is discarded as soon as it has been parsed, so memory use stays
+    flat regardless of the size of the feed.
+
+    Args:
+        stream: A binary file-like object containing the Atom XML.
+
+    Yields:
+        Paper: Papers in feed order.
+    """
+    root: ET.Element | None = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if root is None:
+            root = elem
+        if event == "end" and elem.tag == ENTRY_TAG:
+            yield parse_entry(elem)
+            # Drop the parsed entry from the tree
+            root.clear()
+
+
+def iter_page(
+    session: requests.Session,
+    api_url: str,
+    params: dict[str, Any],
+    cache: ResponseCache | None = None,
+    cached: Path | None = None,
+) -> Iterator[Paper]:
+    """
+    Stream the papers of a single result page, from the cache if possible.
+
+    Args:
+        session (requests.Session): HTTP session to use.
+        api_url (str): The arXiv query endpoint.
+        params (dict[str, Any]): The query parameters for this page.
+        cache (ResponseCache | None): Cache to read from and write to.
+        cached (Path | None): A body already known to be fresh in the cache.
+
+    Yields:
+        Paper: Papers on the page.
+    """
+    if cache is not None:
+        path = cached or cache.fetch(session, api_url, params)
+        with path.open("rb") as f:
+            yield from iter_entries(f)
+        return
 
     # Get data from arXiv API
-    response = requests.get(api_url, params=params, timeout=10)
-    response.raise_for_status()
-    logger.debug(f"Response status code: {response.status_code}")
+    with session.get(api_url, params=params, timeout=REQUEST_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        logger.debug(f"Response status code: {response.status_code} (start={params['start']})")
+        response.raw.decode_content = True
+        yield from iter_entries(response.raw)
 
-    # Parse the XML response
-    root = ET.fromstring(response.content)
-    papers: list[Paper] = []
 
-    # Construct Paper objects per XML entry
-    for entry in root.findall("atom:entry", NAMESPACE):
-        # Extract paper details
-        url: str = get_text(entry.find("atom:id", NAMESPACE), required=True)
-        paper_id: str = url.partition("/abs/")[-1]
-        title: str = get_text(entry.find("atom:title", NAMESPACE), required=True)
-        abstract: str = get_text(entry.find("atom:summary", NAMESPACE), required=True)
-        authors: list[str] = [
-            get_text(author.find("atom:name", NAMESPACE), required=True)
-            for author in entry.findall("atom:author", NAMESPACE)
-        ]
-
-        logger.debug(f"Paper ID: {url}")
-        papers.append(Paper(id=paper_id, url=url, title=title, abstract=abstract, authors=authors))
+def iter_papers(
+    query: str,
+    max_results: int | None = None,
+    page_size: int = PAGE_SIZE,
+    delay: float = POLITE_DELAY,
+    api_url: str = ARXIV_API_URL,
+    session: requests.Session | None = None,
+    since: datetime | None = None,
+    cache: ResponseCache | None = None,
+) -> Iterator[Paper]:
+    """
+    Lazily harvest papers for a query, paging through the arXiv API.
+
+    Pages are requested with increasing `start` offsets and streamed through an
+    incremental parser, so papers are yielded as soon as they arrive. Consecutive
+    requests are spaced by at least `delay` seconds.
 
+    If `since` is given, only papers updated after it are requested, oldest first,
+    so a capped harvest can be resumed from the last paper it yielded.
+
+    Args:
+        query (str): The search query.
+        max_results (int | None): Stop after this many papers. None harvests everything.
+        page_size (int): Number of results requested per page.
+        delay (float): Minimum number of seconds between two requests.
+        api_url (str): The arXiv query endpoint.
+        session (requests.Session | None): HTTP session to use. Defaults to the shared one.
+        since (datetime | None): Only yield papers updated strictly after this time.
+        cache (ResponseCache | None): Serve and store pages through this cache, if given.
+
+    Yields:
+        Paper: Papers in the order returned by arXiv.
+    """
+    session = session or get_session()
+    search_query = f"all:{query}"
+    sort: dict[str, str] = {}
+    if since is not None:
+        # arXiv date ranges have minute granularity and are expressed in UTC
+        lower = since.astimezone(timezone.utc).strftime("%Y%m%d%H%M")
+        search_query = f"({search_query}) AND lastUpdatedDate:[{lower} TO 999912312359]"
+        sort = {"sortBy": "lastUpdatedDate", "sortOrder": "ascending"}
+
+    start = 0
+    last_request: float | None = None
+
+    while max_results is None or start < max_results:
+        size = page_size if max_results is None else min(page_size, max_results - start)
+        params: dict[str, Any] = {
+            "search_query": search_query,
+            "start": start,
+            "max_results": size,
+            **sort,
+        }
+
+        cached = cache.lookup(api_url, params) if cache is not None else None
+        if cached is None:
+            if last_request is not None:
+                sleep(max(0.0, delay - (monotonic() - last_request)))
+            last_request = monotonic()
+
+        count = 0
+        for paper in iter_page(session, api_url, params, cache, cached):
+            count += 1
+            # The range filter is inclusive and coarser than the cursor
+            if since is not None and paper.updated is not None and paper.updated <= since:
+                continue
+            yield paper
+
+        start += count
+        # A short page means the result set is exhausted
+        if count < size:
+            break
+
+
+def fetch_papers(query: str, max_results: int = 5) -> list[Paper]:
+    """
+    Fetch up to `max_results` papers for a query from the arXiv API, through the cache.
+
+    Args:
+        query (str): The search query.
+        max_results (int): Maximum number of papers to return.
+
+    Returns:
+        list[Paper]: The fetched papers.
+    """
+    return list(iter_papers(query, max_results=max_results, cache=get_response_cache()))
+
+
+def fetch_papers_by_id(
+    paper_ids: list[str],
+    page_size: int = PAGE_SIZE,
+    delay: float = POLITE_DELAY,
+    api_url: str = ARXIV_API_URL,
+    session: requests.Session | None = None,
+    cache: ResponseCache | None = None,
+) -> list[Paper]:
+    """
+    Fetch papers by arXiv ID, `page_size` IDs per request.
+
+    Args:
+        paper_ids (list[str]): arXiv IDs, with or without version suffix.
+        page_size (int): Number of IDs requested per page.
+        delay (float): Minimum number of seconds between two requests.
+        api_url (str): The arXiv query endpoint.
+        session (requests.Session | None): HTTP session to use. Defaults to the shared one.
+        cache (ResponseCache | None): Serve and store pages through this cache, if given.
+
+    Returns:
+        list[Paper]: The papers arXiv returned, in feed order. Unknown IDs are missing.
+    """
+    session = session or get_session()
+    papers: list[Paper] = []
+    last_request: float | None = None
+    for start in range(0, len(paper_ids), page_size):
+        chunk = paper_ids[start : start + page_size]
+        params: dict[str, Any] = {"id_list": ",".join(chunk), "start": 0, "max_results": len(chunk)}
+        cached = cache.lookup(api_url, params) if cache is not None else None
+        if cached is None:
+            if last_request is not None:
+                sleep(max(0.0, delay - (monotonic() - last_request)))
+            last_request = monotonic()
+        papers.extend(iter_page(session, api_url, params, cache, cached))
     return papers
@@ -9,3 +9,49 @@ PAPER_INDEX_PATH = Path(
 if not PAPER_INDEX_PATH.exists():
     logger.warning(f"Paper index path {PAPER_INDEX_PATH} does not exist. Creating a new one.")
     PAPER_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+ARXIV_CACHE_DIR = Path(os.getenv("ARXIV_CACHE_DIR", PAPER_INDEX_PATH.parent / "arxiv")).expanduser()
+ARXIV_CACHE_TTL = float(os.getenv("ARXIV_CACHE_TTL", "21600"))  # seconds
+ARXIV_CACHE_MAX_BYTES = int(os.getenv("ARXIV_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+EMBEDDING_CACHE_DIR = Path(
+    os.getenv("EMBEDDING_CACHE_DIR", PAPER_INDEX_PATH.parent / "embeddings")
+).expanduser()
+EMBEDDING_CACHE_LRU_SIZE = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "10000"))  # rows in memory
+
+EMBED_PROCESSES = int(os.getenv("EMBED_PROCESSES", "0"))  # 0 encodes in-process
+EMBED_TOKEN_BUDGET = int(os.getenv("EMBED_TOKEN_BUDGET", "8192"))  # padded tokens per batch
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384"))  # must match EMBEDDING_MODEL
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" or "onnx"
+ONNX_CACHE_DIR = Path(os.getenv("ONNX_CACHE_DIR", PAPER_INDEX_PATH.parent / "onnx")).expanduser()
+
+WARMUP_MODEL = os.getenv("WARMUP_MODEL", "background")  # "off", "blocking" or "background"
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))  # query embeddings in memory
+
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "qdrant")  # "qdrant" or "local"
+LOCAL_VECTOR_DIR = Path(
+    os.getenv("LOCAL_VECTOR_DIR", PAPER_INDEX_PATH.parent / "vectors")
+).expanduser()
+LOCAL_VECTOR_HNSW = os.getenv("LOCAL_VECTOR_HNSW", "false").lower() in ("1", "true", "yes")
+
+GRAPH_STORE_BACKEND = os.getenv("GRAPH_STORE_BACKEND", "csr")  # "csr" or "mock"
+GRAPH_DIR = Path(os.getenv("GRAPH_DIR", PAPER_INDEX_PATH.parent / "graph")).expanduser()
+
+SEARCH_RERANK = os.getenv("SEARCH_RERANK", "false").lower() in ("1", "true", "yes")
+RERANK_BLEND = float(os.getenv("RERANK_BLEND", "0.5"))  # weight of graph proximity vs cosine
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "20"))  # time budget per search
+
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() in ("1", "true", "yes")
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))  # seconds per request
+
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))  # graph edges per node
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+QDRANT_ON_DISK = os.getenv("QDRANT_ON_DISK", "false").lower() in ("1", "true", "yes")
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")  # "none", "scalar" or "binary"
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "4.0"))  # candidates rescored per hit
+
+REEMBED_BATCH_SIZE = int(os.getenv("REEMBED_BATCH_SIZE", "100"))  # papers per re-embedding step
+REEMBED_RATE = float(os.getenv("REEMBED_RATE", "10"))  # max papers per second re-embedded
@@ -0,0 +1,157 @@
+import threading
+from functools import partial
+from time import perf_counter
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+from src.config import EMBEDDING_BACKEND, EMBEDDING_DIM, EMBEDDING_MODEL
+from src.embedder.backends import EmbeddingBackend, load_backend
+from src.embedder.cache import EmbeddingCache, QueryCache
+from src.embedder.engine import EmbeddingEngine
+from src.models import Paper
+
+MODEL_NAME = EMBEDDING_MODEL
+
+_model: EmbeddingBackend | None = None
+_cache: EmbeddingCache | None = None
+_engine: EmbeddingEngine | None = None
+_query_cache: QueryCache | None = None
+# Models other than MODEL_NAME, e.g. the target of a re-embedding, by name
+_models: dict[str, EmbeddingBackend] = {}
+_engines: dict[str, EmbeddingEngine] = {}
+_query_caches: dict[str, QueryCache] = {}
+# Serializes model loads, so the warm-up thread and a first request load a model once
+_model_lock = threading.Lock()
+
+
+def get_model(model_name: str = MODEL_NAME) -> EmbeddingBackend:
+    global _model
+    if model_name != MODEL_NAME:
+        if model_name not in _models:
+            with _model_lock:
+                if model_name not in _models:
+                    _models[model_name] = load_backend(EMBEDDING_BACKEND, model_name)
+        return _models[model_name]
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_backend(EMBEDDING_BACKEND, MODEL_NAME)
+    return _model
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        # Quantized backends give slightly different vectors, so they get their own rows
+        name = MODEL_NAME if EMBEDDING_BACKEND == "torch" else f"{MODEL_NAME}-{EMBEDDING_BACKEND}"
+        _cache = EmbeddingCache(name, EMBEDDING_DIM)
+    return _cache
+
+
+def get_query_cache(model_name: str = MODEL_NAME) -> QueryCache:
+    """
+    Return the query cache of a model. Creating it loads the model, whose tokenizer
+    tells whether queries can be lowercased.
+    """
+    global _query_cache
+    if model_name != MODEL_NAME:
+        if model_name not in _query_caches:
+            _query_caches[model_name] = QueryCache(lowercase=get_model(model_name).lowercase)
+        return _query_caches[model_name]
+    if _query_cache is None:
+        _query_cache = QueryCache(lowercase=get_model().lowercase)
+    return _query_cache
+
+
+def get_engine(model_name: str = MODEL_NAME) -> EmbeddingEngine:
+    global _engine
+    if model_name != MODEL_NAME:
+        if model_name not in _engines:
+            _engines[model_name] = EmbeddingEngine(partial(get_model, model_name))
+        return _engines[model_name]
+    if _engine is None:
+        _engine = EmbeddingEngine(get_model)
+    return _engine
+
+
+def embed_papers(papers: list[Paper], model_name: str = MODEL_NAME) -> NDArray[np.float32]:
+    """
+    Embed paper abstracts, skipping the model for abstracts that are already cached.
+
+    Args:
+        papers (list[Paper]): The papers to embed.
+        model_name (str): The model to embed with. Only MODEL_NAME has an embedding cache.
+
+    Returns:
+        NDArray[np.float32]: One embedding per paper, in input order.
+    """
+    texts = [paper.abstract for paper in papers]
+    if model_name != MODEL_NAME:
+        return get_engine(model_name).encode(texts)
+    cache = get_embedding_cache()
+    vectors, missing = cache.lookup(texts)
+
+    if missing:
+        # Encode each distinct missing text once
+        unique = list(dict.fromkeys(texts[i] for i in missing))
+        encoded = get_engine().encode(unique)
+        cache.store(unique, encoded)
+        rows = {text: row for text, row in zip(unique, encoded)}
+        for i in missing:
+            vectors[i] = rows[texts[i]]
+
+    return vectors
+
+
+def embed_query(query: str | list[str], model_name: str = MODEL_NAME) -> NDArray[np.float32]:
+    """
+    Embed one or more search queries, reusing the embeddings of recently seen queries.
+
+    Queries that are not cached are embedded together in one batch.
+
+    Args:
+        query (str | list[str]): A search query, or a list of queries.
+        model_name (str): The model to embed with, the one of the searched collection.
+
+    Returns:
+        NDArray[np.float32]: The (read-only) embedding of a single query, or one
+            embedding per query, in order, for a list.
+    """
+    queries = [query] if isinstance(query, str) else query
+    cache = get_query_cache(model_name)
+    vectors = [cache.get(q) for q in queries]
+
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        # Encode each distinct (normalized) query once
+        unique = {cache.key(queries[i]): queries[i] for i in reversed(missing)}
+        texts = list(unique.values())
+        encoded = get_model(model_name).encode(texts, batch_size=len(texts))
+        rows = {cache.key(text): cache.put(text, row) for text, row in zip(texts, encoded)}
+        for i in missing:
+            vectors[i] = rows[cache.key(queries[i])]
+
+    if isinstance(query, str):
+        return vectors[0]  # type: ignore[return-value]
+    if not vectors:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    return np.stack(vectors)  # type: ignore[arg-type]
+
+
+def warm_up() -> bool:
+    """
+    Load the model and run one encode, so the first request doesn't pay for it.
+
+    Returns:
+        bool: True if the model is ready, False if loading it failed.
+    """
+    start = perf_counter()
+    try:
+        get_model().encode(["warm up"])
+    except Exception as e:
+        logger.error(f"Embedding model warm-up failed: {e}")
+        return False
+    logger.info(f"Embedding model warmed up in {perf_counter() - start:.1f}s")
+    return True
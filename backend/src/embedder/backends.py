@@ -0,0 +1,230 @@
+"""
+Interchangeable inference backends for the sentence embedding model.
+
+`torch` runs the SentenceTransformer as-is. `onnx` runs the same transformer
+exported to ONNX and int8-quantized, with mean pooling and normalization done in
+numpy, which is faster and much lighter on CPU-only hosts. The export is done
+once, with the torch model, and cached under ONNX_CACHE_DIR.
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Protocol
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+from src.config import ONNX_CACHE_DIR
+
+ONNX_OPSET = 17
+
+
+class EmbeddingBackend(Protocol):
+    name: str
+    lowercase: bool  # whether the tokenizer folds case, making queries case-insensitive
+
+    def encode(
+        self, sentences: list[str], batch_size: int = 32, **kwargs: Any
+    ) -> NDArray[np.float32]: ...
+
+
+class TorchBackend:
+    """The SentenceTransformer model, run by PyTorch."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.lowercase = bool(
+            getattr(self.model[0], "do_lower_case", False)
+            or getattr(self.model.tokenizer, "do_lower_case", False)
+        )
+
+    def encode(
+        self, sentences: list[str], batch_size: int = 32, **kwargs: Any
+    ) -> NDArray[np.float32]:
+        vectors: NDArray[np.float32] = self.model.encode(
+            sentences, batch_size=batch_size, convert_to_numpy=True
+        )
+        return vectors.astype(np.float32)
+
+
+def normalizer_lowercases(normalizer: dict[str, Any] | None) -> bool:
+    """Return True if a normalizer of a `tokenizer.json` file lowercases the text."""
+    if not normalizer:
+        return False
+    if normalizer.get("type") == "Lowercase":
+        return True
+    if normalizer.get("type") == "BertNormalizer":
+        return bool(normalizer.get("lowercase"))
+    return any(normalizer_lowercases(n) for n in normalizer.get("normalizers") or [])
+
+
+def export_onnx(model_name: str, directory: Path, quantize: bool = True) -> None:
+    """
+    Export a mean-pooling SentenceTransformer to ONNX, with its tokenizer.
+
+    Writes `model.onnx`, `model.int8.onnx` (if `quantize`), the tokenizer files and
+    `backend.json` with the pooling settings. Files are written to a temporary
+    directory that replaces `directory` once complete.
+
+    Args:
+        model_name (str): The SentenceTransformer model to export.
+        directory (Path): Where to write the exported model.
+        quantize (bool): Whether to also write a dynamically int8-quantized model.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    modules = list(model)
+    pooling = modules[1].get_config_dict() if len(modules) > 1 else {}
+    # sentence-transformers 4 uses boolean flags, later versions a single mode
+    if not (pooling.get("pooling_mode_mean_tokens") or pooling.get("pooling_mode") == "mean"):
+        raise ValueError(f"{model_name} does not use mean pooling, cannot export to ONNX")
+    normalize = any(type(module).__name__ == "Normalize" for module in modules)
+
+    logger.info(f"Exporting {model_name} to ONNX in {directory}")
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=directory.parent))
+    try:
+        transformer = modules[0].auto_model.eval()
+        model.tokenizer.save_pretrained(tmp)
+        sample = model.tokenizer(["an example sentence"], return_tensors="pt")
+        input_names = [
+            name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample
+        ]
+        axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+
+        class LastHiddenState(torch.nn.Module):
+            # Positional inputs and a single tensor output export the same way
+            # across transformers versions
+            def __init__(self) -> None:
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, *inputs: torch.Tensor) -> torch.Tensor:
+                kwargs = dict(zip(input_names, inputs))
+                return self.transformer(**kwargs, return_dict=True).last_hidden_state
+
+        with torch.no_grad():
+            torch.onnx.export(
+                LastHiddenState(),
+                tuple(sample[name] for name in input_names),
+                str(tmp / "model.onnx"),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes={**axes, "last_hidden_state": {0: "batch", 1: "sequence"}},
+                opset_version=ONNX_OPSET,
+                dynamo=False,
+            )
+        if quantize:
+            quantize_dynamic(
+                tmp / "model.onnx", tmp / "model.int8.onnx", weight_type=QuantType.QInt8
+            )
+        settings = {"max_seq_length": model.max_seq_length, "normalize": normalize}
+        (tmp / "backend.json").write_text(json.dumps(settings))
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+class OnnxBackend:
+    """
+    The model's transformer run by ONNX Runtime, int8-quantized by default.
+
+    The model is exported on first use if it is not cached yet, which needs the
+    torch backend's dependencies once; afterwards only onnxruntime and the Rust
+    tokenizer are loaded, not torch.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, directory: Path = ONNX_CACHE_DIR, quantize: bool = True):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.directory = directory / re.sub(r"[^\w.-]", "_", model_name)
+        model_path = self.directory / ("model.int8.onnx" if quantize else "model.onnx")
+        if not model_path.exists():
+            export_onnx(model_name, self.directory, quantize=quantize)
+
+        settings = json.loads((self.directory / "backend.json").read_text())
+        self.max_seq_length: int = settings["max_seq_length"]
+        self.normalize: bool = settings["normalize"]
+        # The bare Rust tokenizer, since importing transformers would also load torch
+        tokenizer_path = self.directory / "tokenizer.json"
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self.lowercase = normalizer_lowercases(
+            json.loads(tokenizer_path.read_text()).get("normalizer")
+        )
+        self.tokenizer.enable_truncation(self.max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Set per process by the embedding engine's pool, 0 lets ONNX Runtime decide
+        options.intra_op_num_threads = int(os.getenv("OMP_NUM_THREADS", "0"))
+        self.session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(
+        self, sentences: list[str], batch_size: int = 32, **kwargs: Any
+    ) -> NDArray[np.float32]:
+        chunks: list[NDArray[np.float32]] = []
+        for start in range(0, len(sentences), batch_size):
+            encodings = self.tokenizer.encode_batch(sentences[start : start + batch_size])
+            tokens = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            feed = {k: v for k, v in tokens.items() if k in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+
+            # Mean pooling over the non-padding tokens
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            chunks.append(pooled.astype(np.float32))
+        if not chunks:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(chunks)
+
+
+EMBEDDING_BACKENDS: dict[str, type[TorchBackend] | type[OnnxBackend]] = {
+    "torch": TorchBackend,
+    "onnx": OnnxBackend,
+}
+
+
+def load_backend(name: str, model_name: str) -> EmbeddingBackend:
+    """
+    Load an embedding backend by name.
+
+    Args:
+        name (str): A key of EMBEDDING_BACKENDS.
+        model_name (str): The SentenceTransformer model to run.
+
+    Returns:
+        EmbeddingBackend: The loaded backend.
+    """
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend {name!r}, expected one of {list(EMBEDDING_BACKENDS)}"
+        )
+    logger.info(f"Loading {model_name} with the {name} embedding backend")
+    return EMBEDDING_BACKENDS[name](model_name)
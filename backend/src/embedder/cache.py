@@ -0,0 +1,238 @@
+import fcntl
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+from src.config import EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_LRU_SIZE, QUERY_CACHE_SIZE
+
+KEY_SIZE = 16  # bytes of BLAKE2b digest per cached row
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies of a text share a cache entry."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of embeddings for one model.
+
+    Rows are appended to a float32 matrix file (`vectors.f32`) that is read through
+    a memory map, and the digest of each row's text is appended to `keys.bin`, so
+    row `i` of the matrix belongs to key `i`. Keys are loaded into memory on open;
+    vectors are only paged in when read. Recently used rows are also kept in an
+    in-memory LRU.
+
+    Appends take an exclusive file lock, so several processes (API and workers)
+    can share a cache directory.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        dim: int,
+        directory: Path = EMBEDDING_CACHE_DIR,
+        lru_size: int = EMBEDDING_CACHE_LRU_SIZE,
+    ):
+        self.model_name = model_name
+        self.dim = dim
+        self.directory = directory / re.sub(r"[^\w.-]", "_", model_name)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.keys_path = self.directory / "keys.bin"
+        self.lock_path = self.directory / "lock"
+        self.vectors_path.touch()
+        self.keys_path.touch()
+
+        self.lru_size = lru_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._rows: dict[bytes, int] = {}
+        self._count = 0  # entries in keys.bin, i.e. committed rows
+        self._lru: OrderedDict[bytes, NDArray[np.float32]] = OrderedDict()
+        self._matrix: np.memmap | None = None
+        self._sync_keys()
+        logger.debug(f"Embedding cache for {model_name} opened with {len(self._rows)} rows")
+
+    def key(self, text: str) -> bytes:
+        """Return the cache key of a text for this model."""
+        payload = f"{self.model_name}\0{normalize_text(text)}".encode()
+        return hashlib.blake2b(payload, digest_size=KEY_SIZE).digest()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _sync_keys(self) -> None:
+        """Load keys appended since the last sync, possibly by another process."""
+        with self.keys_path.open("rb") as f:
+            f.seek(self._count * KEY_SIZE)
+            data = f.read()
+        for offset in range(0, len(data) - len(data) % KEY_SIZE, KEY_SIZE):
+            self._rows.setdefault(data[offset : offset + KEY_SIZE], self._count)
+            self._count += 1
+
+    def _row_matrix(self, row: int) -> np.memmap:
+        """Return a memory map covering at least `row`, remapping if the file grew."""
+        if self._matrix is None or row >= self._matrix.shape[0]:
+            rows = self.vectors_path.stat().st_size // (self.dim * 4)
+            self._matrix = np.memmap(
+                self.vectors_path, np.float32, mode="r", shape=(rows, self.dim)
+            )
+        return self._matrix
+
+    def _get(self, key: bytes) -> NDArray[np.float32] | None:
+        if (vector := self._lru.get(key)) is not None:
+            self._lru.move_to_end(key)
+            return vector
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        vector = np.array(self._row_matrix(row)[row])
+        self._remember(key, vector)
+        return vector
+
+    def _remember(self, key: bytes, vector: NDArray[np.float32]) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def lookup(self, texts: list[str]) -> tuple[NDArray[np.float32], list[int]]:
+        """
+        Look up embeddings for a list of texts.
+
+        Args:
+            texts (list[str]): The texts to look up.
+
+        Returns:
+            tuple[NDArray[np.float32], list[int]]: A (len(texts), dim) matrix holding
+                the cached rows, and the positions of the texts that were not cached.
+                Rows at those positions are zero.
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        missing: list[int] = []
+        with self._lock:
+            for i, text in enumerate(texts):
+                vector = self._get(self.key(text))
+                if vector is None:
+                    missing.append(i)
+                else:
+                    vectors[i] = vector
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return vectors, missing
+
+    def store(self, texts: list[str], vectors: NDArray[np.float32]) -> None:
+        """
+        Append embeddings for texts that are not cached yet.
+
+        Args:
+            texts (list[str]): The embedded texts.
+            vectors (NDArray[np.float32]): One embedding per text.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(texts), self.dim)
+        with self._lock, self.lock_path.open("w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._sync_keys()
+
+            new_keys: list[bytes] = []
+            new_rows: list[NDArray[np.float32]] = []
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                self._remember(key, vector.copy())
+                if key not in self._rows and key not in new_keys:
+                    new_keys.append(key)
+                    new_rows.append(vector)
+            if not new_keys:
+                return
+
+            # Vectors first, so a reader never sees a key without its row. Rows
+            # past the last key were left by an interrupted append and are dropped.
+            first_row = self._count
+            with self.vectors_path.open("r+b") as f:
+                f.truncate(first_row * self.dim * 4)
+                f.seek(0, 2)
+                f.write(np.stack(new_rows).tobytes())
+            with self.keys_path.open("ab") as f:
+                f.write(b"".join(new_keys))
+            for offset, key in enumerate(new_keys):
+                self._rows[key] = first_row + offset
+            self._count += len(new_keys)
+
+    def stats(self) -> dict[str, int | float]:
+        """Return hit/miss counters and the size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "rows": len(self._rows),
+            "lru_rows": len(self._lru),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class QueryCache:
+    """
+    Bounded in-memory LRU of the query embeddings of one model, keyed on the
+    normalized query.
+
+    Queries are whitespace-normalized, and lowercased only if `lowercase` is set,
+    which is safe only for a model whose tokenizer lowercases. Cased models keep
+    "BERT" and "bert" apart. Cached vectors are read-only.
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, lowercase: bool = False):
+        self.maxsize = maxsize
+        self.lowercase = lowercase
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._vectors: OrderedDict[str, NDArray[np.float32]] = OrderedDict()
+
+    def key(self, query: str) -> str:
+        key = normalize_text(query)
+        return key.lower() if self.lowercase else key
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def get(self, query: str) -> NDArray[np.float32] | None:
+        """Return the cached embedding of a query, or None on a miss."""
+        key = self.key(query)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._vectors.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, query: str, vector: NDArray[np.float32]) -> NDArray[np.float32]:
+        """Cache the embedding of a query, evicting the least recently used if full."""
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._vectors[self.key(query)] = vector
+            self._vectors.move_to_end(self.key(query))
+            while len(self._vectors) > self.maxsize:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def stats(self) -> dict[str, int | float]:
+        """Return hit/miss counters and the size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._vectors),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Callable
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+from src.config import EMBED_PROCESSES, EMBED_TOKEN_BUDGET
+from src.embedder.backends import EmbeddingBackend
+
+CHARS_PER_TOKEN = 4  # rough WordPiece average for English abstracts
+MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2 truncates inputs to 256 tokens
+MAX_BATCH_SIZE = 256
+
+
+def estimate_tokens(text: str, max_seq_length: int = MAX_SEQ_LENGTH) -> int:
+    """
+    Cheaply estimate the number of tokens of a text after truncation.
+
+    Only the relative order matters for bucketing, so a character-based estimate is
+    used instead of running the tokenizer twice.
+    """
+    return min(max_seq_length, len(text) // CHARS_PER_TOKEN + 2)  # + [CLS] and [SEP]
+
+
+def plan_batches(
+    texts: list[str], token_budget: int, max_batch_size: int = MAX_BATCH_SIZE
+) -> list[list[int]]:
+    """
+    Group texts of similar length into batches that fit a padded-token budget.
+
+    Texts are sorted by estimated length, longest first, and cut into batches so
+    that `batch size x longest text in the batch` stays within `token_budget`.
+    Short texts therefore get large batches and long texts small ones, and little
+    compute is spent on padding.
+
+    Args:
+        texts (list[str]): The texts to batch.
+        token_budget (int): Maximum padded tokens per batch.
+        max_batch_size (int): Maximum texts per batch.
+
+    Returns:
+        list[list[int]]: Positions in `texts` for each batch.
+    """
+    lengths = [estimate_tokens(text) for text in texts]
+    order = sorted(range(len(texts)), key=lambda i: lengths[i], reverse=True)
+
+    batches: list[list[int]] = []
+    current: list[int] = []
+    for i in order:
+        # The first text of a batch is its longest, since texts are sorted
+        longest = lengths[current[0]] if current else lengths[i]
+        if current and (
+            (len(current) + 1) * longest > token_budget or len(current) >= max_batch_size
+        ):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+# Model loaded once per pool process by `_init_process`
+_process_model: EmbeddingBackend | None = None
+
+
+def _init_process(load_model: Callable[[], EmbeddingBackend], threads: int) -> None:
+    global _process_model
+    # Read by ONNX Runtime when the session is created
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    _process_model = load_model()
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+
+def _encode_in_process(texts: list[str]) -> NDArray[np.float32]:
+    assert _process_model is not None, "pool process was not initialized"
+    vectors: NDArray[np.float32] = _process_model.encode(
+        texts, batch_size=len(texts), convert_to_numpy=True
+    )
+    return vectors.astype(np.float32)
+
+
+class EmbeddingEngine:
+    """
+    Length-bucketed embedding engine, optionally spread over a process pool.
+
+    With `processes=0` batches are encoded by the model returned by `load_model`
+    in this process, so it should cache the model. Otherwise each pool process
+    calls `load_model` once, on start, and batches are spread across the pool;
+    `load_model` must then be a picklable module-level function. Results are
+    always returned in input order.
+    """
+
+    def __init__(
+        self,
+        load_model: Callable[[], EmbeddingBackend],
+        processes: int = EMBED_PROCESSES,
+        token_budget: int = EMBED_TOKEN_BUDGET,
+        max_batch_size: int = MAX_BATCH_SIZE,
+    ):
+        self.load_model = load_model
+        self.processes = processes
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+
+        self.texts = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Split the cores between processes so they don't oversubscribe the CPU
+            threads = max(1, (multiprocessing.cpu_count() or 1) // self.processes)
+            logger.info(f"Starting {self.processes} embedding processes, {threads} threads each")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                # Forking a process that already holds torch threads can deadlock
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+                initargs=(self.load_model, threads),
+            )
+        return self._pool
+
+    def encode(self, texts: list[str]) -> NDArray[np.float32]:
+        """
+        Embed texts in length-bucketed batches.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            NDArray[np.float32]: One embedding per text, in input order.
+        """
+        start = perf_counter()
+        batches = plan_batches(texts, self.token_budget, self.max_batch_size)
+
+        if self.processes > 0:
+            pool = self._get_pool()
+            chunks = pool.map(_encode_in_process, [[texts[i] for i in b] for b in batches])
+        else:
+            model = self.load_model()
+            chunks = (
+                model.encode([texts[i] for i in b], batch_size=len(b), convert_to_numpy=True)
+                for b in batches
+            )
+
+        vectors: NDArray[np.float32] | None = None
+        for batch, chunk in zip(batches, chunks):
+            if vectors is None:
+                vectors = np.empty((len(texts), chunk.shape[1]), dtype=np.float32)
+            vectors[batch] = chunk
+
+        elapsed = perf_counter() - start
+        with self._lock:
+            self.texts += len(texts)
+            self.seconds += elapsed
+        logger.debug(f"Embedded {len(texts)} texts in {len(batches)} batches ({elapsed:.2f}s)")
+        return vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+
+    def stats(self) -> dict[str, int | float]:
+        """Return cumulative throughput counters."""
+        with self._lock:
+            return {
+                "texts": self.texts,
+                "seconds": round(self.seconds, 3),
+                "texts_per_second": round(self.texts / self.seconds, 2) if self.seconds else 0.0,
+            }
+
+    def close(self) -> None:
+        """Shut down the process pool, if any."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -1,3 +1,5 @@
+import re
+import unicodedata
 from datetime import datetime
 from enum import Enum
 from typing import Any
@@ -58,6 +60,51 @@ class Paper(BaseModel):
     title: str
     abstract: str
     authors: list[str]
+    published: datetime | None = Field(
+        default=None,
+        description="Submission date of the first version",
+    )
+    updated: datetime | None = Field(
+        default=None,
+        description="Date of the latest version",
+    )
+    primary_category: str | None = Field(
+        default=None,
+        description="arXiv primary category, e.g. cs.LG",
+    )
+
+
+NAME_SUFFIXES = {"jr", "sr", "ii", "iii", "iv"}
+
+
+def author_key(name: str) -> str:
+    """
+    Normalize an author name to a key shared by its common spelling variants.
+
+    The key is the ASCII-folded, lowercased last name and first initial, so
+    "Yann LeCun", "Y. LeCun" and "LeCun, Yann" all map to "lecun_y".
+
+    Args:
+        name (str): The author name as written in the paper.
+
+    Returns:
+        str: The author key.
+    """
+    if "," in name:
+        last, _, first = name.partition(",")
+        name = f"{first} {last}"
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    tokens = [t for t in re.sub(r"[^a-z\s-]", "", folded).split() if t not in NAME_SUFFIXES]
+    if not tokens:
+        return ""
+    if len(tokens) == 1:
+        return tokens[0]
+    return f"{tokens[-1]}_{tokens[0][0]}"
+
+
+def author_keys(authors: list[str]) -> set[str]:
+    """Return the distinct, non-empty author keys of an author list."""
+    return {key for name in authors if (key := author_key(name))}
 
 
 class PaperStatus(str, Enum):
@@ -92,6 +139,26 @@ class PaperState(BaseModel):
     )
 
 
+class VectorMigration(BaseModel):
+    """
+    A re-embedding of the vector collection behind an alias, into a new collection.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+    alias: str
+    target: str = Field(description="Versioned collection being filled")
+    model: str = Field(description="Embedding model of the target collection")
+    dim: int
+    cursor: str | None = Field(
+        default=None,
+        description="Last paper ID re-embedded by the background job, in ID order",
+    )
+    done: bool = Field(
+        default=False,
+        description="Whether the background job has re-embedded every paper",
+    )
+
+
 class SearchResult(BaseModel):
     id: str
     title: str
@@ -104,6 +171,10 @@ class SearchResult(BaseModel):
         default=None,
         description="List of related paper IDs",
     )
+    centrality: float | None = Field(
+        default=None,
+        description="PageRank of the paper in the paper graph",
+    )
     model_config = ConfigDict(coerce_numbers_to_str=True)
 
 
@@ -131,3 +202,30 @@ class GraphData(BaseModel):
 class SearchResponse(BaseModel):
     results: list[PaperNode]  # subset of nodes
     graph: GraphData
+
+
+class SearchFilter(BaseModel):
+    """
+    Restricts a vector search to papers matching all of the given conditions.
+    Conditions left as None don't restrict the search.
+    """
+
+    published_from: datetime | None = Field(
+        default=None,
+        description="Only papers first published at or after this time",
+    )
+    published_to: datetime | None = Field(
+        default=None,
+        description="Only papers first published at or before this time",
+    )
+    categories: list[str] | None = Field(
+        default=None,
+        description="Only papers whose primary category is one of these, e.g. cs.LG",
+    )
+    authors: list[str] | None = Field(
+        default=None,
+        description="Only papers by at least one of these authors, matched with author_key",
+    )
+
+    def author_keys(self) -> list[str] | None:
+        return [author_key(name) for name in self.authors] if self.authors is not None else None
@@ -1,33 +1,105 @@
-from src.arxiv import fetch_papers as fetch_arxiv_papers
+from datetime import datetime, timezone
+from typing import Iterator
+
+from loguru import logger
+
+from src.arxiv import PAGE_SIZE, get_response_cache, iter_papers, normalize_query
 from src.models import Paper, PaperState, PaperStatus
 from src.store import get_paper_index
 
+# Lower bound of the first `since` harvest of a query, so it runs oldest first too
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
-def discover_papers(query: str, num_papers: int = 5) -> list[Paper]:
+
+def iter_discovered_papers(
+    query: str, num_papers: int | None = 5, since: bool = False
+) -> Iterator[Paper]:
     """
-    Discover papers based on a query using the arXiv API.
+    Lazily discover papers for a query, marking new ones as SEEN in the PaperIndex.
+
+    Papers are yielded as soon as they are parsed. Index updates are flushed once
+    per page so large harvests don't hold every state in memory. Papers that are
+    already in the index keep their current state.
+
+    In `since` mode, only papers updated after the query's stored cursor (or all
+    papers, on the first run) are fetched, oldest first. The cursor is not moved
+    here: see `advance_cursor`, to be called once the papers are safely queued.
 
     Args:
         query (str): The search query.
-        num_papers (int): The number of papers to fetch.
+        num_papers (int | None): The number of papers to fetch. None fetches all results.
+        since (bool): Whether to fetch only papers newer than the stored cursor.
 
-    Returns:
-        list[Paper]: A list of discovered papers.
+    Yields:
+        Paper: Discovered papers.
     """
-    papers: list[Paper] = fetch_arxiv_papers(query, num_papers)
-
-    # Update index
     paper_index = get_paper_index()
-    paper_index.set_many(
-        [
-            PaperState(
-                id=paper.id,
-                status=PaperStatus.SEEN,
-                in_graph=False,
-                last_seen=None,
+    key = normalize_query(query)
+    cursor: datetime | None = None
+    if since:
+        # A capped harvest can only be resumed if it runs in ascending update order
+        cursor = paper_index.get_cursor(key) or EPOCH
+        logger.info(f"Harvesting '{key}' since {cursor}")
+
+    pending: list[PaperState] = []
+
+    def flush() -> None:
+        nonlocal pending
+        paper_index.set_many(pending, overwrite=False)
+        pending = []
+
+    cache = get_response_cache()
+    try:
+        for paper in iter_papers(query, max_results=num_papers, since=cursor, cache=cache):
+            pending.append(
+                PaperState(
+                    id=paper.id,
+                    status=PaperStatus.SEEN,
+                    in_graph=False,
+                    last_seen=None,
+                )
             )
-            for paper in papers
-        ]
-    )
+            if len(pending) >= PAGE_SIZE:
+                flush()
+            yield paper
+    finally:
+        # Flush whatever is left, even if the consumer stopped early
+        if pending:
+            flush()
+        logger.debug(f"arXiv cache: {cache.stats()}")
+
+
+def advance_cursor(query: str, papers: list[Paper]) -> None:
+    """
+    Move a query's cursor to the newest `updated` time among harvested papers.
+
+    Only call it with the papers of a `since` harvest, which runs oldest first, and
+    once they are queued: papers before the cursor are never fetched again.
 
-    return papers
+    Args:
+        query (str): The search query.
+        papers (list[Paper]): The papers harvested since the current cursor.
+    """
+    newest = max((paper.updated for paper in papers if paper.updated is not None), default=None)
+    if newest is None:
+        return
+    paper_index = get_paper_index()
+    key = normalize_query(query)
+    cursor = paper_index.get_cursor(key)
+    if cursor is None or newest > cursor:
+        paper_index.set_cursor(key, newest)
+
+
+def discover_papers(query: str, num_papers: int | None = 5, since: bool = False) -> list[Paper]:
+    """
+    Discover papers based on a query using the arXiv API.
+
+    Args:
+        query (str): The search query.
+        num_papers (int | None): The number of papers to fetch. None fetches all results.
+        since (bool): Whether to fetch only papers newer than the stored cursor.
+
+    Returns:
+        list[Paper]: A list of discovered papers.
+    """
+    return list(iter_discovered_papers(query, num_papers, since=since))
@@ -1,12 +1,14 @@
 from typing import Generator
 
 from src.models import IngestEvent, IngestEventType, Paper
-from src.pipeline.discovery import discover_papers
+from src.pipeline.discovery import advance_cursor, discover_papers
 from src.queuing import enqueue_missing
 from src.store.redis import get_redis_conn
 
 
-def run_pipeline(query: str) -> Generator[IngestEvent, None, None]:
+def run_pipeline(
+    query: str, since: bool = False, num_papers: int | None = 5
+) -> Generator[IngestEvent, None, None]:
     """
     Runs the entire pipeline for processing papers.
     This function orchestrates the fetching of papers from ArXiv,
@@ -15,6 +17,9 @@ def run_pipeline(query: str) -> Generator[IngestEvent, None, None]:
 
     Args:
         query (str): The search query to use for fetching papers.
+        since (bool): Only fetch papers newer than the query's stored cursor,
+            advancing the cursor once the papers are queued.
+        num_papers (int | None): Maximum number of papers to fetch. None fetches all.
 
     Yields:
         IngestEvent: Events that represent the steps in the pipeline.
@@ -22,7 +27,7 @@ def run_pipeline(query: str) -> Generator[IngestEvent, None, None]:
             and any relevant data.
     """
     # Search for papers
-    papers: list[Paper] = discover_papers(query)
+    papers: list[Paper] = discover_papers(query, num_papers, since=since)
     yield IngestEvent(
         type=IngestEventType.STEP,
         step="discovery",
@@ -31,3 +36,6 @@ def run_pipeline(query: str) -> Generator[IngestEvent, None, None]:
     )
     # Enqueue missing papers
     enqueue_missing(papers, redis_conn=get_redis_conn())
+    if since:
+        # Only now, so papers that failed to queue are harvested again next time
+        advance_cursor(query, papers)
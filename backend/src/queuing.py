@@ -1,52 +1,275 @@
+import os
+import socket
+from typing import Any
+
 from loguru import logger
 from upstash_redis import Redis
 
 from src.models import Paper, PaperState, PaperStatus
 from src.store import get_paper_index
+from src.store.redis import eval_script
 
 QUEUE_LIST = "paper_queue"
 QUEUE_SET = "paper_queue_ids"
 
+# Push each payload whose URL is not yet in the dedup set, in one atomic step.
+# ARGV holds url, payload pairs; returns the URLs that were enqueued.
+ENQUEUE_SCRIPT = """
+local added = {}
+for i = 1, #ARGV, 2 do
+    if redis.call('SADD', KEYS[2], ARGV[i]) == 1 then
+        redis.call('RPUSH', KEYS[1], ARGV[i + 1])
+        table.insert(added, ARGV[i])
+    end
+end
+return added
+"""
+
+# Reliable-queue bookkeeping: each worker moves the items it pops into its own
+# processing list, and advertises itself with a heartbeat key while it is alive.
+WORKERS_SET = f"{QUEUE_LIST}:workers"
+PROCESSING_PREFIX = f"{QUEUE_LIST}:processing:"
+HEARTBEAT_PREFIX = f"{QUEUE_LIST}:heartbeat:"
+HEARTBEAT_TTL = 600  # seconds without a refresh after which a worker is considered dead
+HEARTBEAT_INTERVAL = 60.0  # seconds between heartbeat refreshes of a running worker
+ATTEMPTS_HASH = f"{QUEUE_LIST}:attempts"  # failed attempts of each payload being retried
+MAX_ATTEMPTS = 3  # failed attempts after which a payload is dropped and marked ERROR
+
+# Pop up to ARGV[1] items, copy them to the processing list and refresh the heartbeat
+CLAIM_SCRIPT = """
+local items = redis.call('LPOP', KEYS[1], ARGV[1])
+redis.call('SET', KEYS[3], '1', 'EX', ARGV[2])
+if not items then return {} end
+redis.call('RPUSH', KEYS[2], unpack(items))
+return items
+"""
+
+# Remove one occurrence of each acknowledged item from the processing list
+ACK_SCRIPT = """
+for _, item in ipairs(ARGV) do
+    redis.call('LREM', KEYS[1], 1, item)
+    redis.call('HDEL', KEYS[2], item)
+end
+return #ARGV
+"""
+
+# Move failed items from the processing list to the tail of the queue, dropping
+# the ones that failed ARGV[1] times; returns the dropped items
+FAIL_SCRIPT = """
+local dropped = {}
+for i = 2, #ARGV do
+    local item = ARGV[i]
+    redis.call('LREM', KEYS[2], 1, item)
+    if redis.call('HINCRBY', KEYS[3], item, 1) < tonumber(ARGV[1]) then
+        redis.call('RPUSH', KEYS[1], item)
+    else
+        redis.call('HDEL', KEYS[3], item)
+        table.insert(dropped, item)
+    end
+end
+return dropped
+"""
+
+# Push a processing list back to the head of the queue, preserving order
+REQUEUE_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[2], 0, -1)
+for i = #items, 1, -1 do
+    redis.call('LPUSH', KEYS[1], items[i])
+end
+redis.call('DEL', KEYS[2])
+return #items
+"""
+
 
 def enqueue_missing(papers: list[Paper], redis_conn: Redis) -> None:
     """
     Enqueue papers that are missing from the queue.
 
+    The whole list costs one PaperIndex lookup, one Redis round-trip and one
+    PaperIndex write, however many papers there are.
+
     Args:
         papers (list[Paper]): List of Paper objects to check and enqueue.
         redis_conn (Redis): Redis connection object.
     """
     logger.info("Enqueuing missing papers...")
+    if not papers:
+        return
+
     index = get_paper_index()
-    to_queue: list[PaperState] = []
+    states = index.get_many([paper.id for paper in papers])
 
+    # Skip if already embedded or marked as queued
+    candidates: dict[str, Paper] = {}
     for paper in papers:
-        state: PaperState | None = index.get(paper.id)
-
-        # Skip if already embedded or marked as queued
+        state = states.get(paper.id)
         if state is not None and state.status in (PaperStatus.EMBEDDED, PaperStatus.QUEUED):
             logger.debug(f"Skipping paper {paper.id} - already embedded or queued.")
             continue
+        candidates.setdefault(paper.url, paper)
 
-        # Check Redis set for already-queued status
-        if redis_conn.sismember(QUEUE_SET, paper.url):
-            logger.debug(f"Skipping paper {paper.id} - already in Redis set.")
-            continue
+    if not candidates:
+        return
+
+    # Add to Redis queue and set, skipping URLs already in the Redis set
+    args: list[str] = []
+    for url, paper in candidates.items():
+        args.extend((url, paper.model_dump_json()))
+    added = eval_script(redis_conn, ENQUEUE_SCRIPT, [QUEUE_LIST, QUEUE_SET], args) or []
+    added_urls = {url.decode() if isinstance(url, bytes) else url for url in added}
+    logger.debug(f"Skipped {len(candidates) - len(added_urls)} papers already in Redis set.")
 
-        # Add to Redis queue and set
-        logger.debug(f"Enqueuing paper {paper.id} to Redis.")
-        redis_conn.rpush(QUEUE_LIST, paper.model_dump_json())
-        redis_conn.sadd(QUEUE_SET, paper.url)
-
-        # Track for PaperIndex update
-        to_queue.append(
-            PaperState(
-                id=paper.id,
-                status=PaperStatus.QUEUED,
-                in_graph=False,
-            )
+    # Track for PaperIndex update
+    to_queue: list[PaperState] = [
+        PaperState(
+            id=paper.id,
+            status=PaperStatus.QUEUED,
+            in_graph=False,
         )
+        for url, paper in candidates.items()
+        if url in added_urls
+    ]
 
     if to_queue:
         index.set_many(to_queue)
         logger.info(f"Enqueued {len(to_queue)} papers to Redis and updated PaperIndex.")
+
+
+def worker_id() -> str:
+    """Return an identifier for this worker process, unique across hosts."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def processing_list(worker: str) -> str:
+    """Return the key of a worker's processing list."""
+    return f"{PROCESSING_PREFIX}{worker}"
+
+
+def claim_batch(redis_conn: Redis, max_items: int, worker: str) -> list[Any]:
+    """
+    Atomically pop up to `max_items` raw payloads into the worker's processing list.
+
+    The whole batch costs a single round-trip. Items stay in the processing list
+    until they are acknowledged with `ack_batch`, so a crashed worker loses nothing.
+
+    Args:
+        redis_conn (Redis): Redis connection object.
+        max_items (int): Maximum number of items to pop.
+        worker (str): The worker claiming the items.
+
+    Returns:
+        list[Any]: The raw payloads, in queue order.
+    """
+    items = eval_script(
+        redis_conn,
+        CLAIM_SCRIPT,
+        [QUEUE_LIST, processing_list(worker), f"{HEARTBEAT_PREFIX}{worker}"],
+        [max_items, HEARTBEAT_TTL],
+    )
+    return list(items or [])
+
+
+def ack_batch(redis_conn: Redis, raw_items: list[Any], worker: str) -> None:
+    """
+    Remove processed payloads from the worker's processing list.
+
+    Args:
+        redis_conn (Redis): Redis connection object.
+        raw_items (list[Any]): Payloads exactly as returned by `claim_batch`.
+        worker (str): The worker that claimed the items.
+    """
+    if raw_items:
+        eval_script(redis_conn, ACK_SCRIPT, [processing_list(worker), ATTEMPTS_HASH], raw_items)
+
+
+def fail_batch(
+    redis_conn: Redis, raw_items: list[Any], worker: str, max_attempts: int = MAX_ATTEMPTS
+) -> int:
+    """
+    Release the payloads of a batch that failed to embed or index.
+
+    They are moved in one round-trip from the worker's processing list to the tail
+    of the queue, so the worker retries them after the batches already queued. A
+    payload that has failed `max_attempts` times is dropped instead, and its paper
+    marked as ERROR, so a poison batch cannot be retried forever.
+
+    Args:
+        redis_conn (Redis): Redis connection object.
+        raw_items (list[Any]): Payloads exactly as returned by `claim_batch`.
+        worker (str): The worker that claimed the items.
+        max_attempts (int): Failed attempts after which a payload is dropped.
+
+    Returns:
+        int: The number of dropped payloads.
+    """
+    if not raw_items:
+        return 0
+    dropped = eval_script(
+        redis_conn,
+        FAIL_SCRIPT,
+        [QUEUE_LIST, processing_list(worker), ATTEMPTS_HASH],
+        [max_attempts, *raw_items],
+    )
+    dropped = list(dropped or [])
+    requeued = len(raw_items) - len(dropped)
+    if requeued:
+        logger.warning(f"Requeued {requeued} papers of a failed batch")
+    if dropped:
+        ids: list[str] = []
+        for value in dropped:
+            try:
+                ids.append(Paper.model_validate_json(value).id)
+            except ValueError:
+                continue  # not a paper, nothing to mark
+        get_paper_index().set_many(
+            [PaperState(id=paper_id, status=PaperStatus.ERROR, in_graph=False) for paper_id in ids]
+        )
+        logger.error(f"Dropped {len(dropped)} papers after {max_attempts} failed attempts")
+    return len(dropped)
+
+
+def register_worker(redis_conn: Redis, worker: str) -> int:
+    """
+    Register a worker and requeue items left in the processing lists of dead workers.
+
+    A worker is considered dead once its heartbeat key has expired. Recovered items
+    are pushed back to the head of the queue so they are processed first.
+
+    Args:
+        redis_conn (Redis): Redis connection object.
+        worker (str): The worker being started.
+
+    Returns:
+        int: The number of recovered items.
+    """
+    recovered = 0
+    for member in redis_conn.smembers(WORKERS_SET) or []:
+        other = member.decode() if isinstance(member, bytes) else str(member)
+        if other != worker and redis_conn.exists(f"{HEARTBEAT_PREFIX}{other}"):
+            continue
+        count = int(
+            eval_script(redis_conn, REQUEUE_SCRIPT, [QUEUE_LIST, processing_list(other)], []) or 0
+        )
+        redis_conn.srem(WORKERS_SET, other)
+        if count:
+            logger.warning(f"Requeued {count} papers orphaned by worker {other}")
+        recovered += count
+
+    redis_conn.sadd(WORKERS_SET, worker)
+    heartbeat(redis_conn, worker)
+    return recovered
+
+
+def heartbeat(redis_conn: Redis, worker: str) -> None:
+    """
+    Refresh a worker's heartbeat, so other workers don't requeue its processing list.
+
+    Claims refresh it too, but a worker can go longer than HEARTBEAT_TTL without
+    claiming while a slow batch holds its pipeline, so running workers also call
+    this every HEARTBEAT_INTERVAL.
+
+    Args:
+        redis_conn (Redis): Redis connection object.
+        worker (str): The worker that is alive.
+    """
+    redis_conn.set(f"{HEARTBEAT_PREFIX}{worker}", "1", ex=HEARTBEAT_TTL)
@@ -1,3 +1,4 @@
+import threading
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
@@ -7,13 +8,22 @@ from fastapi import FastAPI
 from loguru import logger
 
 from src.api import router
+from src.config import WARMUP_MODEL
+from src.embedder import warm_up
 from src.store import health_check
+from src.store.vector import close_qdrant_clients
 
 load_dotenv()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    # Load the embedding model while the health checks run
+    warmup: threading.Thread | None = None
+    if WARMUP_MODEL in ("blocking", "background"):
+        warmup = threading.Thread(target=warm_up, name="model-warmup", daemon=True)
+        warmup.start()
+
     # Health check
     logger.info("Performing health check...")
     health: dict[str, bool] = health_check()
@@ -30,7 +40,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         logger.error("Health check failed. Exiting...")
         raise RuntimeError("Health check failed.")
     logger.info("Health check passed.")
+
+    # In background mode the server starts serving while the model loads
+    if warmup is not None and WARMUP_MODEL == "blocking":
+        warmup.join()
     yield
+    close_qdrant_clients()
 
 
 app = FastAPI(lifespan=lifespan)
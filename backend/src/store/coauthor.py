@@ -0,0 +1,99 @@
+"""
+Incremental builder of the co-author edges of the paper graph.
+
+As the worker embeds papers, they are added to the graph store, whose inverted
+index maps each normalized author (see `src.models.author_key`) to the author's
+papers. Each new paper is then linked to the earlier papers of its authors, so a
+batch costs index lookups for its own authors rather than a pass over the corpus.
+
+Prolific authors would make the edge count grow quadratically: an author with n
+papers links every pair of them. Each new paper is therefore linked to at most
+HUB_CAP of an author's latest papers, and an author's contribution to an edge
+weight shrinks with their number of papers.
+"""
+
+import heapq
+from math import log2
+
+from loguru import logger
+
+from src.models import Paper, author_keys
+from src.store.graph import GraphStore, get_graph_store
+
+HUB_CAP = 100  # latest papers of an author a new paper is linked to
+MAX_COAUTHOR_EDGES = 200  # heaviest co-author edges kept per new paper
+
+
+def author_weight(papers: int) -> float:
+    """
+    Weight an author adds to the edges between their papers: 1 for an author of
+    two papers, halving each time their number of papers squares.
+    """
+    return 1.0 / log2(max(papers, 2))
+
+
+def coauthor_edges(
+    papers: list[Paper],
+    graph: GraphStore,
+    hub_cap: int = HUB_CAP,
+    max_edges: int = MAX_COAUTHOR_EDGES,
+) -> tuple[list[str], list[str], list[float]]:
+    """
+    Compute the co-author edges from new papers to the papers already in the graph.
+
+    The papers must already be nodes of the graph. Each pair of papers sharing
+    authors gets one edge, from the later paper of the batch (or the new paper)
+    to the other, weighted by the sum of `author_weight` of their shared authors.
+
+    Args:
+        papers (list[Paper]): The new papers.
+        graph (GraphStore): The graph store holding the papers and author index.
+        hub_cap (int): Latest papers of each author a new paper is linked to.
+        max_edges (int): Heaviest edges kept per new paper.
+
+    Returns:
+        tuple[list[str], list[str], list[float]]: Sources, targets and weights.
+    """
+    position = {paper.id: i for i, paper in enumerate(papers)}
+    sources: list[str] = []
+    targets: list[str] = []
+    weights: list[float] = []
+    for i, paper in enumerate(papers):
+        scores: dict[str, float] = {}
+        for key in author_keys(paper.authors):
+            count, latest = graph.get_author_paper_ids(key, hub_cap + len(papers))
+            # Papers later in the batch link to this one themselves
+            linked = [p for p in latest if p != paper.id and position.get(p, -1) < i]
+            weight = author_weight(count)
+            for other in linked[-hub_cap:]:
+                scores[other] = scores.get(other, 0.0) + weight
+        for other, score in heapq.nlargest(max_edges, scores.items(), key=lambda item: item[1]):
+            sources.append(paper.id)
+            targets.append(other)
+            weights.append(score)
+    return sources, targets, weights
+
+
+def add_coauthor_edges(
+    papers: list[Paper], graph: GraphStore | None = None, hub_cap: int = HUB_CAP
+) -> int:
+    """
+    Add papers to the graph and link them to the papers sharing their authors.
+
+    Args:
+        papers (list[Paper]): The newly embedded papers.
+        graph (GraphStore | None): The graph store. Defaults to the shared one.
+        hub_cap (int): Latest papers of each author a new paper is linked to.
+
+    Returns:
+        int: Number of directed edges added.
+    """
+    if not papers:
+        return 0
+    if graph is None:
+        graph = get_graph_store()
+    graph.add_papers(papers)
+    sources, targets, weights = coauthor_edges(papers, graph, hub_cap)
+    added = graph.add_edges(sources, targets, weights, edge_type="coauthor", symmetric=True)
+    logger.info(f"Added {len(papers)} papers and {added} co-author edges to the graph")
+    return added
@@ -1,20 +1,87 @@
+import numpy as np
+
+from src.config import SEARCH_RERANK
 from src.embedder import embed_query
-from src.models import SearchResult
-from src.store.graph import get_graph_store
+from src.models import GraphData, GraphEdge, PaperNode, SearchFilter, SearchResult
+from src.store.graph import MAX_NODES, get_graph_store
+from src.store.ranking import rerank as rerank_results
 from src.store.vector import get_vector_store
 
+RESULT_EDGE_TYPE = "related"  # subgraph() merges edge types, so result edges have one type
+
 
-def search(query: str, expand_hops: int = 1) -> list[SearchResult]:
+def search(
+    query: str,
+    expand_hops: int = 1,
+    search_filter: SearchFilter | None = None,
+    max_nodes: int = MAX_NODES,
+    min_weight: float = 0.0,
+    rerank: bool = SEARCH_RERANK,
+) -> list[SearchResult]:
     vector = get_vector_store()
     graph = get_graph_store()
 
-    embedding = embed_query(query)
-    top_results = vector.search(embedding)
+    # Embed with the model of the collection being searched, which changes on re-embedding
+    embedding = embed_query(query, vector.embedding_model)
+    top_results = vector.search(embedding, search_filter=search_filter)
 
-    all_ids = {r.id for r in top_results}
-    for r in top_results:
-        related = graph.get_related_ids(r.id)
-        all_ids.update(related)
+    # One graph call expands all hits, hop by hop, within the node budget
+    hit_ids = [r.id for r in top_results]
+    related = graph.neighbors_many(hit_ids, expand_hops, max_nodes, min_weight)
+    all_ids = list(dict.fromkeys(hit_ids + related))
 
-    enriched = graph.get_papers_by_ids(list(all_ids))
+    # Graph papers carry centrality, and hits their cosine score. Hits missing from the
+    # graph (not added yet, failed graph writes, mock graph) are kept as the vector found them
+    hits = {hit.id: hit for hit in top_results}
+    papers = {paper.id: paper for paper in graph.get_papers_by_ids(all_ids)}
+    enriched: list[SearchResult] = []
+    for paper_id in all_ids:
+        hit, paper = hits.get(paper_id), papers.get(paper_id)
+        if paper is None:
+            if hit is not None:
+                enriched.append(hit)
+        elif hit is not None:
+            enriched.append(paper.model_copy(update={"score": hit.score}))
+        else:
+            enriched.append(paper)
+    if rerank:
+        # Papers close to several strong hits in the graph move up
+        return rerank_results(top_results, enriched, graph)
     return enriched
+
+
+def result_graph(results: list[SearchResult]) -> GraphData:
+    """
+    Build the graph of search results: the papers as nodes, with their neighbors
+    among the results as related IDs, and the edges between them.
+
+    Edges linking the same two papers, in either direction, are merged into one
+    edge of their highest weight.
+
+    Args:
+        results (list[SearchResult]): Distinct papers, as returned by `search`.
+
+    Returns:
+        GraphData: The results as nodes, in order, and their edges.
+    """
+    ids = [result.id for result in results]
+    offsets, neighbors, weights = get_graph_store().subgraph(ids)
+    sources = np.repeat(np.arange(len(ids)), np.diff(offsets))
+
+    strongest: dict[tuple[int, int], float] = {}
+    related: list[dict[str, None]] = [{} for _ in ids]
+    for source, target, weight in zip(sources.tolist(), neighbors.tolist(), weights.tolist()):
+        pair = (min(source, target), max(source, target))
+        strongest[pair] = max(weight, strongest.get(pair, weight))
+        related[source][ids[target]] = None
+        related[target][ids[source]] = None
+
+    nodes = [
+        PaperNode(**result.model_dump(exclude={"related_ids"}), related_ids=list(linked))
+        for result, linked in zip(results, related)
+    ]
+    edges = [
+        GraphEdge(source=ids[a], target=ids[b], weight=weight, type=RESULT_EDGE_TYPE)
+        for (a, b), weight in strongest.items()
+    ]
+    return GraphData(nodes=nodes, edges=edges)
@@ -0,0 +1,608 @@
+"""
+Graph store keeping the paper graph in memory in compressed sparse row (CSR) form,
+persisted to local files.
+"""
+
+import bisect
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from time import monotonic, perf_counter
+from typing import Any, Iterator
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+from src.config import GRAPH_DIR
+from src.models import Paper, SearchResult, author_keys
+from src.store.graph import MAX_NODES, GraphStore
+from src.store.local_vector import epoch_seconds
+from src.store.ranking import DAMPING, pagerank
+
+EDGE_TYPES = ("coauthor", "similar")
+EDGE_RECORD = np.dtype([("source", "<i4"), ("target", "<i4"), ("weight", "<f4"), ("type", "u1")])
+COMPACT_EDGES = 100_000  # appended edges that trigger a compaction into the CSR arrays
+CENTRALITY_REFRESH = 10.0  # minimum seconds between two PageRank refreshes on reads
+NO_DATE = np.iinfo(np.int64).min  # published value of papers without a date
+
+
+class CSRGraphStore(GraphStore):
+    """
+    Paper graph with CSR adjacency and a columnar node table.
+
+    Papers are nodes, numbered in insertion order; `ids` maps numbers to paper
+    IDs and `index` back. The adjacency of node `u` is the slice
+    `offsets[u]:offsets[u + 1]` of the `neighbors`, `weights` and `types` arrays,
+    sorted by decreasing weight, so a lookup costs O(degree) and only allocates
+    its result. Node metadata (title, authors, category, publication date) is
+    kept in one column per field, and an inverted index maps each author key to
+    the author's papers.
+
+    Edges are appended to a log and kept in a per-node delta until COMPACT_EDGES
+    of them accumulate; compaction then merges them into new CSR arrays in a few
+    vectorized passes. Adding an edge that exists (same nodes and type) replaces
+    its weight; removing one appends a tombstone, a NaN weight, that compaction drops.
+
+    The directory holds:
+        - `nodes.jsonl`: one line per added paper, later lines updating earlier ones,
+        - `edges.log`: fixed-size edge records appended since the last compaction,
+        - `csr.npz`: the compacted adjacency and the PageRank of each node, replaced
+          atomically.
+
+    PageRank centrality is served from memory, and kept up to date with appended
+    edges and nodes. When they changed, a read re-runs PageRank over the CSR and
+    delta edges, warm-started from the previous ranks, at most every
+    CENTRALITY_REFRESH seconds. Until then, new papers get the rank of a paper
+    nothing links to. Compaction also refreshes the ranks and persists them.
+
+    Writers take an exclusive file lock, and readers pick up changes made by other
+    processes (e.g. the worker) on their next call, like `LocalVectorStore`.
+    """
+
+    def __init__(self, directory: Path = GRAPH_DIR):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.nodes_path = self.directory / "nodes.jsonl"
+        self.edges_path = self.directory / "edges.log"
+        self.csr_path = self.directory / "csr.npz"
+        self.lock_path = self.directory / "lock"
+        for path in (self.nodes_path, self.edges_path):
+            path.touch()
+
+        self._lock = threading.RLock()
+        self.ids: list[str] = []
+        self.index: dict[str, int] = {}
+        # Columnar node table, one entry per node
+        self.titles: list[str] = []
+        self.authors: list[list[str]] = []
+        self.categories: list[str | None] = []
+        self.published = array("q")  # Unix seconds, NO_DATE if unknown
+        # Inverted index: author key -> nodes of the author's papers, in node order
+        self.author_nodes: dict[str, list[int]] = {}
+        # Compacted adjacency
+        self.offsets: NDArray[np.int64] = np.zeros(1, dtype=np.int64)
+        self.neighbors: NDArray[np.int32] = np.empty(0, dtype=np.int32)
+        self.weights: NDArray[np.float32] = np.empty(0, dtype=np.float32)
+        self.types: NDArray[np.uint8] = np.empty(0, dtype=np.uint8)
+        # PageRank of the nodes, and the (CSR version, edge records, nodes) it covers
+        self.centrality: NDArray[np.float32] = np.empty(0, dtype=np.float32)
+        self._ranked: tuple[int, int, int] | None = None
+        self._ranked_at = -np.inf  # monotonic() time of the last refresh
+        # Edges appended since the last compaction: source -> (target, type) -> weight
+        self._delta: dict[int, dict[tuple[int, int], float]] = {}
+        self._delta_count = 0
+        self._nodes_read = 0  # bytes of nodes.jsonl loaded
+        self._edges_read = 0  # records of edges.log loaded
+        self._csr_mtime = 0
+        self._locked = False  # whether this instance holds the file lock
+        # Visited bitmap of expansions, cleared entry by entry after each one
+        self._visited = np.zeros(0, dtype=bool)
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        """Return the number of nodes."""
+        with self._lock:
+            self._refresh()
+            return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        """
+        Number of directed edges (an undirected edge counts twice). Until compaction,
+        appended edges and tombstones count as new edges.
+        """
+        with self._lock:
+            self._refresh()
+            return len(self.neighbors) + self._delta_count
+
+    @contextmanager
+    def _file_lock(self, operation: int) -> Iterator[None]:
+        """Hold the directory's file lock. Callers hold `_lock`; re-entering is a no-op."""
+        if self._locked:
+            yield
+            return
+        with self.lock_path.open("a") as lock:
+            fcntl.flock(lock, operation)
+            self._locked = True
+            try:
+                yield
+            finally:
+                self._locked = False
+
+    def _changed(self) -> bool:
+        csr_mtime = self.csr_path.stat().st_mtime_ns if self.csr_path.exists() else 0
+        return (
+            csr_mtime != self._csr_mtime
+            or self.nodes_path.stat().st_size != self._nodes_read
+            or self.edges_path.stat().st_size != self._edges_read * EDGE_RECORD.itemsize
+        )
+
+    def _refresh(self) -> None:
+        """Load what was written since the last refresh, possibly by another process."""
+        if not self._changed():
+            return
+        with self._file_lock(fcntl.LOCK_SH):
+            if self.csr_path.exists():
+                mtime = self.csr_path.stat().st_mtime_ns
+                if mtime != self._csr_mtime:
+                    # Compacted by another process: its log was merged and truncated
+                    with np.load(self.csr_path) as csr:
+                        self.offsets, self.neighbors = csr["offsets"], csr["neighbors"]
+                        self.weights, self.types = csr["weights"], csr["types"]
+                        if "centrality" in csr.files:
+                            self.centrality = csr["centrality"]
+                    self._csr_mtime = mtime
+                    self._delta, self._delta_count, self._edges_read = {}, 0, 0
+
+            with self.nodes_path.open("rb") as f:
+                f.seek(self._nodes_read)
+                data = f.read()
+            end = data.rfind(b"\n") + 1  # ignore a line still being written
+            for line in data[:end].splitlines():
+                self._set_node(json.loads(line))
+            self._nodes_read += end
+
+            with self.edges_path.open("rb") as f:
+                f.seek(self._edges_read * EDGE_RECORD.itemsize)
+                data = f.read()
+            records = np.frombuffer(
+                data[: len(data) - len(data) % EDGE_RECORD.itemsize], dtype=EDGE_RECORD
+            )
+            for source, target, weight, kind in records.tolist():
+                edges = self._delta.setdefault(source, {})
+                self._delta_count += (target, kind) not in edges
+                edges[(target, kind)] = weight
+            self._edges_read += len(records)
+
+    def _set_node(self, row: dict[str, Any]) -> None:
+        published = row.get("published")
+        values = (
+            row.get("title", ""),
+            row.get("authors", []),
+            row.get("primary_category"),
+            int(published) if published is not None else int(NO_DATE),
+        )
+        node = self.index.get(row["id"])
+        if node is None:
+            node = self.index[row["id"]] = len(self.ids)
+            self.ids.append(row["id"])
+            self.titles.append(values[0])
+            self.authors.append(values[1])
+            self.categories.append(values[2])
+            self.published.append(values[3])
+            for key in author_keys(values[1]):
+                self.author_nodes.setdefault(key, []).append(node)
+        else:
+            old, new = author_keys(self.authors[node]), author_keys(values[1])
+            for key in old - new:
+                self.author_nodes[key].remove(node)
+            for key in new - old:
+                bisect.insort(self.author_nodes.setdefault(key, []), node)
+            self.titles[node], self.authors[node], self.categories[node] = values[:3]
+            self.published[node] = values[3]
+
+    def add_papers(self, papers: list[Paper]) -> None:
+        """
+        Add papers as nodes, or update the metadata of papers already in the graph.
+        """
+        if not papers:
+            return
+        lines = [
+            json.dumps(
+                {
+                    "id": paper.id,
+                    "title": paper.title,
+                    "authors": paper.authors,
+                    "primary_category": paper.primary_category,
+                    "published": epoch_seconds(paper.published) if paper.published else None,
+                }
+            )
+            + "\n"
+            for paper in papers
+        ]
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            with self.nodes_path.open("a") as f:
+                f.write("".join(lines))
+            self._refresh()
+
+    def add_edges(
+        self,
+        sources: list[str],
+        targets: list[str],
+        weights: list[float] | NDArray[np.float32],
+        edge_type: str = "coauthor",
+        symmetric: bool = True,
+    ) -> int:
+        """
+        Append weighted edges between papers already added as nodes.
+
+        Edges to unknown papers and self-loops are skipped. Compacts once enough
+        edges were appended.
+
+        Args:
+            sources (list[str]): Paper IDs the edges start from.
+            targets (list[str]): Paper IDs the edges point to.
+            weights (list[float] | NDArray[np.float32]): Weight of each edge.
+            edge_type (str): One of EDGE_TYPES.
+            symmetric (bool): Also add each edge in the reverse direction.
+
+        Returns:
+            int: Number of edges appended, counting both directions.
+
+        Raises:
+            ValueError: If the edge type is unknown.
+        """
+        if edge_type not in EDGE_TYPES:
+            raise ValueError(f"Unsupported edge type: {edge_type}")
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh()
+            src = np.array([self.index.get(s, -1) for s in sources], dtype=np.int32)
+            dst = np.array([self.index.get(t, -1) for t in targets], dtype=np.int32)
+            weight = np.asarray(weights, dtype=np.float32)
+            keep = (src >= 0) & (dst >= 0) & (src != dst)
+            if not keep.all():
+                logger.debug(f"Skipping {int((~keep).sum())} edges to unknown papers or loops")
+            src, dst, weight = src[keep], dst[keep], weight[keep]
+            if symmetric:
+                src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+                weight = np.concatenate([weight, weight])
+
+            records = np.empty(len(src), dtype=EDGE_RECORD)
+            records["source"], records["target"], records["weight"] = src, dst, weight
+            records["type"] = EDGE_TYPES.index(edge_type)
+            with self.edges_path.open("ab") as f:
+                f.write(records.tobytes())
+            self._refresh()
+            if self._delta_count >= COMPACT_EDGES:
+                self._compact()
+        return len(records)
+
+    def remove_edges(
+        self,
+        sources: list[str],
+        targets: list[str],
+        edge_type: str = "coauthor",
+        symmetric: bool = True,
+    ) -> int:
+        """
+        Remove edges, by appending tombstones that hide them until compaction drops them.
+
+        Args:
+            sources (list[str]): Paper IDs the edges start from.
+            targets (list[str]): Paper IDs the edges point to.
+            edge_type (str): One of EDGE_TYPES.
+            symmetric (bool): Also remove each edge in the reverse direction.
+
+        Returns:
+            int: Number of tombstones appended, counting both directions.
+        """
+        weights = np.full(len(sources), np.nan, dtype=np.float32)
+        return self.add_edges(sources, targets, weights, edge_type, symmetric)
+
+    def compact(self) -> None:
+        """Merge the appended edges into the CSR arrays."""
+        with self._lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh()
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rebuild the CSR arrays with the delta merged in. Requires the exclusive lock."""
+        nodes = len(self.ids)
+        base = len(self.offsets) - 1
+        delta = [
+            (source, target, kind, weight)
+            for source, edges in self._delta.items()
+            for (target, kind), weight in edges.items()
+        ]
+        added = np.array(delta, dtype=np.float64).reshape(-1, 4)
+
+        source = np.concatenate([np.repeat(np.arange(base), np.diff(self.offsets)), added[:, 0]])
+        target = np.concatenate([self.neighbors, added[:, 1]]).astype(np.int32)
+        kind = np.concatenate([self.types, added[:, 2]]).astype(np.uint8)
+        weight = np.concatenate([self.weights, added[:, 3]]).astype(np.float32)
+        newer = np.concatenate([np.zeros(len(self.neighbors)), np.ones(len(added))])
+
+        # Keep the newest weight of each (source, target, type), then order rows by weight
+        order = np.lexsort((newer, kind, target, source))
+        key = np.stack([source[order], target[order], kind[order]])
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = (key[:, 1:] != key[:, :-1]).any(axis=0)
+        order = order[last]
+        order = order[~np.isnan(weight[order])]  # removed edges
+        order = order[np.lexsort((-weight[order], source[order]))]
+
+        offsets = np.zeros(nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source[order].astype(np.int64), minlength=nodes), out=offsets[1:])
+        arrays = {
+            "offsets": offsets,
+            "neighbors": target[order],
+            "weights": weight[order],
+            "types": kind[order],
+        }
+        arrays["centrality"], iterations = pagerank(
+            offsets, arrays["neighbors"], arrays["weights"], start=self.centrality
+        )
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, self.csr_path)
+        self.edges_path.write_bytes(b"")
+        self.offsets, self.neighbors = arrays["offsets"], arrays["neighbors"]
+        self.weights, self.types = arrays["weights"], arrays["types"]
+        self.centrality = arrays["centrality"]
+        self._csr_mtime = self.csr_path.stat().st_mtime_ns
+        self._delta, self._delta_count, self._edges_read = {}, 0, 0
+        self._ranked, self._ranked_at = (self._csr_mtime, 0, nodes), monotonic()
+        logger.info(
+            f"Compacted the graph: {nodes} nodes, {len(self.neighbors)} edges "
+            f"(PageRank refreshed in {iterations} iterations)"
+        )
+
+    def _adjacency(self) -> tuple[NDArray[np.int64], NDArray[np.int32], NDArray[np.float32]]:
+        """Return the CSR arrays of the whole graph, appended edges included."""
+        nodes, rows = len(self.ids), len(self.offsets) - 1
+        pending = np.zeros(nodes, dtype=bool)
+        pending[np.fromiter(self._delta, dtype=np.intp, count=len(self._delta))] = True
+        lengths = np.diff(self.offsets)
+        compacted = np.repeat(~pending[:rows], lengths)
+        sources = [np.repeat(np.arange(rows), lengths)[compacted]]
+        targets = [self.neighbors[compacted]]
+        weights = [self.weights[compacted]]
+        for node in np.flatnonzero(pending).tolist():
+            merged = list(self._edges(node))
+            sources.append(np.full(len(merged), node, dtype=np.intp))
+            targets.append(np.array([target for target, _, _ in merged], dtype=np.int32))
+            weights.append(np.array([weight for _, weight, _ in merged], dtype=np.float32))
+        source = np.concatenate(sources)
+        order = np.argsort(source, kind="stable")
+        offsets = np.zeros(nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=nodes), out=offsets[1:])
+        return offsets, np.concatenate(targets)[order], np.concatenate(weights)[order]
+
+    def _rank(self) -> None:
+        """
+        Bring `centrality` up to date with the nodes and edges, see the class docstring.
+        """
+        nodes = len(self.ids)
+        state = (self._csr_mtime, self._edges_read, nodes)
+        if state == self._ranked:
+            return
+        if monotonic() - self._ranked_at >= CENTRALITY_REFRESH:
+            start = perf_counter()
+            self.centrality, iterations = pagerank(*self._adjacency(), start=self.centrality)
+            self._ranked, self._ranked_at = state, monotonic()
+            logger.debug(
+                f"Refreshed PageRank of {nodes} nodes in {iterations} iterations "
+                f"({(perf_counter() - start) * 1000:.1f} ms)"
+            )
+        elif len(self.centrality) < nodes:
+            # The rank of a paper without incoming edges, until the next refresh
+            added = np.full(nodes - len(self.centrality), (1.0 - DAMPING) / nodes, np.float32)
+            self.centrality = np.concatenate([self.centrality, added])
+
+    def _edges(self, node: int) -> Iterator[tuple[int, float, int]]:
+        """Yield the (neighbor, weight, type) of a node, by decreasing weight."""
+        if node + 1 < len(self.offsets):
+            lo, hi = self.offsets[node], self.offsets[node + 1]
+            compacted = zip(
+                self.neighbors[lo:hi].tolist(),
+                self.weights[lo:hi].tolist(),
+                self.types[lo:hi].tolist(),
+            )
+        else:
+            compacted = iter(())
+        delta = self._delta.get(node)
+        if not delta:
+            yield from compacted
+            return
+        merged = {(target, kind): weight for target, weight, kind in compacted}
+        merged.update(delta)
+        # NaN weights are tombstones of removed edges
+        edges = [item for item in merged.items() if item[1] == item[1]]
+        for (target, kind), weight in sorted(edges, key=lambda item: -item[1]):
+            yield target, weight, kind
+
+    def get_author_paper_ids(
+        self, author_key: str, limit: int | None = None
+    ) -> tuple[int, list[str]]:
+        """
+        Look up the papers of an author in the inverted author index.
+
+        Args:
+            author_key (str): The author key, see `src.models.author_key`.
+            limit (int | None): Return only the IDs of the `limit` latest added papers.
+
+        Returns:
+            tuple[int, list[str]]: The author's number of papers, and the IDs of
+                (the latest of) them, in the order they were added.
+        """
+        with self._lock:
+            self._refresh()
+            nodes = self.author_nodes.get(author_key, [])
+            latest = nodes if limit is None else nodes[len(nodes) - min(limit, len(nodes)) :]
+            return len(nodes), [self.ids[node] for node in latest]
+
+    def get_related_ids(self, paper_id: str) -> list[str]:
+        """
+        Return the IDs of a paper's neighbors, by decreasing edge weight.
+        """
+        with self._lock:
+            self._refresh()
+            node = self.index.get(paper_id)
+            if node is None:
+                return []
+            ids = self.ids
+            if node in self._delta:
+                targets = [target for target, _, _ in self._edges(node)]
+            elif node + 1 < len(self.offsets):
+                targets = self.neighbors[self.offsets[node] : self.offsets[node + 1]].tolist()
+            else:
+                return []
+            # A paper can be linked to a neighbor by edges of several types
+            return list(dict.fromkeys(ids[target] for target in targets))
+
+    def _frontier_edges(
+        self, frontier: NDArray[np.intp]
+    ) -> tuple[NDArray[np.intp], NDArray[np.intp], NDArray[np.float32]]:
+        """Return the sources, targets and weights of all edges leaving a set of nodes."""
+        pending = np.array([node in self._delta for node in frontier.tolist()], dtype=bool)
+        # Nodes added since the last compaction have no CSR row
+        rows = frontier[~pending & (frontier < len(self.offsets) - 1)]
+        # Concatenate the CSR slices of all rows with one gather
+        starts, lengths = self.offsets[rows], self.offsets[rows + 1] - self.offsets[rows]
+        shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        edges = np.arange(int(lengths.sum())) + shift
+        sources: list[NDArray[np.intp]] = [np.repeat(rows, lengths)]
+        targets: list[NDArray[np.intp]] = [self.neighbors[edges].astype(np.intp)]
+        weights: list[NDArray[np.float32]] = [self.weights[edges]]
+        for node in frontier[pending].tolist():
+            merged = list(self._edges(node))
+            sources.append(np.full(len(merged), node, dtype=np.intp))
+            targets.append(np.array([target for target, _, _ in merged], dtype=np.intp))
+            weights.append(np.array([weight for _, weight, _ in merged], dtype=np.float32))
+        return np.concatenate(sources), np.concatenate(targets), np.concatenate(weights)
+
+    def neighbors_many(
+        self,
+        ids: list[str],
+        hops: int = 1,
+        max_nodes: int = MAX_NODES,
+        min_weight: float = 0.0,
+    ) -> list[str]:
+        """
+        Expand a set of papers to the papers within a number of hops, breadth first.
+
+        Each hop gathers the edges of the whole frontier at once. Edges lighter than
+        `min_weight` are not followed, nodes already reached are skipped with a
+        visited bitmap, and the strongest edges of a hop are followed first until
+        `max_nodes` are reached. The cost grows with the edges of the reached nodes,
+        not with the size of the graph.
+
+        Args:
+            ids (list[str]): Paper IDs to start from; unknown IDs are ignored.
+            hops (int): Maximum number of edges between a start paper and a result.
+            max_nodes (int): Maximum number of papers returned, start papers included.
+            min_weight (float): Minimum weight of the edges followed.
+
+        Returns:
+            list[str]: The start papers, then the papers reached at each hop, by
+                decreasing weight of the edge that reached them.
+        """
+        with self._lock:
+            self._refresh()
+            if len(self._visited) < len(self.ids):
+                self._visited = np.zeros(len(self.ids) * 2, dtype=bool)
+            visited = self._visited
+
+            seeds = dict.fromkeys(self.index[i] for i in ids if i in self.index)
+            frontier = np.fromiter(seeds, dtype=np.intp, count=len(seeds))[:max_nodes]
+            reached = [frontier]
+            visited[frontier] = True
+            total = len(frontier)
+            try:
+                for _ in range(hops):
+                    if total >= max_nodes or not len(frontier):
+                        break
+                    _, targets, weights = self._frontier_edges(frontier)
+                    keep = (weights >= min_weight) & ~visited[targets]
+                    targets, weights = targets[keep], weights[keep]
+                    # First occurrence of each target along the strongest edges
+                    targets = targets[np.argsort(-weights, kind="stable")]
+                    _, first = np.unique(targets, return_index=True)
+                    frontier = targets[np.sort(first)][: max_nodes - total]
+                    visited[frontier] = True
+                    reached.append(frontier)
+                    total += len(frontier)
+            finally:
+                for nodes in reached:
+                    visited[nodes] = False
+            paper_ids = self.ids
+            return [paper_ids[node] for node in np.concatenate(reached).tolist()]
+
+    def subgraph(
+        self, ids: list[str]
+    ) -> tuple[NDArray[np.int64], NDArray[np.int32], NDArray[np.float32]]:
+        """
+        Return the edges between some papers, as CSR arrays over their positions.
+
+        Edges of several types between two papers are all kept.
+
+        Args:
+            ids (list[str]): Distinct paper IDs; unknown ones have no edges.
+
+        Returns:
+            tuple[NDArray[np.int64], NDArray[np.int32], NDArray[np.float32]]: Offsets,
+                neighbors (positions in `ids`) and weights.
+        """
+        with self._lock:
+            self._refresh()
+            nodes = np.array([self.index.get(i, -1) for i in ids], dtype=np.intp)
+            positions = np.flatnonzero(nodes >= 0)
+            # Global node -> position in `ids`, through the sorted global nodes
+            by_node = positions[np.argsort(nodes[positions])]
+            known = nodes[by_node]
+            sources, targets, weights = self._frontier_edges(nodes[positions])
+            found = np.searchsorted(known, targets).clip(max=max(len(known) - 1, 0))
+            inside = (known[found] == targets) if len(known) else np.zeros(0, dtype=bool)
+            local_sources = by_node[np.searchsorted(known, sources[inside])]
+            local_targets = by_node[found[inside]]
+            order = np.argsort(local_sources, kind="stable")
+            offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(local_sources, minlength=len(ids)), out=offsets[1:])
+            return offsets, local_targets[order].astype(np.int32), weights[inside][order]
+
+    def get_papers_by_ids(self, ids: list[str]) -> list[SearchResult]:
+        """
+        Return the papers with these IDs from the node table, in order, with their
+        centrality. Unknown IDs are skipped.
+        """
+        with self._lock:
+            self._refresh()
+            self._rank()
+            return [
+                SearchResult(
+                    id=paper_id,
+                    title=self.titles[node],
+                    authors=self.authors[node],
+                    centrality=float(self.centrality[node]),
+                )
+                for paper_id in ids
+                if (node := self.index.get(paper_id)) is not None
+            ]
+
+    def is_healthy(self) -> bool:
+        """
+        Check that the graph directory is writable.
+        """
+        healthy = os.access(self.directory, os.W_OK)
+        if not healthy:
+            logger.error(f"Graph store {self.directory} is not writable.")
+        return healthy
@@ -1,19 +1,103 @@
-from typing import Protocol
-from src.models import SearchResult
+import threading
+from typing import Callable, Protocol
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.config import GRAPH_STORE_BACKEND
+from src.models import Paper, SearchResult
+
+MAX_NODES = 200  # default node budget of a graph expansion
 
 
 class GraphStore(Protocol):
+    def add_papers(self, papers: list[Paper]) -> None: ...
+
+    def add_edges(
+        self,
+        sources: list[str],
+        targets: list[str],
+        weights: list[float],
+        edge_type: str = "coauthor",
+        symmetric: bool = True,
+    ) -> int: ...
+
+    def remove_edges(
+        self,
+        sources: list[str],
+        targets: list[str],
+        edge_type: str = "coauthor",
+        symmetric: bool = True,
+    ) -> int: ...
+
+    def get_author_paper_ids(
+        self, author_key: str, limit: int | None = None
+    ) -> tuple[int, list[str]]: ...
+
     def get_related_ids(self, paper_id: str) -> list[str]: ...
 
+    def neighbors_many(
+        self,
+        ids: list[str],
+        hops: int = 1,
+        max_nodes: int = MAX_NODES,
+        min_weight: float = 0.0,
+    ) -> list[str]: ...
+
+    def subgraph(
+        self, ids: list[str]
+    ) -> tuple[NDArray[np.int64], NDArray[np.int32], NDArray[np.float32]]: ...
+
     def get_papers_by_ids(self, ids: list[str]) -> list[SearchResult]: ...
 
     def is_healthy(self) -> bool: ...
 
 
 class MockStore(GraphStore):
+    def add_papers(self, papers: list[Paper]) -> None:
+        pass
+
+    def add_edges(
+        self,
+        sources: list[str],
+        targets: list[str],
+        weights: list[float],
+        edge_type: str = "coauthor",
+        symmetric: bool = True,
+    ) -> int:
+        return 0
+
+    def remove_edges(
+        self,
+        sources: list[str],
+        targets: list[str],
+        edge_type: str = "coauthor",
+        symmetric: bool = True,
+    ) -> int:
+        return 0
+
+    def get_author_paper_ids(
+        self, author_key: str, limit: int | None = None
+    ) -> tuple[int, list[str]]:
+        return 0, []
+
     def get_related_ids(self, paper_id: str) -> list[str]:
         return []
 
+    def neighbors_many(
+        self,
+        ids: list[str],
+        hops: int = 1,
+        max_nodes: int = MAX_NODES,
+        min_weight: float = 0.0,
+    ) -> list[str]:
+        return []
+
+    def subgraph(
+        self, ids: list[str]
+    ) -> tuple[NDArray[np.int64], NDArray[np.int32], NDArray[np.float32]]:
+        return np.zeros(len(ids) + 1, np.int64), np.empty(0, np.int32), np.empty(0, np.float32)
+
     def get_papers_by_ids(self, ids: list[str]) -> list[SearchResult]:
         return []
 
@@ -21,5 +105,31 @@ class MockStore(GraphStore):
         return True
 
 
-def get_graph_store() -> GraphStore:
-    return MockStore()
+def csr_graph_store() -> GraphStore:
+    # Imported here, as the CSR store module builds on this one
+    from src.store.csr_graph import CSRGraphStore
+
+    return CSRGraphStore()
+
+
+GRAPH_STORE: dict[str, Callable[[], GraphStore]] = {
+    "csr": csr_graph_store,
+    "mock": MockStore,
+}
+
+
+_graph_stores: dict[str, GraphStore] = {}
+_graph_stores_lock = threading.Lock()
+
+
+def get_graph_store(backend: str = GRAPH_STORE_BACKEND) -> GraphStore:
+    """
+    Get the graph store instance based on the backend specified.
+    Defaults to the GRAPH_STORE_BACKEND setting. Instances are shared per process.
+    """
+    if backend not in GRAPH_STORE:
+        raise ValueError(f"Unsupported graph store backend: {backend}")
+    with _graph_stores_lock:
+        if backend not in _graph_stores:
+            _graph_stores[backend] = GRAPH_STORE[backend]()
+        return _graph_stores[backend]
@@ -1,5 +1,6 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Iterator
 
 from sqlalchemy import create_engine
 from sqlalchemy.dialects.postgresql import insert as pg_insert
@@ -7,8 +8,18 @@ from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
 
 from src.config import PAPER_INDEX_PATH
-from src.models import PaperState
-from src.store.models import Base, Paper, PaperHistory
+from src.models import PaperState, PaperStatus
+from src.models import VectorMigration as VectorMigrationState
+from src.store.models import Base, Paper, PaperHistory, QueryCursor, VectorMigration
+
+# Maximum number of bound parameters per IN query, well below SQLite's limit
+IN_CHUNK_SIZE = 500
+
+
+def chunked(items: list[str], size: int = IN_CHUNK_SIZE) -> Iterator[list[str]]:
+    """Yield successive slices of `items` of at most `size` elements."""
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
 
 
 class PaperIndex:
@@ -26,6 +37,16 @@ class PaperIndex:
         Base.metadata.create_all(self.engine)
         self.Session = sessionmaker(bind=self.engine, future=True)
 
+    def _history_insert(self, states: list[PaperState]) -> Any:
+        """Build a PaperHistory insert that ignores ids already recorded."""
+        # Use an upsert for PaperHistory to avoid UNIQUE constraint violations
+        insert = pg_insert if self.engine.url.get_backend_name() == "postgresql" else sqlite_insert
+        return (
+            insert(PaperHistory)
+            .values([{"id": s.id, "state": s.status} for s in states])
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+
     def get(self, paper_id: str) -> PaperState | None:
         """Get the state of a paper by its ID."""
         with self.Session() as session:
@@ -34,6 +55,45 @@ class PaperIndex:
                 return None
             return PaperState.model_validate(paper)
 
+    def get_many(self, paper_ids: list[str]) -> dict[str, PaperState]:
+        """
+        Get the states of several papers in one session, with one IN query per chunk of IDs.
+        Unknown IDs are omitted from the result.
+        """
+        states: dict[str, PaperState] = {}
+        if not paper_ids:
+            return states
+        with self.Session() as session:
+            for chunk in chunked(list(dict.fromkeys(paper_ids))):
+                for paper in session.query(Paper).filter(Paper.id.in_(chunk)):
+                    states[str(paper.id)] = PaperState.model_validate(paper)
+        return states
+
+    def get_ids(
+        self,
+        after: str | None = None,
+        limit: int = IN_CHUNK_SIZE,
+        status: PaperStatus | None = None,
+    ) -> list[str]:
+        """
+        Page through paper IDs in ID order, e.g. to revisit every indexed paper.
+
+        Args:
+            after (str | None): Return IDs strictly greater than this one.
+            limit (int): Maximum number of IDs to return.
+            status (PaperStatus | None): Only return papers in this state.
+
+        Returns:
+            list[str]: The IDs, sorted.
+        """
+        with self.Session() as session:
+            query = session.query(Paper.id)
+            if after is not None:
+                query = query.filter(Paper.id > after)
+            if status is not None:
+                query = query.filter(Paper.status == status)
+            return [str(row.id) for row in query.order_by(Paper.id).limit(limit)]
+
     def set(self, paper_state: PaperState) -> None:
         """Set the state of a paper."""
         now = paper_state.last_seen or datetime.now()
@@ -54,30 +114,28 @@ class PaperIndex:
                 paper_instance.in_graph = paper_state.in_graph  # type: ignore
                 paper_instance.last_seen = now  # type: ignore
 
-            # Use an upsert for PaperHistory to avoid UNIQUE constraint violations
-            stmt = (
-                (
-                    pg_insert
-                    if self.engine.url.get_backend_name() == "postgresql"
-                    else sqlite_insert
-                )(PaperHistory)
-                .values(id=paper_state.id, state=paper_state.status)
-                .on_conflict_do_nothing(index_elements=["id"])
-            )
-
-            session.execute(stmt)
+            session.execute(self._history_insert([paper_state]))
             session.commit()
 
-    def set_many(self, states: list[PaperState]) -> None:
-        """Set the state of multiple papers."""
+    def set_many(self, states: list[PaperState], overwrite: bool = True) -> None:
+        """
+        Set the state of multiple papers.
+
+        If `overwrite` is False, papers that are already in the index are left untouched.
+        """
         ids = [s.id for s in states]
         now = datetime.now()
         with self.Session() as session:
-            existing_papers = session.query(Paper).filter(Paper.id.in_(ids)).all()
-            existing_map = {p.id: p for p in existing_papers}
+            existing_map = {
+                p.id: p
+                for chunk in chunked(ids)
+                for p in session.query(Paper).filter(Paper.id.in_(chunk))
+            }
 
             for s in states:
                 obj = existing_map.get(s.id)
+                if obj is not None and not overwrite:
+                    continue
                 if obj is None:
                     obj = Paper(
                         id=s.id,
@@ -86,13 +144,54 @@ class PaperIndex:
                         last_seen=now,
                     )
                     session.add(obj)
+                    existing_map[s.id] = obj
                 else:
                     obj.status = s.status  # type: ignore
                     obj.in_graph = s.in_graph  # type: ignore
                     obj.last_seen = now  # type: ignore
 
-                session.add(PaperHistory(id=s.id, state=s.status))
+            if states:
+                session.execute(self._history_insert(states))
+            session.commit()
 
+    def get_cursor(self, query: str) -> datetime | None:
+        """Get the newest `updated` timestamp seen for a normalized query, in UTC."""
+        with self.Session() as session:
+            row = session.get(QueryCursor, query)
+            if row is None or row.cursor is None:
+                return None
+            return row.cursor.replace(tzinfo=timezone.utc)  # type: ignore
+
+    def set_cursor(self, query: str, cursor: datetime) -> None:
+        """Set the newest `updated` timestamp seen for a normalized query."""
+        # Stored as naive UTC, since SQLite doesn't keep timezones
+        if cursor.tzinfo is not None:
+            cursor = cursor.astimezone(timezone.utc).replace(tzinfo=None)
+        with self.Session() as session:
+            row = session.get(QueryCursor, query)
+            if row is None:
+                session.add(QueryCursor(query=query, cursor=cursor))
+            else:
+                row.cursor = cursor  # type: ignore
+                row.timestamp = datetime.now()  # type: ignore
+            session.commit()
+
+    def get_migration(self, alias: str) -> VectorMigrationState | None:
+        """Get the re-embedding in progress for a vector collection alias, if any."""
+        with self.Session() as session:
+            row = session.get(VectorMigration, alias)
+            return VectorMigrationState.model_validate(row) if row is not None else None
+
+    def set_migration(self, migration: VectorMigrationState) -> None:
+        """Record a re-embedding, or its progress."""
+        with self.Session() as session:
+            session.merge(VectorMigration(**migration.model_dump(), timestamp=datetime.now()))
+            session.commit()
+
+    def delete_migration(self, alias: str) -> None:
+        """Forget the re-embedding of an alias, once it is finished or abandoned."""
+        with self.Session() as session:
+            session.query(VectorMigration).filter(VectorMigration.alias == alias).delete()
             session.commit()
 
     def is_healthy(self) -> bool:
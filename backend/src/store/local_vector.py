@@ -0,0 +1,524 @@
+"""
+Embedded vector store that keeps vectors in local files, for tests, dev runs and
+small deployments without a Qdrant container.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+from src.config import EMBEDDING_MODEL, LOCAL_VECTOR_DIR, LOCAL_VECTOR_HNSW
+from src.models import Paper, SearchFilter, SearchResult
+from src.store.vector import (
+    COLLECTION_NAME,
+    SCROLL_BATCH,
+    VECTOR_DIM,
+    VectorStore,
+    paper_payload,
+)
+
+KEY_SIZE = 16  # bytes of BLAKE2b digest of the paper ID per row
+SEARCH_BLOCK_ROWS = 65_536  # rows per matrix product, ~100 MB of float32 at 384 dims
+HNSW_BATCH_ROWS = 10_000  # rows missing from the HNSW graph before it is updated
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+HNSW_OVERFETCH = 4  # extra HNSW candidates, so superseded rows can be dropped
+NO_DATE = np.iinfo(np.int64).min  # published.i64 value of papers without a date
+NO_CATEGORY = 0  # category.u64 value of papers without a primary category
+
+
+def normalize(vectors: NDArray[np.float32]) -> NDArray[np.float32]:
+    """L2-normalize vectors along the last axis, so dot products are cosine similarities."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    normalized: NDArray[np.float32] = (vectors / np.clip(norms, 1e-12, None)).astype(np.float32)
+    return normalized
+
+
+def epoch_seconds(value: datetime | None) -> int:
+    """Convert a datetime to Unix seconds, reading naive datetimes as UTC."""
+    if value is None:
+        return int(NO_DATE)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def category_code(category: str | None) -> int:
+    """Hash a category name to the 8-byte code stored in category.u64."""
+    if not category:
+        return NO_CATEGORY
+    digest = hashlib.blake2b(category.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def top_k_indices(scores: NDArray[np.float32], k: int) -> NDArray[np.intp]:
+    """Return the positions of the `k` highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store backed by append-only, memory-mapped files.
+
+    Each collection directory holds:
+        - `vectors.f32`: one L2-normalized float32 row per upsert,
+        - `keys.bin`: the digest of each row's paper ID; appending it commits the row,
+        - `payloads.jsonl` and `offsets.i64`: each row's payload and its byte offset,
+        - `alive.u8`: 0 for rows superseded by a later upsert of the same paper,
+        - `published.i64` and `category.u64`: filterable columns, as Unix seconds and
+          a hash of the primary category.
+
+    Opening only maps the files, so it is instant whatever the size, and rows are
+    paged in by the OS as they are scored. Search is an exact scan in blocks, or,
+    with `hnsw=True`, an HNSW graph (hnswlib) over most rows plus an exact scan of
+    the rows added since the graph was last updated.
+
+    Filtered searches are exact: an author filter scores only the rows of an
+    in-memory author key -> rows index, other conditions mask rows in the scan.
+
+    Appends take an exclusive file lock, so a worker can write while the API
+    searches the same directory.
+    """
+
+    def __init__(
+        self,
+        directory: Path = LOCAL_VECTOR_DIR,
+        collection: str = COLLECTION_NAME,
+        dim: int = VECTOR_DIM,
+        hnsw: bool = LOCAL_VECTOR_HNSW,
+    ):
+        self.dim = dim
+        self.hnsw = hnsw
+        self.embedding_model = EMBEDDING_MODEL
+        self.directory = directory / collection
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.keys_path = self.directory / "keys.bin"
+        self.payloads_path = self.directory / "payloads.jsonl"
+        self.offsets_path = self.directory / "offsets.i64"
+        self.alive_path = self.directory / "alive.u8"
+        self.published_path = self.directory / "published.i64"
+        self.category_path = self.directory / "category.u64"
+        self.hnsw_path = self.directory / "hnsw.bin"
+        self.lock_path = self.directory / "lock"
+        for path in (
+            self.vectors_path,
+            self.keys_path,
+            self.payloads_path,
+            self.offsets_path,
+            self.alive_path,
+            self.published_path,
+            self.category_path,
+        ):
+            path.touch()
+
+        self._lock = threading.Lock()
+        self._count = 0  # committed rows, i.e. entries in keys.bin
+        self._vectors: np.memmap | None = None
+        self._offsets: np.memmap | None = None
+        self._alive: np.memmap | None = None
+        self._published: np.memmap | None = None
+        self._category: np.memmap | None = None
+        self._authors: dict[str, list[int]] = {}  # author key -> rows, built on first use
+        self._authors_count = 0
+        self._rows: dict[bytes, int] = {}  # paper key -> latest row, only kept by writers
+        self._rows_count = 0
+        self._graph: Any = None
+        self._graph_mtime = 0
+        self._backfill_columns()
+        self._refresh()
+
+    @staticmethod
+    def key(paper_id: str) -> bytes:
+        return hashlib.blake2b(paper_id.encode(), digest_size=KEY_SIZE).digest()
+
+    def __len__(self) -> int:
+        """Return the number of distinct papers in the store."""
+        self._refresh()
+        return int(self._alive.sum()) if self._alive is not None else 0
+
+    def _refresh(self) -> None:
+        """Map rows committed since the last refresh, possibly by another process."""
+        count = self.keys_path.stat().st_size // KEY_SIZE
+        if count == self._count and (self._vectors is not None or count == 0):
+            return
+        self._count = count
+        if count:
+            self._vectors = np.memmap(self.vectors_path, np.float32, "r", shape=(count, self.dim))
+            self._offsets = np.memmap(self.offsets_path, np.int64, "r", shape=(count,))
+            self._alive = np.memmap(self.alive_path, np.uint8, "r", shape=(count,))
+            self._published = np.memmap(self.published_path, np.int64, "r", shape=(count,))
+            self._category = np.memmap(self.category_path, np.uint64, "r", shape=(count,))
+
+    def _backfill_columns(self) -> None:
+        """Fill the filter columns of rows written before they existed, from the payloads."""
+        rows = self.keys_path.stat().st_size // KEY_SIZE
+        if self.published_path.stat().st_size >= rows * 8:
+            return
+        with self._lock, self.lock_path.open("w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            rows = self.keys_path.stat().st_size // KEY_SIZE
+            with self.payloads_path.open("rb") as f:
+                payloads = [json.loads(f.readline()) for _ in range(rows)]
+            published = [
+                epoch_seconds(
+                    datetime.fromisoformat(p["published"]) if p.get("published") else None
+                )
+                for p in payloads
+            ]
+            categories = [category_code(p.get("primary_category")) for p in payloads]
+            self.published_path.write_bytes(np.asarray(published, dtype=np.int64).tobytes())
+            self.category_path.write_bytes(np.asarray(categories, dtype=np.uint64).tobytes())
+        logger.info(f"Backfilled the filter columns of {rows} rows in {self.directory}")
+
+    def _sync_rows(self) -> dict[bytes, int]:
+        """Bring the paper key -> row map up to date with keys.bin."""
+        with self.keys_path.open("rb") as f:
+            f.seek(self._rows_count * KEY_SIZE)
+            data = f.read((self._count - self._rows_count) * KEY_SIZE)
+        for offset in range(0, len(data), KEY_SIZE):
+            # Later rows of the same paper replace earlier ones
+            self._rows[data[offset : offset + KEY_SIZE]] = self._rows_count
+            self._rows_count += 1
+        return self._rows
+
+    def _payload_end(self, rows: int) -> int:
+        """Return the byte offset just past the payload of the first `rows` rows."""
+        if rows == 0 or self._offsets is None:
+            return 0
+        with self.payloads_path.open("rb") as f:
+            f.seek(int(self._offsets[rows - 1]))
+            f.readline()
+            return f.tell()
+
+    def index(self, papers: list[Paper], vectors: NDArray[np.float32]) -> list[str]:
+        """
+        Append the papers and their vectors, superseding earlier rows of the same papers.
+
+        Writes are all or nothing, so no IDs are ever reported as failed.
+
+        Returns:
+            list[str]: IDs of the papers that could not be indexed (always empty).
+        """
+        if not papers:
+            return []
+        rows = normalize(np.asarray(vectors, dtype=np.float32).reshape(len(papers), self.dim))
+        lines = [json.dumps(paper_payload(paper)).encode() + b"\n" for paper in papers]
+        published = np.array([epoch_seconds(paper.published) for paper in papers], dtype=np.int64)
+        categories = np.array(
+            [category_code(paper.primary_category) for paper in papers], dtype=np.uint64
+        )
+
+        with self._lock, self.lock_path.open("w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._refresh()
+            latest = self._sync_rows()
+            first = self._count
+
+            # Data first, keys last, so readers never see a key without its row.
+            # Anything past the last committed key was left by an interrupted append.
+            start = self._payload_end(first)
+            offsets = start + np.cumsum([0] + [len(line) for line in lines[:-1]], dtype=np.int64)
+            for path, size, data in (
+                (self.vectors_path, first * self.dim * 4, rows.tobytes()),
+                (self.payloads_path, start, b"".join(lines)),
+                (self.offsets_path, first * 8, offsets.tobytes()),
+                (self.alive_path, first, b"\x01" * len(papers)),
+                (self.published_path, first * 8, published.tobytes()),
+                (self.category_path, first * 8, categories.tobytes()),
+            ):
+                with path.open("r+b") as f:
+                    f.truncate(size)
+                    f.seek(size)
+                    f.write(data)
+            with self.keys_path.open("ab") as f:
+                f.write(b"".join(self.key(paper.id) for paper in papers))
+
+            superseded: list[int] = []
+            for row, paper in enumerate(papers, start=first):
+                previous = latest.get(self.key(paper.id))
+                if previous is not None:
+                    superseded.append(previous)
+                latest[self.key(paper.id)] = row
+            self._rows_count = first + len(papers)
+            if superseded:
+                with self.alive_path.open("r+b") as f:
+                    for row in superseded:
+                        f.seek(row)
+                        f.write(b"\x00")
+
+            self._refresh()
+            if self.hnsw and self._count - self._graph_count() >= HNSW_BATCH_ROWS:
+                self.update_hnsw()
+
+        logger.info(f"Indexed {len(papers)} papers into {self.directory}")
+        return []
+
+    def _load_graph(self) -> Any:
+        """Return the saved HNSW graph, reloading it if it was updated on disk."""
+        if not self.hnsw_path.exists():
+            return None
+        mtime = self.hnsw_path.stat().st_mtime_ns
+        if self._graph is None or mtime != self._graph_mtime:
+            import hnswlib
+
+            graph = hnswlib.Index(space="ip", dim=self.dim)
+            graph.load_index(str(self.hnsw_path))
+            self._graph, self._graph_mtime = graph, mtime
+        return self._graph
+
+    def _graph_count(self) -> int:
+        graph = self._load_graph()
+        return int(graph.get_current_count()) if graph is not None else 0
+
+    def update_hnsw(self) -> None:
+        """
+        Add the rows missing from the HNSW graph and save it.
+
+        The graph is updated on a fresh copy and swapped in atomically, so searches
+        keep using the previous graph meanwhile.
+        """
+        import hnswlib
+
+        self._refresh()
+        if self._vectors is None:
+            return
+        graph = hnswlib.Index(space="ip", dim=self.dim)
+        if self.hnsw_path.exists():
+            graph.load_index(str(self.hnsw_path), max_elements=self._count)
+        else:
+            graph.init_index(
+                max_elements=self._count, M=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION
+            )
+        start = graph.get_current_count()
+        if start >= self._count:
+            return
+        logger.info(f"Adding {self._count - start} rows to the HNSW graph...")
+        graph.resize_index(self._count)
+        graph.add_items(self._vectors[start:], np.arange(start, self._count))
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        graph.save_index(tmp)
+        os.replace(tmp, self.hnsw_path)
+
+    def _scan(
+        self,
+        queries: NDArray[np.float32],
+        start: int,
+        stop: int,
+        k: int,
+        search_filter: SearchFilter | None = None,
+    ) -> tuple[NDArray[np.intp], NDArray[np.float32]]:
+        """
+        Exactly score rows `start` to `stop` for all queries at once, block by block.
+        Rows that don't match `search_filter` score -inf.
+
+        Returns:
+            tuple[NDArray[np.intp], NDArray[np.float32]]: Candidate rows and their
+                scores, one row per query, holding each block's top k.
+        """
+        assert self._vectors is not None and self._alive is not None
+        rows: list[NDArray[np.intp]] = [np.empty((len(queries), 0), dtype=np.intp)]
+        scores: list[NDArray[np.float32]] = [np.empty((len(queries), 0), dtype=np.float32)]
+        for lo in range(start, stop, SEARCH_BLOCK_ROWS):
+            hi = min(lo + SEARCH_BLOCK_ROWS, stop)
+            block = self._vectors[lo:hi] @ queries.T  # (rows, queries)
+            block[~self._matches(np.arange(lo, hi), search_filter)] = -np.inf
+            kk = min(k, hi - lo)
+            best = np.argpartition(-block, kk - 1, axis=0)[:kk]
+            rows.append(best.T + lo)
+            scores.append(np.take_along_axis(block, best, axis=0).T)
+        return np.concatenate(rows, axis=1), np.concatenate(scores, axis=1)
+
+    def _score_rows(
+        self, queries: NDArray[np.float32], rows: NDArray[np.intp], k: int
+    ) -> tuple[NDArray[np.intp], NDArray[np.float32]]:
+        """Exactly score the given rows for all queries, keeping each query's top k."""
+        assert self._vectors is not None
+        scores = np.full((len(queries), len(rows)), -np.inf, dtype=np.float32)
+        for lo in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            block = rows[lo : lo + SEARCH_BLOCK_ROWS]
+            scores[:, lo : lo + len(block)] = queries @ self._vectors[block].T
+        kk = min(k, len(rows))
+        if kk == 0:
+            return rows[np.newaxis, :].repeat(len(queries), axis=0), scores
+        best = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        return rows[best], np.take_along_axis(scores, best, axis=1)
+
+    def _matches(
+        self, rows: NDArray[np.intp], search_filter: SearchFilter | None
+    ) -> NDArray[np.bool_]:
+        """Return which of the rows are alive and match the date and category conditions."""
+        assert self._alive is not None and self._published is not None
+        assert self._category is not None
+        mask = self._alive[rows] == 1
+        if search_filter is None:
+            return mask
+        if search_filter.published_from is not None or search_filter.published_to is not None:
+            published = self._published[rows]
+            mask &= published != NO_DATE
+            if search_filter.published_from is not None:
+                mask &= published >= epoch_seconds(search_filter.published_from)
+            if search_filter.published_to is not None:
+                mask &= published <= epoch_seconds(search_filter.published_to)
+        if search_filter.categories is not None:
+            codes = np.array([category_code(c) for c in search_filter.categories], dtype=np.uint64)
+            mask &= np.isin(self._category[rows], codes)
+        return mask
+
+    def _author_rows(self, keys: list[str]) -> NDArray[np.intp]:
+        """Return the rows of papers by any of the authors, syncing the author index first."""
+        if self._authors_count < self._count:
+            assert self._offsets is not None
+            # New rows are read in one sequential pass over their payloads
+            with self.payloads_path.open("rb") as f:
+                f.seek(int(self._offsets[self._authors_count]))
+                for row in range(self._authors_count, self._count):
+                    for key in json.loads(f.readline()).get("author_keys", []):
+                        self._authors.setdefault(key, []).append(row)
+            self._authors_count = self._count
+        rows = [row for key in set(keys) for row in self._authors.get(key, [])]
+        return np.unique(np.asarray(rows, dtype=np.intp))
+
+    def _payload(self, row: int) -> dict[str, Any]:
+        assert self._offsets is not None
+        with self.payloads_path.open("rb") as f:
+            f.seek(int(self._offsets[row]))
+            payload: dict[str, Any] = json.loads(f.readline())
+        return payload
+
+    def search(
+        self,
+        query_vector: NDArray[np.float32],
+        top_k: int = 5,
+        hnsw_ef: int | None = None,
+        rescore: bool | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[SearchResult]:
+        """
+        Search for the nearest papers.
+
+        `hnsw_ef` overrides the HNSW candidate list size; `rescore` is accepted for
+        compatibility and ignored, since vectors are not quantized.
+        """
+        query = np.asarray(query_vector, dtype=np.float32).reshape(1, self.dim)
+        return self.search_many(query, top_k, hnsw_ef, rescore, search_filter)[0]
+
+    def search_many(
+        self,
+        query_vectors: NDArray[np.float32],
+        top_k: int = 5,
+        hnsw_ef: int | None = None,
+        rescore: bool | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[list[SearchResult]]:
+        """
+        Search for the nearest papers of several queries, scored together.
+
+        With a `search_filter`, the search is exact and skips the HNSW graph. An author
+        condition limits scoring to those authors' rows, so it costs time proportional
+        to their papers rather than to the store.
+
+        Returns:
+            list[list[SearchResult]]: The results of each query, in query order.
+        """
+        queries = normalize(np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dim))
+        with self._lock:
+            self._refresh()
+            if self._alive is None:
+                return [[] for _ in queries]
+
+            author_keys = search_filter.author_keys() if search_filter is not None else None
+            graph = self._load_graph() if self.hnsw and search_filter is None else None
+            graph_rows = int(graph.get_current_count()) if graph is not None else 0
+            if author_keys is not None:
+                rows = self._author_rows(author_keys)
+                rows = rows[self._matches(rows, search_filter)]
+                candidates = [self._score_rows(queries, rows, top_k)]
+            else:
+                candidates = [self._scan(queries, graph_rows, self._count, top_k, search_filter)]
+            if graph_rows:
+                k = min(graph_rows, top_k * HNSW_OVERFETCH)
+                graph.set_ef(max(hnsw_ef or HNSW_EF_SEARCH, k))
+                labels, distances = graph.knn_query(queries, k=k)
+                rows = labels.astype(np.intp)
+                # Inner product distance is 1 - dot product
+                scores = np.where(self._alive[rows] == 1, 1 - distances, -np.inf)
+                candidates.append((rows, scores.astype(np.float32)))
+
+            rows = np.concatenate([rows for rows, _ in candidates], axis=1)
+            scores = np.concatenate([scores for _, scores in candidates], axis=1)
+            results: list[list[SearchResult]] = []
+            for query_rows, query_scores in zip(rows, scores):
+                best = top_k_indices(query_scores, top_k)
+                results.append(
+                    [
+                        self._result(int(query_rows[i]), float(query_scores[i]))
+                        for i in best
+                        if np.isfinite(query_scores[i])
+                    ]
+                )
+
+        logger.info(f"Searched {self._count} local vectors for {len(queries)} queries")
+        return results
+
+    def iter_vectors(
+        self, batch_size: int = SCROLL_BATCH
+    ) -> Iterator[tuple[list[str], NDArray[np.float32]]]:
+        """
+        Read the latest vector of every paper, in row order.
+
+        Args:
+            batch_size (int): Rows read per step.
+
+        Yields:
+            tuple[list[str], NDArray[np.float32]]: Paper IDs and their vectors, one block at a time.
+        """
+        self._refresh()
+        count = self._count
+        if count == 0:
+            return
+        assert self._vectors is not None and self._alive is not None
+        with self.payloads_path.open("rb") as f:
+            for lo in range(0, count, batch_size):
+                hi = min(lo + batch_size, count)
+                # Payloads are read sequentially, superseded rows included
+                ids = [json.loads(f.readline())["paper_id"] for _ in range(lo, hi)]
+                alive = np.flatnonzero(self._alive[lo:hi])
+                if len(alive):
+                    yield [ids[i] for i in alive], np.array(self._vectors[lo:hi][alive])
+
+    def _result(self, row: int, score: float) -> SearchResult:
+        payload = self._payload(row)
+        return SearchResult(
+            id=payload["paper_id"],
+            title=payload.get("title", ""),
+            authors=payload.get("authors", []),
+            score=score,
+            related_ids=payload.get("related_ids", []),
+        )
+
+    def is_healthy(self) -> bool:
+        """
+        Check that the store directory is writable.
+        """
+        healthy = os.access(self.directory, os.W_OK)
+        if not healthy:
+            logger.error(f"Local vector store {self.directory} is not writable.")
+        return healthy
@@ -0,0 +1,353 @@
+"""
+Re-embedding of the vector collection with another embedding model, without
+search downtime.
+
+Searches and writes go through the `papers` alias. A migration:
+    1. `start` creates the versioned collection of the new model and records the
+       migration in the paper index. From then on workers dual-write: each batch
+       they index is also embedded with the new model into the new collection.
+    2. `run` is the background job: it pages through the embedded papers of the
+       paper index in ID order, fetches them from arXiv (through the response
+       cache) and re-embeds them into the new collection, at most REEMBED_RATE
+       papers per second. Progress is saved after each batch, so it resumes.
+    3. `finish` checks the new collection is complete and swaps the alias to it
+       in one atomic operation. The old collection is kept, so swapping back is
+       a rollback.
+
+Searches follow the alias, so they never see the new collection before it is
+complete, and embed queries with the model of the collection they search.
+
+`backfill` completes the payloads of points written before searches could be
+filtered, which lack the `published`, `primary_category` and `author_keys`
+fields and are otherwise dropped by every filtered search. It is resumable, as
+it only visits points still missing them.
+
+Usage:
+    python -m src.store.migration start MODEL DIM
+    python -m src.store.migration run [--rate 10] [--batch-size 100]
+    python -m src.store.migration finish [--drop-legacy]
+    python -m src.store.migration status
+    python -m src.store.migration backfill [--batch-size 100]
+"""
+
+import argparse
+import threading
+from time import monotonic, sleep
+from typing import Callable
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    Filter,
+    IsEmptyCondition,
+    PayloadField,
+    SetPayload,
+    SetPayloadOperation,
+)
+
+from src.arxiv import fetch_papers_by_id
+from src.config import REEMBED_BATCH_SIZE, REEMBED_RATE
+from src.embedder import embed_papers
+from src.models import Paper, PaperStatus, VectorMigration
+from src.store import get_paper_index
+from src.store.vector import (
+    COLLECTION_NAME,
+    PAYLOAD_INDEXES,
+    QdrantVectorStore,
+    collection_version,
+    get_alias_target,
+    get_qdrant_client,
+    host,
+    paper_payload,
+    port,
+    swap_alias,
+)
+
+MIGRATION_REFRESH = 30.0  # seconds a worker trusts the migration state it last read
+
+_active: dict[str, tuple[float, VectorMigration | None]] = {}
+_target_stores: dict[str, QdrantVectorStore] = {}
+
+
+def get_active_migration(alias: str = COLLECTION_NAME) -> VectorMigration | None:
+    """Return the migration in progress for an alias, re-read at most every MIGRATION_REFRESH s."""
+    read_at, migration = _active.get(alias, (0.0, None))
+    if alias not in _active or monotonic() - read_at > MIGRATION_REFRESH:
+        migration = get_paper_index().get_migration(alias)
+        _active[alias] = (monotonic(), migration)
+    return migration
+
+
+def get_target_store(
+    migration: VectorMigration, client: QdrantClient | None = None
+) -> QdrantVectorStore:
+    """Return the (shared) store writing to a migration's new collection."""
+    if migration.target not in _target_stores:
+        _target_stores[migration.target] = QdrantVectorStore(
+            client=client or get_qdrant_client(host, port),
+            collection=migration.target,
+            dim=migration.dim,
+        )
+    return _target_stores[migration.target]
+
+
+def dual_write(papers: list[Paper], vectors: NDArray[np.float32], model_name: str) -> None:
+    """
+    Also index freshly embedded papers into the collection being migrated to, if any.
+
+    Failures are logged rather than raised, so the live write is never affected.
+
+    Args:
+        papers (list[Paper]): Papers just indexed into the live collection.
+        vectors (NDArray[np.float32]): Their embeddings, made with `model_name`.
+        model_name (str): The model the vectors were embedded with.
+    """
+    migration = get_active_migration()
+    if migration is None:
+        return
+    try:
+        if migration.model != model_name:
+            vectors = embed_papers(papers, migration.model)
+        get_target_store(migration).index(papers, vectors)
+    except Exception as e:
+        logger.error(f"Dual write to '{migration.target}' failed: {e}")
+
+
+def start_migration(
+    model_name: str, dim: int, alias: str = COLLECTION_NAME, client: QdrantClient | None = None
+) -> VectorMigration:
+    """
+    Create the collection of a new embedding model and start dual-writing to it.
+
+    Args:
+        model_name (str): The new embedding model.
+        dim (int): Its embedding dimension.
+        alias (str): The alias whose collection is replaced.
+        client (QdrantClient | None): Qdrant client. Defaults to the shared one.
+
+    Returns:
+        VectorMigration: The recorded migration, or the one already in progress.
+
+    Raises:
+        ValueError: If another migration is in progress, or the alias already
+            serves this model.
+    """
+    client = client or get_qdrant_client(host, port)
+    paper_index = get_paper_index()
+    target = collection_version(model_name, dim, alias)
+    existing = paper_index.get_migration(alias)
+    if existing is not None:
+        if existing.target == target:
+            return existing
+        raise ValueError(f"A migration of '{alias}' to '{existing.target}' is in progress")
+    if get_alias_target(client, alias) == target:
+        raise ValueError(f"'{alias}' already points at '{target}'")
+
+    migration = VectorMigration(alias=alias, target=target, model=model_name, dim=dim)
+    get_target_store(migration, client)  # creates the collection
+    paper_index.set_migration(migration)
+    _active.pop(alias, None)
+    logger.success(f"Started migrating '{alias}' to '{target}'; workers now dual-write")
+    return migration
+
+
+def reembed(
+    alias: str = COLLECTION_NAME,
+    batch_size: int = REEMBED_BATCH_SIZE,
+    rate: float = REEMBED_RATE,
+    fetch: Callable[[list[str]], list[Paper]] = fetch_papers_by_id,
+    client: QdrantClient | None = None,
+    stop: threading.Event | None = None,
+) -> int:
+    """
+    Fill the new collection of a migration with every embedded paper, throttled.
+
+    Args:
+        alias (str): The alias being migrated.
+        batch_size (int): Paper IDs read, fetched and embedded per step.
+        rate (float): Maximum papers per second, to spare arXiv, the model and Qdrant.
+        fetch (Callable[[list[str]], list[Paper]]): Fetches papers by ID.
+        client (QdrantClient | None): Qdrant client. Defaults to the shared one.
+        stop (threading.Event | None): Set to stop after the current batch.
+
+    Returns:
+        int: Number of papers re-embedded by this call.
+
+    Raises:
+        ValueError: If no migration is in progress.
+    """
+    paper_index = get_paper_index()
+    migration = paper_index.get_migration(alias)
+    if migration is None:
+        raise ValueError(f"No migration of '{alias}' in progress")
+    store = get_target_store(migration, client)
+
+    done = 0
+    while not migration.done and not (stop is not None and stop.is_set()):
+        started = monotonic()
+        ids = paper_index.get_ids(migration.cursor, batch_size, PaperStatus.EMBEDDED)
+        if ids:
+            papers = fetch(ids)
+            if len(papers) < len(ids):
+                logger.warning(f"{len(ids) - len(papers)} of {len(ids)} papers were not found")
+            if papers:
+                store.index(papers, embed_papers(papers, migration.model))
+            done += len(papers)
+            migration.cursor = ids[-1]
+        migration.done = len(ids) < batch_size
+        paper_index.set_migration(migration)
+        logger.info(
+            f"Re-embedded {done} papers into '{migration.target}' (up to {migration.cursor})"
+        )
+        # Throttle to `rate` papers per second
+        delay = max(0.0, len(ids) / rate - (monotonic() - started))
+        if stop is not None:
+            stop.wait(delay)
+        else:
+            sleep(delay)
+
+    if migration.done:
+        logger.success(f"Re-embedding into '{migration.target}' is complete")
+    return done
+
+
+def finish_migration(
+    alias: str = COLLECTION_NAME, client: QdrantClient | None = None, drop_legacy: bool = False
+) -> str:
+    """
+    Point the alias at the migrated collection, once the re-embedding is complete.
+
+    Args:
+        alias (str): The alias being migrated.
+        client (QdrantClient | None): Qdrant client. Defaults to the shared one.
+        drop_legacy (bool): Delete an unversioned collection named like the alias,
+            from before aliases, so the alias can take its name. Searches fail for
+            the moment between the delete and the alias creation.
+
+    Returns:
+        str: The collection the alias now points at.
+
+    Raises:
+        ValueError: If no migration is in progress, it isn't complete, or a legacy
+            collection is in the way and `drop_legacy` is False.
+    """
+    client = client or get_qdrant_client(host, port)
+    paper_index = get_paper_index()
+    migration = paper_index.get_migration(alias)
+    if migration is None:
+        raise ValueError(f"No migration of '{alias}' in progress")
+    if not migration.done:
+        raise ValueError(f"Re-embedding into '{migration.target}' is not complete yet")
+    live = client.count(alias, exact=True).count
+    migrated = client.count(migration.target, exact=True).count
+    if migrated < live:
+        raise ValueError(f"'{migration.target}' has {migrated} points, '{alias}' has {live}")
+
+    if get_alias_target(client, alias) is None and client.collection_exists(alias):
+        if not drop_legacy:
+            raise ValueError(
+                f"'{alias}' is a collection, not an alias; export it if needed and "
+                "finish with drop_legacy to replace it"
+            )
+        logger.warning(f"Deleting the legacy collection '{alias}' to create the alias")
+        client.delete_collection(alias)
+
+    swap_alias(client, alias, migration.target)
+    paper_index.delete_migration(alias)
+    _active.pop(alias, None)
+    return migration.target
+
+
+def backfill_payloads(
+    alias: str = COLLECTION_NAME,
+    batch_size: int = REEMBED_BATCH_SIZE,
+    fetch: Callable[[list[str]], list[Paper]] = fetch_papers_by_id,
+    client: QdrantClient | None = None,
+) -> int:
+    """
+    Add the filter fields to the payloads of points written before they existed.
+
+    Points are found by their empty `author_keys`, and their papers fetched from
+    arXiv by ID, `batch_size` per step, for the publication date and category.
+    Papers arXiv doesn't return only get the author keys of their stored authors.
+    Each step updates its points in one request.
+
+    Args:
+        alias (str): The alias or collection to backfill.
+        batch_size (int): Points read, fetched and updated per step.
+        fetch (Callable[[list[str]], list[Paper]]): Fetches papers by ID.
+        client (QdrantClient | None): Qdrant client. Defaults to the shared one.
+
+    Returns:
+        int: Number of points updated.
+    """
+    client = client or get_qdrant_client(host, port)
+    # Matches missing fields, but also authorless papers, which already have them
+    missing = Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="author_keys"))])
+    updated = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            alias, scroll_filter=missing, limit=batch_size, offset=offset, with_payload=True
+        )
+        stale = {
+            str(point.payload["paper_id"]): point
+            for point in points
+            if point.payload is not None and "author_keys" not in point.payload
+        }
+        if stale:
+            fetched = {paper.id: paper for paper in fetch(list(stale))}
+            operations = []
+            for paper_id, point in stale.items():
+                stored = point.payload or {}
+                paper = fetched.get(paper_id) or Paper(
+                    id=paper_id, url="", title="", abstract="", authors=stored.get("authors", [])
+                )
+                fields = paper_payload(paper)
+                payload = {field: fields[field] for field in PAYLOAD_INDEXES}
+                operations.append(
+                    SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[point.id]))
+                )
+            client.batch_update_points(alias, operations)
+            updated += len(operations)
+            logger.info(f"Backfilled the payloads of {updated} points of '{alias}'")
+        if offset is None:
+            break
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    start = commands.add_parser("start", help="create the new collection and dual-write")
+    start.add_argument("model")
+    start.add_argument("dim", type=int)
+    run = commands.add_parser("run", help="re-embed every paper into the new collection")
+    run.add_argument("--rate", type=float, default=REEMBED_RATE, help="max papers per second")
+    run.add_argument("--batch-size", type=int, default=REEMBED_BATCH_SIZE)
+    finish = commands.add_parser("finish", help="swap the alias to the new collection")
+    finish.add_argument("--drop-legacy", action="store_true")
+    commands.add_parser("status")
+    backfill = commands.add_parser("backfill", help="add filter fields to old payloads")
+    backfill.add_argument("--batch-size", type=int, default=REEMBED_BATCH_SIZE)
+    parser.add_argument("--alias", default=COLLECTION_NAME)
+    args = parser.parse_args()
+
+    if args.command == "start":
+        start_migration(args.model, args.dim, args.alias)
+    elif args.command == "run":
+        reembed(args.alias, args.batch_size, args.rate)
+    elif args.command == "finish":
+        finish_migration(args.alias, drop_legacy=args.drop_legacy)
+    elif args.command == "backfill":
+        backfill_payloads(args.alias, args.batch_size)
+    else:
+        client = get_qdrant_client(host, port)
+        print(f"'{args.alias}' -> {get_alias_target(client, args.alias) or '(collection)'}")
+        print(get_paper_index().get_migration(args.alias) or "No migration in progress")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, String, text
+from sqlalchemy import Boolean, Column, DateTime, Integer, String, text
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -21,3 +21,23 @@ class PaperHistory(Base):
     id = Column(String, primary_key=True)
     state = Column(String)
     timestamp = Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+
+
+class VectorMigration(Base):
+    __tablename__ = "vector_migrations"
+
+    alias = Column(String, primary_key=True)
+    target = Column(String)
+    model = Column(String)
+    dim = Column(Integer)
+    cursor = Column(String)
+    done = Column(Boolean, default=False)
+    timestamp = Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+
+
+class QueryCursor(Base):
+    __tablename__ = "query_cursors"
+
+    query = Column(String, primary_key=True)
+    cursor = Column(DateTime)
+    timestamp = Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
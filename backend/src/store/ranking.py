@@ -0,0 +1,148 @@
+"""
+Graph ranking of papers: PageRank centrality over the whole paper graph, and
+re-ranking of search results by personalized PageRank over their neighborhood.
+
+Ranks are computed by power iteration over CSR edge arrays, each iteration being
+a couple of vectorized passes over the edges.
+"""
+
+from time import perf_counter
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+
+from src.config import RERANK_BLEND, RERANK_BUDGET_MS
+from src.models import SearchResult
+from src.store.graph import GraphStore
+
+DAMPING = 0.85  # probability of following an edge rather than jumping to a random paper
+TOLERANCE = 1e-6  # L1 change between iterations at which the ranks have converged
+MAX_ITERATIONS = 100
+
+
+def pagerank(
+    offsets: NDArray[np.int64],
+    neighbors: NDArray[np.int32],
+    weights: NDArray[np.float32],
+    start: NDArray[np.float32] | None = None,
+    personalization: NDArray[np.float64] | None = None,
+    damping: float = DAMPING,
+    tolerance: float = TOLERANCE,
+    max_iterations: int = MAX_ITERATIONS,
+    deadline: float | None = None,
+) -> tuple[NDArray[np.float32], int]:
+    """
+    Compute weighted PageRank by sparse power iteration.
+
+    A walker follows an edge with probability proportional to its weight, or jumps
+    to a random paper with probability `1 - damping`, or when the paper has no edge
+    (or only edges of weight <= 0). Ranks sum to 1. With a personalization, the
+    walker jumps back to papers in proportion to it instead of uniformly: the ranks
+    then measure proximity to those papers (random walk with restart).
+
+    Warm-starting from the ranks of a slightly smaller graph takes a few iterations
+    where starting from uniform ranks takes tens.
+
+    Args:
+        offsets (NDArray[np.int64]): CSR row offsets, one more than the nodes.
+        neighbors (NDArray[np.int32]): Edge targets, grouped by source.
+        weights (NDArray[np.float32]): Edge weights.
+        start (NDArray[np.float32] | None): Previous ranks to start from. Nodes
+            added since get the average rank. Defaults to the jump distribution.
+        personalization (NDArray[np.float64] | None): Non-negative jump weight of
+            each node. Defaults to uniform.
+        damping (float): Probability of following an edge.
+        tolerance (float): Convergence threshold on the L1 change of the ranks.
+        max_iterations (int): Iterations after which to stop anyway.
+        deadline (float | None): `perf_counter()` time after which to return the
+            current, unconverged ranks.
+
+    Returns:
+        tuple[NDArray[np.float32], int]: The ranks, aligned with the nodes, and the
+            number of iterations run.
+    """
+    nodes = len(offsets) - 1
+    if nodes == 0:
+        return np.empty(0, dtype=np.float32), 0
+    sources = np.repeat(np.arange(nodes), np.diff(offsets))
+    weight = np.clip(weights.astype(np.float64), 0.0, None)
+    out_weight = np.bincount(sources, weight, minlength=nodes)
+    # Transition probability of each edge; papers without outgoing weight are dangling
+    probability = weight / np.where(out_weight > 0, out_weight, 1.0)[sources]
+    dangling = out_weight == 0
+
+    if personalization is None:
+        teleport = np.full(nodes, 1.0 / nodes)
+    else:
+        teleport = np.asarray(personalization, dtype=np.float64) / personalization.sum()
+
+    ranks = teleport.copy()
+    if start is not None and len(start):
+        ranks[: len(start)] = start[:nodes]
+        ranks[len(start) :] = 1.0 / nodes
+        ranks /= ranks.sum()
+
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        jump = 1.0 - damping + damping * ranks[dangling].sum()
+        updated = damping * np.bincount(neighbors, ranks[sources] * probability, minlength=nodes)
+        updated += jump * teleport
+        change = np.abs(updated - ranks).sum()
+        ranks = updated
+        if change < tolerance or (deadline is not None and perf_counter() >= deadline):
+            break
+    else:
+        logger.warning(f"PageRank did not converge in {max_iterations} iterations")
+    return ranks.astype(np.float32), iterations
+
+
+def rerank(
+    hits: list[SearchResult],
+    results: list[SearchResult],
+    graph: GraphStore,
+    blend: float = RERANK_BLEND,
+    budget_ms: float = RERANK_BUDGET_MS,
+) -> list[SearchResult]:
+    """
+    Re-rank search results by blending their vector score with graph proximity.
+
+    Personalized PageRank is seeded from the vector hits, in proportion to their
+    scores, and run on the subgraph of the results only. Each result is scored
+    `(1 - blend) * cosine + blend * proximity`, proximity being its rank relative
+    to the highest one, and papers reached through the graph having a cosine of 0.
+
+    The work stops at the time budget: iterations left then are skipped, and if
+    the budget is spent before the walk starts, the results are returned as is.
+
+    Args:
+        hits (list[SearchResult]): Vector search hits, with their scores.
+        results (list[SearchResult]): Distinct papers to re-rank: hits and papers
+            reached from them in the graph.
+        graph (GraphStore): The graph store holding their edges.
+        blend (float): Weight of graph proximity against the vector score.
+        budget_ms (float): Time budget of the re-ranking.
+
+    Returns:
+        list[SearchResult]: The results by decreasing blended score, set as their score.
+    """
+    deadline = perf_counter() + budget_ms / 1000
+    cosine = {hit.id: hit.score or 0.0 for hit in hits}
+    scores = np.array([cosine.get(result.id, 0.0) for result in results])
+    seeds = np.clip(scores, 0.0, None)
+    if not results or seeds.sum() <= 0:
+        return results
+
+    offsets, neighbors, weights = graph.subgraph([result.id for result in results])
+    if perf_counter() >= deadline:
+        logger.warning(f"Re-ranking skipped: the subgraph took over {budget_ms} ms")
+        return results
+    proximity, iterations = pagerank(
+        offsets, neighbors, weights, personalization=seeds, deadline=deadline
+    )
+    blended = (1.0 - blend) * scores + blend * proximity / proximity.max()
+    logger.debug(f"Re-ranked {len(results)} results in {iterations} iterations")
+    return [
+        results[i].model_copy(update={"score": float(blended[i])})
+        for i in np.argsort(-blended, kind="stable").tolist()
+    ]
@@ -1,4 +1,5 @@
 import os
+from typing import Any
 
 from dotenv import load_dotenv
 from upstash_redis import Redis
@@ -26,6 +27,27 @@ def get_redis_conn() -> Redis:
     return redis
 
 
+def eval_script(conn: Redis, script: str, keys: list[str], args: list[Any]) -> Any:
+    """
+    Run a Lua script atomically on either Redis client.
+
+    Upstash and redis-py expose EVAL with different signatures, so callers go
+    through this helper instead of calling `eval` directly.
+
+    Args:
+        conn (Redis): Upstash or redis-py connection.
+        script (str): The Lua script.
+        keys (list[str]): Keys passed as KEYS.
+        args (list[Any]): Arguments passed as ARGV.
+
+    Returns:
+        Any: The script's return value.
+    """
+    if isinstance(conn, Redis):
+        return conn.eval(script, keys=keys, args=[str(a) for a in args])
+    return conn.eval(script, len(keys), *keys, *args)
+
+
 def is_redis_healthy() -> bool:
     """
     Check if the Redis connection is healthy.
@@ -0,0 +1,313 @@
+"""
+Bulk export and import of a Qdrant collection, to move or rebuild it without
+re-queuing papers or running the embedding model.
+
+A snapshot directory holds numbered chunks, each a vector matrix (`.npy`, float32
+or float16) and a JSONL file with the ID and payload of each row, plus a
+`manifest.json` that is rewritten after every chunk. Both directions resume
+where they stopped: the export from the scroll offset saved in the manifest, the
+import by skipping the chunks listed in its progress file.
+
+Usage:
+    python -m src.store.snapshot export DIR [--collection papers] [--float16]
+    python -m src.store.snapshot import DIR [--collection papers] [--workers 4]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+from loguru import logger
+from numpy.typing import NDArray
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import OptimizersConfigDiff, PointStruct
+
+from src.store.vector import (
+    COLLECTION_NAME,
+    VECTOR_DIM,
+    QdrantVectorStore,
+    get_qdrant_client,
+    host,
+    port,
+)
+
+CHUNK_ROWS = 50_000  # rows per chunk file, ~75 MB of float32 at 384 dims
+SCROLL_PAGE = 1_000  # points per scroll request
+UPSERT_BATCH = 1_000  # points per upsert request
+MANIFEST = "manifest.json"
+DEFAULT_INDEXING_THRESHOLD = 10_000  # Qdrant's default, in KB of vectors
+DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write a file through a temporary file, so readers never see it half written."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def read_json(path: Path) -> dict[str, Any] | None:
+    if not path.exists():
+        return None
+    data: dict[str, Any] = json.loads(path.read_text())
+    return data
+
+
+def export_collection(
+    client: QdrantClient,
+    directory: Path,
+    collection: str = COLLECTION_NAME,
+    dtype: str = "float32",
+    chunk_rows: int = CHUNK_ROWS,
+) -> dict[str, Any]:
+    """
+    Stream a collection into chunk files with `scroll`, resuming an unfinished export.
+
+    Args:
+        client (QdrantClient): Client of the Qdrant holding the collection.
+        directory (Path): Snapshot directory, created if needed.
+        collection (str): Name of the collection to export.
+        dtype (str): "float32", or "float16" to halve the size of the vector files.
+        chunk_rows (int): Points per chunk file.
+
+    Returns:
+        dict[str, Any]: The manifest of the finished export.
+
+    Raises:
+        ValueError: If the directory holds an export of another collection or dtype.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = directory / MANIFEST
+    manifest = read_json(manifest_path) or {
+        "collection": collection,
+        "dtype": dtype,
+        "dim": None,
+        "rows": 0,
+        "chunks": [],
+        "next_offset": None,
+        "complete": False,
+    }
+    if (manifest["collection"], manifest["dtype"]) != (collection, dtype):
+        raise ValueError(
+            f"{directory} holds a {manifest['dtype']} export of '{manifest['collection']}'"
+        )
+    if manifest["complete"]:
+        logger.info(f"Export of '{collection}' in {directory} is already complete")
+        return manifest
+
+    total = client.count(collection, exact=False).count
+    start, exported = perf_counter(), 0
+    offset = manifest["next_offset"]
+    while not manifest["complete"]:
+        ids: list[Any] = []
+        payloads: list[dict[str, Any]] = []
+        vectors: list[list[float]] = []
+        while len(ids) < chunk_rows:
+            points, offset = client.scroll(
+                collection,
+                limit=min(SCROLL_PAGE, chunk_rows - len(ids)),
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            for point in points:
+                ids.append(point.id)
+                payloads.append(point.payload or {})
+                vectors.append(point.vector)  # type: ignore[arg-type]
+            if offset is None:
+                break
+
+        if ids:
+            matrix = np.asarray(vectors, dtype=DTYPES[dtype])
+            name = f"chunk-{len(manifest['chunks']):05d}"
+            with tempfile.TemporaryFile(dir=directory) as f:
+                np.save(f, matrix)
+                f.seek(0)
+                write_atomic(directory / f"{name}.npy", f.read())
+            lines = (json.dumps({"id": i, "payload": p}) + "\n" for i, p in zip(ids, payloads))
+            write_atomic(directory / f"{name}.jsonl", "".join(lines).encode())
+            manifest["chunks"].append({"name": name, "rows": len(ids)})
+            manifest["rows"] += len(ids)
+            manifest["dim"] = int(matrix.shape[1])
+            exported += len(ids)
+
+        # The manifest only advances once the chunk is on disk, so a restart redoes
+        # at most the chunk that was being written
+        manifest["next_offset"] = offset
+        manifest["complete"] = offset is None
+        write_atomic(manifest_path, json.dumps(manifest, indent=2).encode())
+        elapsed = perf_counter() - start
+        logger.info(
+            f"Exported {manifest['rows']}/{total} points of '{collection}' "
+            f"({exported / max(elapsed, 1e-9):.0f} points/s)"
+        )
+
+    logger.success(f"Exported '{collection}' to {directory}")
+    return manifest
+
+
+def load_chunk(directory: Path, name: str) -> tuple[list[Any], list[Any], NDArray[np.float32]]:
+    """Read a chunk's point IDs, payloads and vectors."""
+    ids, payloads = [], []
+    with (directory / f"{name}.jsonl").open() as f:
+        for line in f:
+            record = json.loads(line)
+            ids.append(record["id"])
+            payloads.append(record["payload"])
+    vectors = np.load(directory / f"{name}.npy", mmap_mode="r").astype(np.float32)
+    return ids, payloads, vectors
+
+
+def upsert_chunk(
+    client: QdrantClient, directory: Path, name: str, collection: str, batch_size: int
+) -> int:
+    """Upsert one chunk in batches, returning the number of points written."""
+    ids, payloads, vectors = load_chunk(directory, name)
+    for lo in range(0, len(ids), batch_size):
+        points = [
+            PointStruct(id=ids[i], vector=vectors[i].tolist(), payload=payloads[i])
+            for i in range(lo, min(lo + batch_size, len(ids)))
+        ]
+        client.upsert(collection_name=collection, points=points, wait=True)
+    return len(ids)
+
+
+def import_collection(
+    client: QdrantClient,
+    directory: Path,
+    collection: str | None = None,
+    workers: int = 4,
+    batch_size: int = UPSERT_BATCH,
+) -> int:
+    """
+    Bulk-upsert an exported snapshot, uploading chunks in parallel.
+
+    The collection is created with the configured HNSW, quantization and payload
+    index settings if needed. HNSW indexing is paused during the upload and
+    resumed at the end, so the graph is built once instead of during every batch.
+    Chunks already imported into the collection are skipped.
+
+    The original indexing threshold is saved with the import progress before it
+    is paused, so an import killed before resuming it restores it when rerun.
+
+    Args:
+        client (QdrantClient): Client of the target Qdrant.
+        directory (Path): Snapshot directory written by `export_collection`.
+        collection (str | None): Target collection, the exported one by default.
+        workers (int): Chunks uploaded concurrently. Use 1 with an embedded
+            (":memory:" or path) client, which is not thread safe.
+        batch_size (int): Points per upsert request.
+
+    Returns:
+        int: Number of points imported by this call.
+
+    Raises:
+        FileNotFoundError: If the directory holds no export.
+        ValueError: If the vectors don't have the dimension of the collection.
+    """
+    manifest = read_json(directory / MANIFEST)
+    if manifest is None:
+        raise FileNotFoundError(f"No {MANIFEST} in {directory}")
+    collection = collection or manifest["collection"]
+    if manifest["dim"] not in (None, VECTOR_DIM):
+        raise ValueError(f"Snapshot vectors have {manifest['dim']} dimensions, not {VECTOR_DIM}")
+    if not manifest["complete"]:
+        logger.warning(f"Export in {directory} is incomplete, importing the chunks it has")
+
+    progress_path = directory / f"imported-{collection}.json"
+    progress = read_json(progress_path) or {}
+    done: set[str] = set(progress.get("chunks", []))
+    # Set while indexing is paused, by this import or by one that was killed
+    threshold: int | None = progress.get("indexing_threshold")
+
+    def save_progress() -> None:
+        state = {"chunks": sorted(done), "indexing_threshold": threshold}
+        write_atomic(progress_path, json.dumps(state).encode())
+
+    def resume_indexing() -> None:
+        nonlocal threshold
+        client.update_collection(
+            collection, optimizers_config=OptimizersConfigDiff(indexing_threshold=threshold)
+        )
+        threshold = None
+        save_progress()
+
+    pending = [c for c in manifest["chunks"] if c["name"] not in done]
+    if not pending:
+        if threshold is not None:
+            resume_indexing()
+        logger.info(f"Snapshot in {directory} is already imported into '{collection}'")
+        return 0
+
+    QdrantVectorStore(client=client, collection=collection)
+    if threshold is None:
+        live = client.get_collection(collection).config.optimizer_config.indexing_threshold
+        # 0 is the paused value, so it can't be the original one
+        threshold = live or DEFAULT_INDEXING_THRESHOLD
+        save_progress()
+    client.update_collection(
+        collection, optimizers_config=OptimizersConfigDiff(indexing_threshold=0)
+    )
+    lock = threading.Lock()
+    start, imported = perf_counter(), 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {
+                pool.submit(
+                    upsert_chunk, client, directory, chunk["name"], collection, batch_size
+                ): chunk["name"]
+                for chunk in pending
+            }
+            for future in as_completed(futures):
+                imported += future.result()
+                with lock:
+                    done.add(futures[future])
+                    save_progress()
+                elapsed = perf_counter() - start
+                logger.info(
+                    f"Imported {len(done)}/{len(manifest['chunks'])} chunks into '{collection}' "
+                    f"({imported / max(elapsed, 1e-9):.0f} points/s)"
+                )
+    finally:
+        with lock:
+            resume_indexing()
+
+    logger.success(f"Imported {imported} points into '{collection}'")
+    return imported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--collection", default=None)
+    parser.add_argument("--host", default=host)
+    parser.add_argument("--port", type=int, default=port)
+    parser.add_argument("--float16", action="store_true", help="export half precision vectors")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=4, help="parallel import uploads")
+    args = parser.parse_args()
+
+    client = get_qdrant_client(args.host, args.port)
+    if args.command == "export":
+        export_collection(
+            client,
+            args.directory,
+            args.collection or COLLECTION_NAME,
+            "float16" if args.float16 else "float32",
+            args.chunk_rows,
+        )
+    else:
+        import_collection(client, args.directory, args.collection, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,99 +1,573 @@
 import os
-from typing import Callable, Protocol
+import threading
+import uuid
+from time import monotonic
+from typing import Any, Callable, ClassVar, Iterator, Protocol
 
 import numpy as np
 from dotenv import load_dotenv
 from loguru import logger
 from numpy.typing import NDArray
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, PointStruct, ScoredPoint, VectorParams
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CreateAlias,
+    CreateAliasOperation,
+    DatetimeRange,
+    DeleteAlias,
+    DeleteAliasOperation,
+    Distance,
+    FieldCondition,
+    Filter,
+    HnswConfigDiff,
+    MatchAny,
+    PayloadSchemaType,
+    PointStruct,
+    ProductQuantization,
+    QuantizationConfig,
+    QuantizationSearchParams,
+    QueryRequest,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    ScoredPoint,
+    SearchParams,
+    VectorParams,
+)
 
-from src.models import Paper, SearchResult
+from src.config import (
+    EMBEDDING_DIM,
+    EMBEDDING_MODEL,
+    QDRANT_GRPC_PORT,
+    QDRANT_HNSW_EF_CONSTRUCT,
+    QDRANT_HNSW_M,
+    QDRANT_ON_DISK,
+    QDRANT_OVERSAMPLING,
+    QDRANT_PREFER_GRPC,
+    QDRANT_QUANTIZATION,
+    QDRANT_TIMEOUT,
+    VECTOR_STORE_BACKEND,
+)
+from src.models import Paper, SearchFilter, SearchResult, author_key
 
 load_dotenv()
 
+# Searches and writes go through this alias, which points at a versioned collection
 COLLECTION_NAME = "papers"
-VECTOR_DIM = 384
+VECTOR_DIM = EMBEDDING_DIM
+ALIAS_REFRESH = 10.0  # seconds a resolved alias is trusted before it is looked up again
+SCROLL_BATCH = 1_000  # vectors per page when reading the whole collection
+
+# Payload fields that filtered searches use, indexed so filtering stays inside the ANN search
+PAYLOAD_INDEXES = {
+    "published": PayloadSchemaType.DATETIME,
+    "primary_category": PayloadSchemaType.KEYWORD,
+    "author_keys": PayloadSchemaType.KEYWORD,
+}
 
 host = os.getenv("QDRANT_HOST", "localhost")
 port = int(os.getenv("QDRANT_PORT", 6333))
 
+# Process-wide clients, one per server, so connections are reused across calls
+_clients: dict[tuple[str, int], QdrantClient] = {}
+_clients_lock = threading.Lock()
+
+
+def client_url(client: QdrantClient) -> str:
+    """
+    Identify the server a Qdrant client talks to.
+
+    Remote clients are identified by their REST URL. In-memory clients each hold
+    their own data, so they are identified by the client itself.
+    """
+    inner = client._client
+    url = getattr(inner, "rest_uri", None)
+    if url is None:
+        location = getattr(inner, "location", ":memory:")
+        url = f"local:{id(client)}" if location == ":memory:" else f"local:{location}"
+    return str(url)
+
+
+def point_id(paper_id: str) -> str:
+    """
+    Map an arXiv paper ID to a Qdrant point ID.
+
+    Qdrant only accepts unsigned integers and UUIDs as point IDs, so paper IDs are
+    mapped to a deterministic UUID and kept in the payload under `paper_id`.
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, paper_id))
+
+
+def get_qdrant_client(host: str = host, port: int = port) -> QdrantClient:
+    """
+    Get the shared Qdrant client for a server, creating it on first use.
+
+    The client keeps its HTTP (or gRPC, with QDRANT_PREFER_GRPC) connections open,
+    so only the first call pays for connection setup. It is thread-safe.
+    """
+    with _clients_lock:
+        if (host, port) not in _clients:
+            logger.info(f"Connecting to Qdrant at {host}:{port} (gRPC: {QDRANT_PREFER_GRPC})")
+            _clients[(host, port)] = QdrantClient(
+                host=host,
+                port=port,
+                grpc_port=QDRANT_GRPC_PORT,
+                prefer_grpc=QDRANT_PREFER_GRPC,
+                timeout=QDRANT_TIMEOUT,
+            )
+        return _clients[(host, port)]
+
+
+def close_qdrant_clients() -> None:
+    """
+    Close the shared clients, e.g. on server shutdown.
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+def collection_version(
+    model_name: str = EMBEDDING_MODEL, dim: int = VECTOR_DIM, alias: str = COLLECTION_NAME
+) -> str:
+    """
+    Name the collection holding the vectors of one embedding model, e.g.
+    `papers.all-MiniLM-L6-v2.384`. Slashes of hub model names become `~`.
+    """
+    return f"{alias}.{model_name.replace('/', '~')}.{dim}"
+
+
+def parse_collection_version(name: str) -> tuple[str, int] | None:
+    """
+    Return the embedding model and dimension of a versioned collection name.
+
+    Returns:
+        tuple[str, int] | None: The model name and dimension, or None for an
+            unversioned (legacy) collection.
+    """
+    _, dot, rest = name.partition(".")
+    model, _, dim = rest.rpartition(".")
+    if not dot or not model or not dim.isdigit():
+        return None
+    return model.replace("~", "/"), int(dim)
+
+
+def get_alias_target(client: QdrantClient, alias: str) -> str | None:
+    """Return the collection an alias points at, or None if there is no such alias."""
+    for description in client.get_aliases().aliases:
+        if description.alias_name == alias:
+            return str(description.collection_name)
+    return None
+
+
+def swap_alias(client: QdrantClient, alias: str, collection: str) -> str | None:
+    """
+    Point an alias at another collection, atomically for readers.
+
+    The delete and the create are applied by Qdrant as one operation, so searches
+    through the alias see either the old or the new collection, never neither.
+
+    Returns:
+        str | None: The collection the alias pointed at before, if any.
+    """
+    previous = get_alias_target(client, alias)
+    operations: list[CreateAliasOperation | DeleteAliasOperation] = []
+    if previous is not None:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    operations.append(
+        CreateAliasOperation(create_alias=CreateAlias(collection_name=collection, alias_name=alias))
+    )
+    client.update_collection_aliases(change_aliases_operations=operations)
+    logger.success(f"Alias '{alias}' now points at '{collection}' (was '{previous}')")
+    return previous
+
+
+def quantization_config(kind: str = QDRANT_QUANTIZATION) -> QuantizationConfig | None:
+    """
+    Build the collection's quantization config.
+
+    Quantized vectors are kept in RAM and the originals can then live on disk:
+    `scalar` (int8) takes 4x less RAM per vector, `binary` 32x less, at some
+    recall cost that rescoring with the original vectors mostly recovers.
+    """
+    if kind == "none":
+        return None
+    if kind == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if kind == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    raise ValueError(f"Unsupported quantization: {kind}")
+
+
+def quantization_kind(config: QuantizationConfig | None) -> str:
+    """
+    Name the quantization of a collection from its config, as in QDRANT_QUANTIZATION,
+    plus `product` for product quantization.
+    """
+    if isinstance(config, ScalarQuantization):
+        return "scalar"
+    if isinstance(config, BinaryQuantization):
+        return "binary"
+    if isinstance(config, ProductQuantization):
+        return "product"
+    return "none"
+
+
+def search_params(
+    hnsw_ef: int | None = None, rescore: bool | None = None, kind: str = "none"
+) -> SearchParams | None:
+    """
+    Build per-query search parameters.
+
+    Args:
+        hnsw_ef (int | None): Size of the HNSW candidate list; higher is slower but
+            more accurate. Defaults to the collection's setting.
+        rescore (bool | None): Whether to rescore quantized candidates with the
+            original vectors. Defaults to Qdrant's behaviour (rescore).
+        kind (str): The quantization of the searched collection, see `quantization_kind`.
+
+    Returns:
+        SearchParams | None: The parameters, or None to use the defaults.
+    """
+    quantization = None
+    if kind != "none":
+        quantization = QuantizationSearchParams(
+            rescore=rescore, oversampling=QDRANT_OVERSAMPLING if rescore is not False else None
+        )
+    if hnsw_ef is None and quantization is None:
+        return None
+    return SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+
+
+def paper_payload(paper: Paper) -> dict[str, Any]:
+    """
+    Build the payload stored with a paper's vector.
+
+    Besides what search results display, it holds the fields that searches can be
+    filtered on: the publication date, primary category and normalized author keys.
+    """
+    return {
+        "paper_id": paper.id,
+        "title": paper.title,
+        "authors": paper.authors,
+        "published": paper.published.isoformat() if paper.published else None,
+        "primary_category": paper.primary_category,
+        "author_keys": sorted({author_key(name) for name in paper.authors} - {""}),
+    }
+
+
+def to_qdrant_filter(search_filter: SearchFilter | None) -> Filter | None:
+    """
+    Translate a SearchFilter into a Qdrant filter, applied during the ANN search.
+    """
+    if search_filter is None:
+        return None
+    conditions: list[FieldCondition] = []
+    if search_filter.published_from or search_filter.published_to:
+        conditions.append(
+            FieldCondition(
+                key="published",
+                range=DatetimeRange(
+                    gte=search_filter.published_from, lte=search_filter.published_to
+                ),
+            )
+        )
+    if search_filter.categories is not None:
+        conditions.append(
+            FieldCondition(key="primary_category", match=MatchAny(any=search_filter.categories))
+        )
+    if (keys := search_filter.author_keys()) is not None:
+        conditions.append(FieldCondition(key="author_keys", match=MatchAny(any=keys)))
+    return Filter(must=conditions) if conditions else None
+
+
+def query_requests(
+    query_vectors: NDArray[np.float32],
+    top_k: int = 5,
+    params: SearchParams | None = None,
+    search_filter: SearchFilter | None = None,
+) -> list[QueryRequest]:
+    """Build one query request per query vector, for `query_batch_points`."""
+    query_filter = to_qdrant_filter(search_filter)
+    return [
+        QueryRequest(
+            query=vector.tolist(),
+            filter=query_filter,
+            limit=top_k,
+            params=params,
+            with_payload=True,
+        )
+        for vector in np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+    ]
+
+
+def to_search_results(points: list[ScoredPoint]) -> list[SearchResult]:
+    return [
+        SearchResult(
+            id=(point.payload or {}).get("paper_id", str(point.id)),
+            title=(point.payload or {}).get("title", ""),
+            authors=(point.payload or {}).get("authors", []),
+            score=point.score,
+            related_ids=(point.payload or {}).get("related_ids", []),
+        )
+        for point in points
+    ]
+
 
 class VectorStore(Protocol):
-    def index(self, papers: list[Paper], vectors: NDArray[np.float32]) -> None: ...
+    embedding_model: str  # model whose vectors are searched; queries must use it too
+
+    def index(self, papers: list[Paper], vectors: NDArray[np.float32]) -> list[str]: ...
+
+    def search(
+        self,
+        query_vector: NDArray[np.float32],
+        top_k: int = 5,
+        hnsw_ef: int | None = None,
+        rescore: bool | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[SearchResult]: ...
+
+    def search_many(
+        self,
+        query_vectors: NDArray[np.float32],
+        top_k: int = 5,
+        hnsw_ef: int | None = None,
+        rescore: bool | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[list[SearchResult]]: ...
 
-    def search(self, query_vector: NDArray[np.float32], top_k: int = 5) -> list[SearchResult]: ...
+    def iter_vectors(
+        self, batch_size: int = SCROLL_BATCH
+    ) -> Iterator[tuple[list[str], NDArray[np.float32]]]: ...
 
     def is_healthy(self) -> bool: ...
 
 
 class QdrantVectorStore(VectorStore):
-    def __init__(self, host: str = host, port: int = port):
-        self.client = QdrantClient(host=host, port=port)
-        self.is_healthy()
+    """
+    Vector store backed by a Qdrant collection, or by an alias of one.
+
+    The default `papers` alias is created on first use, pointing at the versioned
+    collection of the configured embedding model. Searches resolve the alias (at
+    most every ALIAS_REFRESH seconds) and query the collection it points at, whose
+    model `embedding_model` reports, so queries are embedded with the same model
+    even right after the alias was swapped to a re-embedded collection.
+    """
+
+    # (server, collection) pairs already checked by this process, so repeated
+    # instances skip the round-trip
+    _ensured: ClassVar[set[tuple[str, str]]] = set()
+
+    def __init__(
+        self,
+        host: str = host,
+        port: int = port,
+        client: QdrantClient | None = None,
+        collection: str = COLLECTION_NAME,
+        dim: int = VECTOR_DIM,
+    ):
+        self.client = client or get_qdrant_client(host, port)
+        self.collection = collection
+        self.dim = dim
+        self._target: str | None = None
+        self._resolved_at = 0.0
+        self._quantization: str | None = None  # of the resolved collection
+        self._ensured_key = (client_url(self.client), self.collection)
+        if self._ensured_key not in self._ensured and self.is_healthy():
+            self.ensure_collection()
+
+    def resolve(self) -> str:
+        """Return the collection that `collection` currently designates."""
+        if self._target is None or monotonic() - self._resolved_at > ALIAS_REFRESH:
+            self._target = get_alias_target(self.client, self.collection) or self.collection
+            self._resolved_at = monotonic()
+            self._quantization = None
+        return self._target
+
+    @property
+    def quantization(self) -> str:
+        """
+        The quantization of the searched collection, read from its config rather than
+        from QDRANT_QUANTIZATION, which only applies to collections created later.
+        """
+        collection = self.resolve()
+        if self._quantization is None:
+            config = self.client.get_collection(collection).config.quantization_config
+            self._quantization = quantization_kind(config)
+        return self._quantization
+
+    @property
+    def embedding_model(self) -> str:
+        version = parse_collection_version(self.resolve())
+        return version[0] if version is not None else EMBEDDING_MODEL
 
     def ensure_collection(self) -> None:
         """
         Ensure the collection exists. If it doesn't, create it.
+
+        For the `papers` alias, the versioned collection of the configured model is
+        created and the alias pointed at it. An existing collection or alias, like
+        an unversioned `papers` collection from before aliases, is used as is.
+
+        HNSW, on-disk storage and quantization are configured through the QDRANT_*
+        settings when the collection is created; an existing collection is left as is.
+        Payload indexes for filtered search are created if missing.
         """
-        existing_collections: list[str] = [
-            collection.name for collection in self.client.get_collections().collections
-        ]
-        logger.info(
-            f"Existing Qdrant collections: {[c.name for c in self.client.get_collections().collections]}"
-        )
-        if COLLECTION_NAME not in existing_collections:
-            logger.info(f"Collection '{COLLECTION_NAME}' not found. Creating new collection...")
-            self.client.recreate_collection(
-                collection_name=COLLECTION_NAME,
-                vectors_config=VectorParams(size=VECTOR_DIM, distance=Distance.COSINE),
+        alias_target = get_alias_target(self.client, self.collection)
+        target = alias_target or self.collection
+        if alias_target is None and self.collection == COLLECTION_NAME:
+            if not self.client.collection_exists(self.collection):
+                target = collection_version(dim=self.dim)
+        if not self.client.collection_exists(target):
+            logger.info(f"Collection '{target}' not found. Creating new collection...")
+            self.client.create_collection(
+                collection_name=target,
+                vectors_config=VectorParams(
+                    size=self.dim, distance=Distance.COSINE, on_disk=QDRANT_ON_DISK
+                ),
+                hnsw_config=HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT),
+                quantization_config=quantization_config(QDRANT_QUANTIZATION),
             )
-            logger.success(f"Collection '{COLLECTION_NAME}' created successfully.")
+            logger.success(f"Collection '{target}' created successfully.")
         else:
-            logger.debug(f"Collection '{COLLECTION_NAME}' already exists.")
+            logger.debug(f"Collection '{target}' already exists.")
+        if target != self.collection and alias_target is None:
+            swap_alias(self.client, self.collection, target)
+        indexed = self.client.get_collection(target).payload_schema
+        for field, schema in PAYLOAD_INDEXES.items():
+            if field not in indexed:
+                self.client.create_payload_index(target, field, field_schema=schema)
+        self._ensured.add(self._ensured_key)
 
-    def index(self, papers: list[Paper], vectors: NDArray[np.float32]) -> None:
+    def index(self, papers: list[Paper], vectors: NDArray[np.float32]) -> list[str]:
         """
-        Index the papers and their corresponding vectors into Qdrant.
+        Index the papers and their corresponding vectors into Qdrant with a single upsert.
+
+        If the bulk upsert fails, points are retried one by one so that only the
+        papers that really can't be written are reported.
+
+        Returns:
+            list[str]: IDs of the papers that could not be indexed.
+
+        Raises:
+            Exception: If no paper at all could be indexed.
         """
-        # Ensure the collection exists
-        self.ensure_collection()
-
-        points: list[PointStruct] = []
-        for _, (paper, vector) in enumerate(zip(papers, vectors)):
-            points.append(
-                PointStruct(
-                    id=paper.id,
-                    vector=vector.flatten().tolist(),
-                    payload={
-                        "title": paper.title,
-                        "authors": paper.authors,
-                    },
-                )
+        points: list[PointStruct] = [
+            PointStruct(
+                id=point_id(paper.id),
+                vector=vector.flatten().tolist(),
+                payload=paper_payload(paper),
             )
+            for paper, vector in zip(papers, vectors)
+        ]
         logger.info(f"Indexing {len(papers)} papers into Qdrant...")
-        self.client.upsert(collection_name=COLLECTION_NAME, points=points)
-        logger.success(f"Successfully upserted {len(points)} points into '{COLLECTION_NAME}'")
-        count = self.client.count(COLLECTION_NAME, exact=True).count
-        logger.debug(f"Collection now contains {count} vectors")
-
-    def search(self, query_vector: NDArray[np.float32], top_k: int = 5) -> list[SearchResult]:
-        results: list[ScoredPoint] = self.client.search(
-            collection_name=COLLECTION_NAME,
-            query_vector=query_vector[0].tolist(),
+        if self._ensured_key not in self._ensured:
+            self.ensure_collection()
+        try:
+            self.client.upsert(collection_name=self.resolve(), points=points)
+        except Exception as e:
+            logger.warning(f"Bulk upsert failed ({e}), retrying points individually...")
+            failed = self._upsert_individually(papers, points)
+            if len(failed) == len(points):
+                raise
+            return failed
+
+        logger.success(f"Successfully upserted {len(points)} points into '{self.collection}'")
+        return []
+
+    def _upsert_individually(self, papers: list[Paper], points: list[PointStruct]) -> list[str]:
+        failed: list[str] = []
+        for paper, point in zip(papers, points):
+            try:
+                self.client.upsert(collection_name=self.resolve(), points=[point])
+            except Exception as e:
+                logger.warning(f"Failed to index paper {paper.id}: {e}")
+                failed.append(paper.id)
+        return failed
+
+    def search(
+        self,
+        query_vector: NDArray[np.float32],
+        top_k: int = 5,
+        hnsw_ef: int | None = None,
+        rescore: bool | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[SearchResult]:
+        response = self.client.query_points(
+            collection_name=self.resolve(),
+            query=np.asarray(query_vector, dtype=np.float32).reshape(-1).tolist(),
             limit=top_k,
+            search_params=search_params(hnsw_ef, rescore, self.quantization),
+            query_filter=to_qdrant_filter(search_filter),
+            with_payload=True,
         )
         logger.info(f"Searching Qdrant for top {top_k} matches...")
-        return [
-            SearchResult(
-                id=str(point.id),
-                title=(point.payload or {}).get("title", ""),
-                authors=(point.payload or {}).get("authors", []),
-                score=point.score,
-                related_ids=(point.payload or {}).get("related_ids", []),
+        return to_search_results(response.points)
+
+    def search_many(
+        self,
+        query_vectors: NDArray[np.float32],
+        top_k: int = 5,
+        hnsw_ef: int | None = None,
+        rescore: bool | None = None,
+        search_filter: SearchFilter | None = None,
+    ) -> list[list[SearchResult]]:
+        """
+        Search for several query vectors in a single batched request.
+
+        Args:
+            query_vectors (NDArray[np.float32]): One query vector per row.
+            top_k (int): Number of results per query.
+            hnsw_ef (int | None): HNSW candidate list size, see `search_params`.
+            rescore (bool | None): Whether to rescore quantized candidates.
+            search_filter (SearchFilter | None): Conditions results must match.
+
+        Returns:
+            list[list[SearchResult]]: The results of each query, in query order.
+        """
+        params = search_params(hnsw_ef, rescore, self.quantization)
+        batch = query_requests(query_vectors, top_k, params, search_filter)
+        if not batch:
+            return []
+        responses = self.client.query_batch_points(collection_name=self.resolve(), requests=batch)
+        logger.info(f"Searched Qdrant for {len(batch)} queries in one request")
+        return [to_search_results(response.points) for response in responses]
+
+    def iter_vectors(
+        self, batch_size: int = SCROLL_BATCH
+    ) -> Iterator[tuple[list[str], NDArray[np.float32]]]:
+        """
+        Scroll through every vector of the collection.
+
+        Args:
+            batch_size (int): Points per scroll request.
+
+        Yields:
+            tuple[list[str], NDArray[np.float32]]: Paper IDs and their vectors, one page at a time.
+        """
+        collection = self.resolve()
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["paper_id"],
+                with_vectors=True,
             )
-            for point in results
-        ]
+            if points:
+                yield (
+                    [str((point.payload or {})["paper_id"]) for point in points],
+                    np.asarray([point.vector for point in points], dtype=np.float32),
+                )
+            if offset is None:
+                return
 
     def is_healthy(self) -> bool:
         """
@@ -108,15 +582,31 @@ class QdrantVectorStore(VectorStore):
             return False
 
 
+def local_vector_store() -> VectorStore:
+    # Imported here, as the local store module builds on this one
+    from src.store.local_vector import LocalVectorStore
+
+    return LocalVectorStore()
+
+
 VECTOR_STORE: dict[str, Callable[[], VectorStore]] = {
     "qdrant": QdrantVectorStore,
+    "local": local_vector_store,
 }
 
 
-def get_vector_store(backend: str = "qdrant") -> VectorStore:
+_vector_stores: dict[str, VectorStore] = {}
+_vector_stores_lock = threading.Lock()
+
+
+def get_vector_store(backend: str = VECTOR_STORE_BACKEND) -> VectorStore:
     """
     Get the vector store instance based on the backend specified.
+    Defaults to the VECTOR_STORE_BACKEND setting. Instances are shared per process.
     """
     if backend not in VECTOR_STORE:
         raise ValueError(f"Unsupported vector store backend: {backend}")
-    return VECTOR_STORE[backend]()
+    with _vector_stores_lock:
+        if backend not in _vector_stores:
+            _vector_stores[backend] = VECTOR_STORE[backend]()
+        return _vector_stores[backend]
@@ -2,37 +2,52 @@
 Worker script for processing papers from a Redis queue.
 This script continuously fetches batches of papers from a Redis queue,
 embeds them using a pre-trained model, and updates the vector store and paper index.
+
+The long-running worker is pipelined: fetching, embedding and indexing run on
+separate threads connected by bounded queues, so each stage works on a different
+batch at the same time.
 """
 
-from time import sleep, time
+import signal
+import threading
+from queue import Queue
+from time import perf_counter, time
+from typing import Any
 
 import numpy as np
 from loguru import logger
 from numpy.typing import NDArray
 from upstash_redis import Redis
 
-from src.embedder import embed_papers
+from src.embedder import MODEL_NAME, embed_papers, get_engine
 from src.models import Paper, PaperState, PaperStatus
+from src.queuing import (
+    HEARTBEAT_INTERVAL,
+    ack_batch,
+    claim_batch,
+    fail_batch,
+    heartbeat,
+    register_worker,
+    worker_id,
+)
 from src.store import get_paper_index, get_vector_store
+from src.store.coauthor import add_coauthor_edges
+from src.store.migration import dual_write
 from src.store.redis import get_redis_conn
 
 BATCH_SIZE = 8
 SLEEP_INTERVAL = 1.0  # seconds
+QUEUE_SIZE = 2  # batches buffered between two stages
+METRICS_INTERVAL = 60.0  # seconds between metric logs
 
 
-def get_batch(redis_conn: Redis, max_items: int, timeout: int = 5) -> list[Paper]:
+def parse_batch(raw_items: list[Any]) -> list[Paper]:
     """
-    Fetch up to max_items papers from Redis using blocking pop.
-    Waits up to `timeout` seconds for each item before giving up.
+    Parse raw queue payloads into papers, skipping invalid ones.
     """
     batch: list[Paper] = []
-    for _ in range(max_items):
-        logger.debug("Waiting for paper in queue...")
-        raw = redis_conn.blpop("paper_queue", timeout=timeout)
-        if raw is None:
-            break  # no new item in `timeout` seconds
+    for value in raw_items:
         try:
-            _, value = raw  # (queue name, payload)
             paper = Paper.model_validate_json(value)
             batch.append(paper)
             logger.debug(f"Fetched paper {paper.id} from queue")
@@ -41,6 +56,79 @@ def get_batch(redis_conn: Redis, max_items: int, timeout: int = 5) -> list[Paper
     return batch
 
 
+def index_batch(papers: list[Paper], vectors: NDArray[np.float32]) -> int:
+    """
+    Write embedded papers to the vector store and record their state in the paper index.
+
+    The whole batch costs one vector store upsert and one paper index transaction.
+    Papers the vector store reports as failed are marked as ERROR.
+
+    While the collection is being re-embedded with another model, the papers are
+    also written to the new collection (see `src.store.migration`). Once the alias
+    points at a collection of another model than MODEL_NAME, papers are re-embedded
+    with that model, until the worker is configured with it.
+
+    Embedded papers are then added to the graph with their co-author edges, and
+    marked `in_graph`. A graph failure is logged and leaves them out of the graph
+    without failing the batch.
+
+    Args:
+        papers (list[Paper]): List of Paper objects to index.
+        vectors (NDArray[np.float32]): One embedding per paper, in the same order,
+            made with MODEL_NAME.
+
+    Returns:
+        int: The number of papers indexed successfully.
+
+    Raises:
+        Exception: If the vector store could not index any paper of the batch.
+    """
+    # Get vector store and paper index
+    vector_store = get_vector_store()
+    paper_index = get_paper_index()
+
+    model_name = vector_store.embedding_model
+    if model_name != MODEL_NAME:
+        logger.warning(f"Vector store serves {model_name}, re-embedding; set EMBEDDING_MODEL")
+        vectors = embed_papers(papers, model_name)
+
+    failed = set(vector_store.index(papers, vectors))
+    dual_write(papers, vectors, model_name)
+
+    in_graph = False
+    try:
+        add_coauthor_edges([paper for paper in papers if paper.id not in failed])
+        in_graph = True
+    except Exception as e:
+        logger.error(f"Failed to add papers to the graph: {e}")
+
+    paper_index.set_many(
+        [
+            PaperState(
+                id=paper.id,
+                status=PaperStatus.ERROR if paper.id in failed else PaperStatus.EMBEDDED,
+                in_graph=in_graph and paper.id not in failed,
+            )
+            for paper in papers
+        ]
+    )
+
+    successes = len(papers) - len(failed)
+    logger.info(f"Indexed {successes}/{len(papers)} papers")
+    return successes
+
+
+def embed_batch(papers: list[Paper]) -> NDArray[np.float32] | None:
+    """
+    Embed a batch of papers, logging and returning None on failure.
+    """
+    try:
+        return embed_papers(papers)
+    except Exception as e:
+        logger.error(f"Failed to embed batch: {e}")
+        return None
+
+
 def process_batch(papers: list[Paper]) -> None:
     """
     Process a batch of papers by embedding them and updating the vector store and paper index.
@@ -51,63 +139,212 @@ def process_batch(papers: list[Paper]) -> None:
     if not papers:
         return
 
-    # Get vector store and paper index
-    vector_store = get_vector_store()
-    paper_index = get_paper_index()
-
     # Embed papers
+    vectors = embed_batch(papers)
+    if vectors is None:
+        return
+
     try:
-        vectors: NDArray[np.float32] = embed_papers(papers)
+        index_batch(papers, vectors)
     except Exception as e:
-        logger.error(f"Failed to embed batch: {e}")
-        return
+        logger.error(f"Failed to index batch: {e}")
+
+
+class StageMetrics:
+    """
+    Throughput counters for one stage of the pipelined worker.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.batches = 0
+        self.papers = 0
+        self.busy = 0.0  # seconds spent doing work, excluding waits on other stages
+        self.started = time()
+        self._lock = threading.Lock()
+
+    def record(self, papers: int, seconds: float) -> None:
+        """Record one processed batch."""
+        with self._lock:
+            self.batches += 1
+            self.papers += papers
+            self.busy += seconds
+
+    def snapshot(self) -> dict[str, float]:
+        """Return the counters, plus busy throughput and utilization of the stage."""
+        with self._lock:
+            elapsed = max(time() - self.started, 1e-9)
+            return {
+                "batches": self.batches,
+                "papers": self.papers,
+                "busy_seconds": round(self.busy, 3),
+                "papers_per_second": round(self.papers / self.busy, 2) if self.busy else 0.0,
+                "utilization": round(self.busy / elapsed, 3),
+            }
+
+
+class PipelinedWorker:
+    """
+    Worker that overlaps queue fetches, embedding and vector store writes.
+
+    Each stage runs on its own thread and hands batches to the next one through a
+    bounded queue, so at most `queue_size` batches wait between two stages. Calling
+    `stop` stops fetching new batches; batches already fetched still go through
+    embedding and indexing before the threads exit.
+
+    Batches are claimed into this worker's processing list and acknowledged only
+    once indexed, so papers of a worker that dies are requeued the next time a
+    worker starts. A batch that fails to embed or index is requeued right away,
+    up to `MAX_ATTEMPTS` times (see `fail_batch`). A separate thread refreshes the
+    worker's heartbeat until indexing finishes, since the fetch stage can block on
+    a full queue for longer than the heartbeat lives.
+    """
+
+    STAGES = ("fetch", "embed", "index")
+
+    def __init__(
+        self, redis_conn: Redis, batch_size: int = BATCH_SIZE, queue_size: int = QUEUE_SIZE
+    ):
+        self.redis_conn = redis_conn
+        self.batch_size = batch_size
+        self.worker = worker_id()
+        self.metrics = {name: StageMetrics(name) for name in self.STAGES}
+        # None is used as an end-of-stream marker between stages
+        self._embed_queue: Queue[tuple[list[Paper], list[Any]] | None] = Queue(maxsize=queue_size)
+        self._index_queue: Queue[tuple[list[Paper], NDArray[np.float32], list[Any]] | None] = Queue(
+            maxsize=queue_size
+        )
+        self._stop = threading.Event()
+        self._drained = threading.Event()  # set once the index stage has exited
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """Recover orphaned papers, then start the stage threads."""
+        register_worker(self.redis_conn, self.worker)
+        targets = (self._fetch_loop, self._embed_loop, self._index_loop)
+        for name, target in zip(self.STAGES, targets):
+            thread = threading.Thread(target=target, name=f"worker-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        threading.Thread(target=self._heartbeat_loop, name="worker-heartbeat", daemon=True).start()
+        logger.info("Pipelined worker started")
+
+    def stop(self) -> None:
+        """Stop fetching new batches and let in-flight batches drain."""
+        if not self._stop.is_set():
+            logger.info("Stopping worker, draining in-flight batches...")
+        self._stop.set()
+
+    def join(self, timeout: float | None = None) -> None:
+        """Wait for all stages to finish."""
+        for thread in self._threads:
+            thread.join(timeout)
 
-    successes = 0
+    def is_alive(self) -> bool:
+        """Return True while any stage is still running."""
+        return any(thread.is_alive() for thread in self._threads)
 
-    # Index papers in vector store and update paper index
-    for paper, vector in zip(papers, vectors):
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        """Return per-stage metrics and current queue depths."""
+        stats = {name: m.snapshot() for name, m in self.metrics.items()}
+        stats["queues"] = {
+            "embed": self._embed_queue.qsize(),
+            "index": self._index_queue.qsize(),
+        }
+        stats["engine"] = get_engine().stats()
+        return stats
+
+    def _fetch_loop(self) -> None:
+        backoff = SLEEP_INTERVAL
         try:
-            vector_store.index([paper], vector[np.newaxis, :])
-            paper_index.set(
-                PaperState(
-                    id=paper.id,
-                    status=PaperStatus.EMBEDDED,
-                    in_graph=False,
-                )
-            )
-            successes += 1
+            while not self._stop.is_set():
+                start = perf_counter()
+                raw_items = claim_batch(self.redis_conn, self.batch_size, self.worker)
+                papers = parse_batch(raw_items)
+
+                if not raw_items:
+                    logger.debug(f"No papers found, sleeping for {backoff:.1f}s...")
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, 60.0)  # Cap at 1 min
+                    continue
+
+                backoff = SLEEP_INTERVAL  # reset backoff
+                self.metrics["fetch"].record(len(papers), perf_counter() - start)
+                # Blocks while the embed stage is behind
+                self._embed_queue.put((papers, raw_items))
         except Exception as e:
-            logger.warning(f"Failed to index paper {paper.id}: {e}")
+            logger.error(f"Fetch stage failed: {e}")
+        finally:
+            self._embed_queue.put(None)
 
-    logger.info(f"Indexed {successes}/{len(papers)} papers")
+    def _embed_loop(self) -> None:
+        try:
+            while (item := self._embed_queue.get()) is not None:
+                papers, raw_items = item
+                start = perf_counter()
+                vectors = embed_batch(papers) if papers else np.empty((0, 0), np.float32)
+                if vectors is None:
+                    self._release(raw_items)
+                    continue
+                self.metrics["embed"].record(len(papers), perf_counter() - start)
+                self._index_queue.put((papers, vectors, raw_items))
+        finally:
+            self._index_queue.put(None)
+
+    def _index_loop(self) -> None:
+        try:
+            while (item := self._index_queue.get()) is not None:
+                papers, vectors, raw_items = item
+                start = perf_counter()
+                try:
+                    if papers:
+                        index_batch(papers, vectors)
+                    ack_batch(self.redis_conn, raw_items, self.worker)
+                except Exception as e:
+                    logger.error(f"Failed to index batch: {e}")
+                    self._release(raw_items)
+                    continue
+                self.metrics["index"].record(len(papers), perf_counter() - start)
+        finally:
+            self._drained.set()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._drained.wait(HEARTBEAT_INTERVAL):
+            try:
+                heartbeat(self.redis_conn, self.worker)
+            except Exception as e:
+                logger.error(f"Failed to refresh the worker heartbeat: {e}")
+
+    def _release(self, raw_items: list[Any]) -> None:
+        """Requeue a failed batch, leaving it claimed if Redis fails too."""
+        try:
+            fail_batch(self.redis_conn, raw_items, self.worker)
+        except Exception as e:
+            logger.error(f"Failed to requeue batch, kept until restart: {e}")
 
 
 def run_worker_loop() -> None:
     """
     Main loop for the worker process. Continuously fetches batches of papers from Redis,
     processes them, and updates the vector store and paper index.
+
+    Fetching, embedding and indexing are pipelined across threads. SIGINT and SIGTERM
+    stop fetching and wait for in-flight batches to finish.
     """
     logger.info("Starting worker loop...")
     redis_conn: Redis = get_redis_conn()
+    worker = PipelinedWorker(redis_conn)
 
-    backoff = SLEEP_INTERVAL
-
-    while True:
-        start_time = time()
-
-        papers = get_batch(redis_conn, BATCH_SIZE)
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: worker.stop())
 
-        if not papers:
-            logger.debug(f"No papers found, sleeping for {backoff:.1f}s...")
-            sleep(backoff)
-            backoff = min(backoff * 2, 60.0)  # Cap at 1 min
-            continue
+    worker.start()
+    while worker.is_alive():
+        worker.join(timeout=METRICS_INTERVAL)
+        logger.info(f"Worker metrics: {worker.snapshot()}")
 
-        backoff = SLEEP_INTERVAL  # reset backoff
-        process_batch(papers)
-
-        duration = time() - start_time
-        logger.info(f"Batch processed in {duration:.2f} seconds")
+    logger.info("Worker stopped.")
 
 
 def run_worker_once() -> int:
@@ -115,8 +352,23 @@ def run_worker_once() -> int:
     Run a single batch of the worker. Returns number of papers processed.
     """
     redis_conn: Redis = get_redis_conn()
-    papers = get_batch(redis_conn, BATCH_SIZE)
-    process_batch(papers)
+    worker = worker_id()
+    register_worker(redis_conn, worker)
+
+    raw_items = claim_batch(redis_conn, BATCH_SIZE, worker)
+    papers = parse_batch(raw_items)
+    if papers:
+        vectors = embed_batch(papers)
+        if vectors is None:
+            fail_batch(redis_conn, raw_items, worker)
+            return 0
+        try:
+            index_batch(papers, vectors)
+        except Exception as e:
+            logger.error(f"Failed to index batch: {e}")
+            fail_batch(redis_conn, raw_items, worker)
+            return 0
+    ack_batch(redis_conn, raw_items, worker)
     return len(papers)
 
 
@@ -0,0 +1,35 @@
+from typing import Any, Callable
+
+import pytest
+
+from src.models import Paper
+
+
+@pytest.fixture
+def make_papers() -> Callable[..., list[Paper]]:
+    """
+    Factory of papers numbered from `start`, with IDs like 2401.00003v1.
+
+    Keyword arguments override Paper fields, either with a value or with a
+    function of the paper number.
+    """
+
+    def make(count: int, start: int = 0, **fields: Any) -> list[Paper]:
+        return [
+            Paper(
+                **{
+                    "id": f"2401.{i:05d}v1",
+                    "url": f"http://arxiv.org/abs/2401.{i:05d}v1",
+                    "title": f"Title {i}",
+                    "abstract": f"Abstract {i}",
+                    "authors": [f"Author {i}"],
+                    **{
+                        name: field(i) if callable(field) else field
+                        for name, field in fields.items()
+                    },
+                }
+            )
+            for i in range(start, start + count)
+        ]
+
+    return make
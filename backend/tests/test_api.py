@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Callable
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import src.store.core as core
+from src.api import MAX_SEARCH_HOPS, router
+from src.models import Paper, SearchResult
+from src.store.csr_graph import CSRGraphStore
+
+
+@pytest.fixture
+def client(
+    tmp_path: Path, make_papers: Callable[..., list[Paper]], monkeypatch: pytest.MonkeyPatch
+) -> TestClient:
+    papers = make_papers(3)
+    graph = CSRGraphStore(directory=tmp_path)
+    graph.add_papers(papers[:2])  # the last hit is missing from the graph
+    graph.add_edges([papers[0].id], [papers[1].id], [0.5])
+    vector = MagicMock(embedding_model="model")
+    vector.search.return_value = [
+        SearchResult(id=paper.id, title=paper.title, authors=[], score=score)
+        for paper, score in zip(papers[::2], (0.9, 0.7))
+    ]
+    monkeypatch.setattr(core, "get_graph_store", lambda: graph)
+    monkeypatch.setattr(core, "get_vector_store", lambda: vector)
+    monkeypatch.setattr(core, "embed_query", lambda query, model: np.zeros(4, np.float32))
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return TestClient(app)
+
+
+def test_search_returns_hits_with_scores_and_their_graph(client: TestClient):
+    response = client.get("/api/search", params={"query": "graphs"})
+
+    assert response.status_code == 200
+    body = response.json()
+    results = [(r["id"], r["score"]) for r in body["results"]]
+    assert results == [("2401.00000v1", 0.9), ("2401.00002v1", 0.7), ("2401.00001v1", None)]
+    assert [n["id"] for n in body["graph"]["nodes"]] == [r[0] for r in results]
+    assert [(e["source"], e["target"]) for e in body["graph"]["edges"]] == [
+        ("2401.00000v1", "2401.00001v1")
+    ]
+
+
+def test_search_caps_hops(client: TestClient):
+    assert client.get("/api/search", params={"query": "q", "hops": MAX_SEARCH_HOPS}).is_success
+    response = client.get("/api/search", params={"query": "q", "hops": MAX_SEARCH_HOPS + 1})
+    assert response.status_code == 422
@@ -0,0 +1,176 @@
+import threading
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from src.arxiv import ResponseCache, fetch_papers_by_id, iter_papers, normalize_query
+
+TOTAL_PAPERS = 23
+ETAG = '"feed-v1"'
+
+
+def atom_feed(start: int, max_results: int) -> bytes:
+    entries = "".join(
+        f"""
+        <entry>
+            <id>http://arxiv.org/abs/2401.{i:05d}v1</id>
+            <title>Paper {i}</title>
+            <summary>Abstract {i}</summary>
+            <published>2024-01-{i + 1:02d}T12:00:00Z</published>
+            <updated>2024-01-{i + 1:02d}T12:00:00Z</updated>
+            <author><name>Author {i}</name></author>
+            <author><name>Author {i + 1}</name></author>
+            <arxiv:primary_category term="cs.LG" />
+            <category term="cs.LG" />
+            <category term="stat.ML" />
+        </entry>"""
+        for i in range(start, min(start + max_results, TOTAL_PAPERS))
+    )
+    return (
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom">'
+        f"{entries}</feed>"
+    ).encode()
+
+
+class StubArxivHandler(BaseHTTPRequestHandler):
+    requests_seen: list[dict[str, list[str]]] = []
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/api/query":
+            self.send_error(404)
+            return
+        params = parse_qs(url.query)
+        self.requests_seen.append(params)
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = atom_feed(int(params["start"][0]), int(params["max_results"][0]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_server() -> Iterator[str]:
+    StubArxivHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubArxivHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/api/query"
+    server.shutdown()
+    server.server_close()
+
+
+def test_iter_papers_pages_until_exhausted(stub_server: str):
+    papers = list(iter_papers("ml", page_size=10, delay=0, api_url=stub_server))
+
+    assert [p.id for p in papers] == [f"2401.{i:05d}v1" for i in range(TOTAL_PAPERS)]
+    assert papers[0].authors == ["Author 0", "Author 1"]
+    starts = [int(r["start"][0]) for r in StubArxivHandler.requests_seen]
+    assert starts == [0, 10, 20]
+
+
+def test_iter_papers_respects_max_results(stub_server: str):
+    papers = list(iter_papers("ml", max_results=12, page_size=10, delay=0, api_url=stub_server))
+
+    assert len(papers) == 12
+    sizes = [int(r["max_results"][0]) for r in StubArxivHandler.requests_seen]
+    assert sizes == [10, 2]
+
+
+def test_iter_papers_is_lazy(stub_server: str):
+    stream = iter_papers("ml", page_size=5, delay=0, api_url=stub_server)
+
+    first = next(stream)
+    stream.close()
+
+    assert first.id == "2401.00000v1"
+    assert len(StubArxivHandler.requests_seen) == 1
+
+
+def test_iter_papers_raises_on_http_error(stub_server: str):
+    with pytest.raises(requests.HTTPError):
+        list(iter_papers("ml", delay=0, api_url=stub_server.replace("/api/query", "/missing")))
+
+
+def test_iter_papers_parses_dates(stub_server: str):
+    paper = next(iter_papers("ml", max_results=1, delay=0, api_url=stub_server))
+
+    assert paper.published == datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    assert paper.updated == datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    assert paper.primary_category == "cs.LG"
+
+
+def test_iter_papers_since_filters_and_sorts(stub_server: str):
+    since = datetime(2024, 1, 20, 12, tzinfo=timezone.utc)
+    papers = list(iter_papers("ml", since=since, delay=0, api_url=stub_server))
+
+    # Entry 19 was updated exactly at the cursor and must not be returned again
+    assert [p.id for p in papers] == [f"2401.{i:05d}v1" for i in range(20, TOTAL_PAPERS)]
+    params = StubArxivHandler.requests_seen[0]
+    assert params["sortBy"] == ["lastUpdatedDate"]
+    assert params["sortOrder"] == ["ascending"]
+    assert "lastUpdatedDate:[202401201200 TO" in params["search_query"][0]
+
+
+def test_fetch_papers_by_id_pages_through_ids(stub_server: str):
+    ids = [f"2401.{i:05d}v1" for i in range(5)]
+
+    papers = fetch_papers_by_id(ids, page_size=2, delay=0, api_url=stub_server)
+
+    assert len(papers) == 5
+    id_lists = [r["id_list"][0] for r in StubArxivHandler.requests_seen]
+    assert id_lists == [",".join(ids[:2]), ",".join(ids[2:4]), ids[4]]
+
+
+def test_normalize_query():
+    assert normalize_query("  Graph   Neural\tNetworks ") == "graph neural networks"
+
+
+def test_cache_serves_repeated_queries(stub_server: str, tmp_path: Path):
+    cache = ResponseCache(directory=tmp_path, ttl=3600, max_bytes=10**6)
+
+    first = list(iter_papers("ml", page_size=10, delay=0, api_url=stub_server, cache=cache))
+    second = list(iter_papers("ml", page_size=10, delay=0, api_url=stub_server, cache=cache))
+
+    assert first == second
+    assert len(StubArxivHandler.requests_seen) == 3
+    assert cache.stats()["misses"] == 3
+    assert cache.stats()["hits"] == 3
+
+
+def test_cache_revalidates_stale_entries(stub_server: str, tmp_path: Path):
+    cache = ResponseCache(directory=tmp_path, ttl=0, max_bytes=10**6)
+
+    list(iter_papers("ml", max_results=5, delay=0, api_url=stub_server, cache=cache))
+    papers = list(iter_papers("ml", max_results=5, delay=0, api_url=stub_server, cache=cache))
+
+    assert len(papers) == 5
+    assert len(StubArxivHandler.requests_seen) == 2
+    assert cache.stats()["revalidations"] == 1
+
+
+def test_cache_evicts_least_recently_used(stub_server: str, tmp_path: Path):
+    cache = ResponseCache(directory=tmp_path, ttl=3600, max_bytes=1)
+
+    list(iter_papers("ml", page_size=10, delay=0, api_url=stub_server, cache=cache))
+
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["evictions"] == 2
+    assert len(list(tmp_path.glob("*.xml"))) == 1
+
+    # The cache index is rebuilt from disk
+    assert ResponseCache(directory=tmp_path, max_bytes=1).stats()["entries"] == 1
@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import pytest
+
+from src.models import Paper
+from src.store.coauthor import add_coauthor_edges, author_weight
+from src.store.csr_graph import CSRGraphStore
+
+
+def make_paper(number: int, authors: list[str]) -> Paper:
+    return Paper(
+        id=f"2401.{number:05d}v1",
+        url=f"http://arxiv.org/abs/2401.{number:05d}v1",
+        title=f"Title {number}",
+        abstract=f"Abstract {number}",
+        authors=authors,
+    )
+
+
+@pytest.fixture
+def graph(tmp_path: Path) -> CSRGraphStore:
+    return CSRGraphStore(directory=tmp_path)
+
+
+def test_new_papers_are_linked_to_papers_sharing_authors(graph: CSRGraphStore):
+    first = [
+        make_paper(0, ["Ada Lovelace", "Alan Turing"]),
+        make_paper(1, ["Grace Hopper"]),
+    ]
+    add_coauthor_edges(first, graph)
+    # Author names are matched by key, so spelling variants link too
+    second = [
+        make_paper(2, ["A. Lovelace", "Turing, Alan"]),
+        make_paper(3, ["Grace Hopper", "Ada Lovelace"]),
+    ]
+
+    assert add_coauthor_edges(second, graph) == 8
+
+    assert graph.get_related_ids(first[0].id) == [second[0].id, second[1].id]
+    assert graph.get_related_ids(second[1].id) == [first[1].id, first[0].id, second[0].id]
+    assert graph.get_related_ids(first[1].id) == [second[1].id]
+    assert graph.get_author_paper_ids("lovelace_a") == (3, [p.id for p in (first[0], *second)])
+
+
+def test_edge_weights_sum_shared_authors_and_shrink_for_prolific_ones(graph: CSRGraphStore):
+    papers = [make_paper(i, ["Ada Lovelace", "Alan Turing"]) for i in range(2)]
+    add_coauthor_edges(papers, graph)
+    papers += [make_paper(i, ["Ada Lovelace"]) for i in range(2, 4)]
+    add_coauthor_edges(papers[2:], graph)
+    graph.compact()
+
+    def weight(source: int, target: int) -> float:
+        node, other = graph.index[papers[source].id], graph.index[papers[target].id]
+        lo, hi = graph.offsets[node], graph.offsets[node + 1]
+        return float(graph.weights[lo:hi][list(graph.neighbors[lo:hi]).index(other)])
+
+    # Lovelace has 2 papers when paper 1 arrives and 4 when papers 2 and 3 do
+    assert weight(1, 0) == pytest.approx(author_weight(2) + author_weight(2))
+    assert weight(3, 0) == pytest.approx(author_weight(4))
+    assert weight(0, 1) == weight(1, 0)
+    assert author_weight(2) == 1.0 and author_weight(4) == 0.5
+
+
+def test_hub_authors_are_capped(graph: CSRGraphStore):
+    hub = [make_paper(i, ["Prolific Author"]) for i in range(10)]
+    add_coauthor_edges(hub[:9], graph, hub_cap=3)
+
+    assert add_coauthor_edges(hub[9:], graph, hub_cap=3) == 6
+
+    # The new paper only links to the author's latest papers
+    assert set(graph.get_related_ids(hub[9].id)) == {p.id for p in hub[6:9]}
+    # 3 edges per paper at most, each counted in both directions
+    assert graph.edge_count == 2 * (0 + 1 + 2 + 3 * 7)
+
+
+def test_updated_authors_move_in_the_index(graph: CSRGraphStore):
+    paper = make_paper(0, ["Ada Lovelace"])
+    add_coauthor_edges([paper], graph)
+    add_coauthor_edges([paper.model_copy(update={"authors": ["Alan Turing"]})], graph)
+
+    assert graph.get_author_paper_ids("lovelace_a") == (0, [])
+    assert graph.get_author_paper_ids("turing_a", limit=1) == (1, [paper.id])
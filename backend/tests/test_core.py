@@ -0,0 +1,132 @@
+from pathlib import Path
+from typing import Callable
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+import src.store.core as core
+from src.models import Paper, SearchResult
+from src.store.csr_graph import CSRGraphStore
+
+
+@pytest.fixture
+def papers(make_papers: Callable[..., list[Paper]]) -> list[Paper]:
+    return make_papers(6)
+
+
+@pytest.fixture
+def graph(tmp_path: Path, papers: list[Paper], monkeypatch: pytest.MonkeyPatch) -> CSRGraphStore:
+    graph = CSRGraphStore(directory=tmp_path)
+    graph.add_papers(papers)
+    # 0 - 1 - 2 - 3, 4 - 5
+    graph.add_edges(
+        [p.id for p in papers[:3]] + [papers[4].id],
+        [p.id for p in papers[1:4]] + [papers[5].id],
+        [0.9, 0.8, 0.2, 0.5],
+    )
+    monkeypatch.setattr(core, "get_graph_store", lambda: graph)
+    return graph
+
+
+@pytest.fixture
+def vector(papers: list[Paper], monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    vector = MagicMock(embedding_model="model")
+    vector.search.return_value = [
+        SearchResult(id=papers[i].id, title=papers[i].title, authors=[], score=1.0 - i / 10)
+        for i in (0, 4)
+    ]
+    monkeypatch.setattr(core, "get_vector_store", lambda: vector)
+    monkeypatch.setattr(core, "embed_query", lambda query, model: np.zeros(4, np.float32))
+    return vector
+
+
+@pytest.mark.parametrize(
+    "hops, min_weight, expected",
+    [
+        (0, 0.0, [0, 4]),
+        (1, 0.0, [0, 4, 1, 5]),
+        (2, 0.0, [0, 4, 1, 5, 2]),
+        (3, 0.5, [0, 4, 1, 5, 2]),
+    ],
+)
+def test_search_expands_hits_in_the_graph(
+    graph: CSRGraphStore,
+    vector: MagicMock,
+    papers: list[Paper],
+    hops: int,
+    min_weight: float,
+    expected: list[int],
+):
+    results = core.search("graphs", expand_hops=hops, min_weight=min_weight)
+
+    assert [r.id for r in results] == [papers[i].id for i in expected]
+
+
+def test_search_expansion_is_one_graph_call(
+    graph: CSRGraphStore, vector: MagicMock, papers: list[Paper], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(graph, "get_related_ids", pytest.fail)
+
+    results = core.search("graphs", expand_hops=3, max_nodes=3)
+
+    assert [r.id for r in results] == [papers[i].id for i in (0, 4, 1)]
+
+
+def test_search_keeps_hits_and_scores_the_graph_lacks(
+    graph: CSRGraphStore, vector: MagicMock, papers: list[Paper]
+):
+    missing = SearchResult(id="2401.99999v1", title="Not in the graph", authors=["A"], score=0.95)
+    vector.search.return_value.insert(1, missing)
+
+    results = core.search("graphs", expand_hops=1, rerank=False)
+
+    assert [r.id for r in results] == [
+        papers[0].id,
+        missing.id,
+        papers[4].id,
+        papers[1].id,
+        papers[5].id,
+    ]
+    assert [r.score for r in results] == [1.0, 0.95, 0.6, None, None]
+    assert results[1] == missing
+    # Papers the graph knows come from the graph
+    assert results[0].authors == papers[0].authors
+
+
+def test_search_reranks_by_graph_proximity_to_the_hits(
+    graph: CSRGraphStore, vector: MagicMock, papers: list[Paper]
+):
+    vector.search.return_value = [
+        SearchResult(id=papers[i].id, title=papers[i].title, authors=[], score=score)
+        for i, score in ((4, 0.55), (0, 0.5), (2, 0.5))
+    ]
+
+    plain = core.search("graphs", expand_hops=1)
+    reranked = core.search("graphs", expand_hops=1, rerank=True)
+
+    assert [r.id for r in plain] == [papers[i].id for i in (4, 0, 2, 1, 5, 3)]
+    # Paper 2 is linked to more of the result set than paper 0, with the same cosine
+    assert [r.id for r in reranked] == [papers[i].id for i in (4, 2, 0, 1, 5, 3)]
+    assert all(a.score >= b.score for a, b in zip(reranked, reranked[1:]))
+
+
+def test_result_graph_links_the_results(graph: CSRGraphStore, papers: list[Paper]):
+    graph.add_edges([papers[1].id], [papers[0].id], [0.4], edge_type="similar", symmetric=False)
+    results = graph.get_papers_by_ids([papers[i].id for i in (0, 4, 1, 5, 3)])
+
+    data = core.result_graph(results)
+
+    assert [node.id for node in data.nodes] == [r.id for r in results]
+    related = {node.id: node.related_ids for node in data.nodes}
+    assert related == {
+        papers[0].id: [papers[1].id],
+        papers[4].id: [papers[5].id],
+        papers[1].id: [papers[0].id],
+        papers[5].id: [papers[4].id],
+        papers[3].id: [],
+    }
+    edges = {(e.source, e.target): e.weight for e in data.edges}
+    assert edges == pytest.approx(
+        {(papers[0].id, papers[1].id): 0.9, (papers[4].id, papers[5].id): 0.5}
+    )
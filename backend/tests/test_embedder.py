@@ -0,0 +1,214 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import sleep
+from typing import Any
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+import src.embedder as embedder
+from src.embedder.backends import OnnxBackend, TorchBackend, normalizer_lowercases
+from src.embedder.cache import EmbeddingCache, QueryCache
+from src.embedder.engine import EmbeddingEngine, estimate_tokens, plan_batches
+from src.models import Paper
+
+DIM = 8
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> EmbeddingCache:
+    return EmbeddingCache("test-model", DIM, directory=tmp_path, lru_size=2)
+
+
+@pytest.fixture
+def fake_model(monkeypatch: pytest.MonkeyPatch, cache: EmbeddingCache) -> MagicMock:
+    model = MagicMock()
+    # Deterministic fake embedding: the text length repeated
+    model.encode.side_effect = lambda texts, **_: np.array(
+        [[len(t)] * DIM for t in texts], dtype=np.float32
+    )
+    monkeypatch.setattr(embedder, "_model", model)
+    monkeypatch.setattr(embedder, "_cache", cache)
+    monkeypatch.setattr(embedder, "_engine", None)
+    return model
+
+
+def make_paper(pid: str, abstract: str) -> Paper:
+    return Paper(id=pid, url=f"http://x/{pid}", title="T", abstract=abstract, authors=[])
+
+
+def test_cache_roundtrip_and_persistence(cache: EmbeddingCache, tmp_path: Path):
+    texts = ["alpha", "beta", "gamma"]
+    vectors = np.arange(3 * DIM, dtype=np.float32).reshape(3, DIM)
+    cache.store(texts, vectors)
+
+    found, missing = cache.lookup(["beta", "delta", "alpha"])
+    assert missing == [1]
+    np.testing.assert_array_equal(found[0], vectors[1])
+    np.testing.assert_array_equal(found[2], vectors[0])
+
+    # A fresh instance reads the rows back from disk
+    reopened = EmbeddingCache("test-model", DIM, directory=tmp_path)
+    found, missing = reopened.lookup(texts)
+    assert missing == []
+    np.testing.assert_array_equal(found, vectors)
+
+
+def test_cache_is_keyed_by_model_and_normalized_text(cache: EmbeddingCache, tmp_path: Path):
+    cache.store(["graph  neural\nnetworks"], np.ones((1, DIM), dtype=np.float32))
+
+    assert cache.lookup([" graph neural networks "])[1] == []
+    other = EmbeddingCache("other-model", DIM, directory=tmp_path)
+    assert other.lookup(["graph neural networks"])[1] == [0]
+
+
+def test_cache_ignores_duplicate_rows(cache: EmbeddingCache):
+    cache.store(["a", "a"], np.ones((2, DIM), dtype=np.float32))
+    cache.store(["a"], np.ones((1, DIM), dtype=np.float32))
+
+    assert len(cache) == 1
+    assert cache.vectors_path.stat().st_size == DIM * 4
+
+
+def test_embed_papers_skips_model_for_cached_abstracts(fake_model: MagicMock):
+    first = embedder.embed_papers([make_paper("1", "abc"), make_paper("2", "abcd")])
+    # v2 of paper 1 with an identical abstract, plus a new paper sharing an abstract
+    second = embedder.embed_papers(
+        [make_paper("1v2", "abc"), make_paper("3", "xy"), make_paper("4", "xy")]
+    )
+
+    assert fake_model.encode.call_count == 2
+    assert fake_model.encode.call_args.args[0] == ["xy"]
+    np.testing.assert_array_equal(second[0], first[0])
+    assert second[1][0] == second[2][0] == 2
+
+
+def test_plan_batches_respects_token_budget():
+    texts = ["x" * n for n in (40, 1000, 8, 400, 12, 1000)]
+    batches = plan_batches(texts, token_budget=600)
+
+    assert sorted(i for b in batches for i in b) == list(range(len(texts)))
+    for batch in batches:
+        longest = max(estimate_tokens(texts[i]) for i in batch)
+        assert len(batch) == 1 or len(batch) * longest <= 600
+    # Longest texts come first and are not padded together with short ones
+    assert batches == [[1, 5], [3, 0, 4, 2]]
+
+
+def test_engine_preserves_input_order():
+    model = MagicMock()
+    model.encode.side_effect = lambda texts, **_: np.array(
+        [[len(t)] * DIM for t in texts], dtype=np.float32
+    )
+    engine = EmbeddingEngine(lambda: model, processes=0, token_budget=64)
+    texts = ["a" * n for n in (5, 300, 17, 120, 1, 64)]
+
+    vectors = engine.encode(texts)
+
+    assert model.encode.call_count > 1
+    np.testing.assert_array_equal(vectors[:, 0], [len(t) for t in texts])
+    assert engine.stats()["texts"] == len(texts)
+    assert engine.stats()["texts_per_second"] > 0
+
+
+def test_onnx_backend_matches_torch(tmp_path: Path):
+    pytest.importorskip("onnxruntime")
+    from huggingface_hub import try_to_load_from_cache
+
+    repo = f"sentence-transformers/{embedder.MODEL_NAME}"
+    if not isinstance(try_to_load_from_cache(repo, "config.json"), str):
+        pytest.skip(f"{repo} is not in the local Hugging Face cache")
+
+    texts = [
+        "Graph neural networks for citation recommendation.",
+        "We study retrieval-augmented generation over scientific literature. " * 8,
+        "attention",
+    ]
+    reference = TorchBackend(embedder.MODEL_NAME).encode(texts)
+    quantized = OnnxBackend(embedder.MODEL_NAME, directory=tmp_path).encode(texts)
+
+    assert quantized.shape == reference.shape == (len(texts), embedder.EMBEDDING_DIM)
+    cosine = (reference * quantized).sum(axis=1)
+    assert cosine.min() > 0.98
+
+
+def test_embed_query_reuses_normalized_queries(
+    fake_model: MagicMock, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(embedder, "_query_cache", QueryCache(maxsize=2, lowercase=True))
+
+    first = embedder.embed_query("Graph RAG")
+    assert embedder.embed_query("  graph   rag ") is first
+    assert fake_model.encode.call_count == 1
+    assert not first.flags.writeable
+
+    embedder.embed_query("b")
+    embedder.embed_query("c")  # evicts "graph rag"
+    embedder.embed_query("graph rag")
+    assert fake_model.encode.call_count == 4
+    assert embedder.get_query_cache().stats()["hit_rate"] == 0.2
+
+
+def test_embed_query_batches_uncached_queries(
+    fake_model: MagicMock, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(embedder, "_query_cache", QueryCache(maxsize=10, lowercase=True))
+    embedder.embed_query("cached")
+
+    vectors = embedder.embed_query(["ab", "cached", "abcd", "AB"])
+
+    assert vectors.shape == (4, DIM)
+    np.testing.assert_array_equal(vectors[:, 0], [2, 6, 4, 2])
+    assert fake_model.encode.call_count == 2
+    assert sorted(fake_model.encode.call_args.args[0]) == ["ab", "abcd"]
+
+
+def test_query_cache_keeps_case_for_cased_models(
+    fake_model: MagicMock, monkeypatch: pytest.MonkeyPatch
+):
+    fake_model.lowercase = False
+    monkeypatch.setattr(embedder, "_query_cache", None)
+
+    embedder.embed_query("BERT")
+    embedder.embed_query(" BERT ")
+    embedder.embed_query("bert")
+
+    assert not embedder.get_query_cache().lowercase
+    assert fake_model.encode.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "normalizer, lowercase",
+    [
+        (None, False),
+        ({"type": "BertNormalizer", "lowercase": True, "strip_accents": None}, True),
+        ({"type": "BertNormalizer", "lowercase": False}, False),
+        ({"type": "Sequence", "normalizers": [{"type": "NFC"}, {"type": "Lowercase"}]}, True),
+        ({"type": "Sequence", "normalizers": [{"type": "NFKC"}]}, False),
+    ],
+)
+def test_normalizer_lowercases(normalizer: dict[str, Any] | None, lowercase: bool):
+    assert normalizer_lowercases(normalizer) is lowercase
+
+
+@pytest.mark.parametrize("model_name", [embedder.MODEL_NAME, "other-model"])
+def test_concurrent_first_calls_load_the_model_once(
+    monkeypatch: pytest.MonkeyPatch, model_name: str
+):
+    loads: list[str] = []
+
+    def load_backend(backend: str, name: str) -> MagicMock:
+        loads.append(name)
+        sleep(0.05)  # long enough for every thread to find no model
+        return MagicMock()
+
+    monkeypatch.setattr(embedder, "load_backend", load_backend)
+    monkeypatch.setattr(embedder, "_model", None)
+    monkeypatch.setattr(embedder, "_models", {})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        models = list(pool.map(lambda _: embedder.get_model(model_name), range(8)))
+
+    assert loads == [model_name]
+    assert all(model is models[0] for model in models)
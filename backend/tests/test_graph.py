@@ -0,0 +1,279 @@
+import time
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+import src.store.csr_graph as csr_graph
+import src.store.graph as graph
+from src.models import Paper
+from src.store.csr_graph import CSRGraphStore
+from src.store.graph import MockStore, get_graph_store
+from src.store.local_vector import epoch_seconds
+
+
+@pytest.fixture
+def make_papers(make_papers: Callable[..., list[Paper]]) -> Callable[..., list[Paper]]:
+    return partial(
+        make_papers,
+        published=lambda i: datetime(2024, 1, 1 + i % 28, tzinfo=timezone.utc),
+        primary_category="cs.LG",
+    )
+
+
+@pytest.fixture
+def papers(make_papers: Callable[..., list[Paper]]) -> list[Paper]:
+    return make_papers(6)
+
+
+@pytest.fixture
+def store(tmp_path: Path, papers: list[Paper]) -> CSRGraphStore:
+    store = CSRGraphStore(directory=tmp_path)
+    store.add_papers(papers)
+    return store
+
+
+def ids(papers: list[Paper], *indices: int) -> list[str]:
+    return [papers[i].id for i in indices]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_related_ids_are_ordered_by_weight_in_both_directions(
+    store: CSRGraphStore, papers: list[Paper], compact: bool
+):
+    assert store.add_edges(ids(papers, 0, 0, 0), ids(papers, 1, 2, 3), [0.2, 0.9, 0.5]) == 6
+    if compact:
+        store.compact()
+
+    assert store.get_related_ids(papers[0].id) == ids(papers, 2, 3, 1)
+    assert store.get_related_ids(papers[2].id) == ids(papers, 0)
+    assert store.get_related_ids(papers[4].id) == []
+    assert store.get_related_ids("unknown") == []
+    assert store.edge_count == 6
+
+
+def test_newer_edges_replace_older_weights_across_compactions(
+    store: CSRGraphStore, papers: list[Paper]
+):
+    store.add_edges(ids(papers, 0, 0), ids(papers, 1, 2), [0.9, 0.1])
+    store.compact()
+    store.add_edges(ids(papers, 0), ids(papers, 2), [1.0])
+
+    # The delta overrides the compacted weight before and after the next compaction
+    assert store.get_related_ids(papers[0].id) == ids(papers, 2, 1)
+    store.compact()
+    assert store.get_related_ids(papers[0].id) == ids(papers, 2, 1)
+    assert store.edge_count == 4
+
+
+def test_edge_types_are_merged_in_related_ids(store: CSRGraphStore, papers: list[Paper]):
+    store.add_edges(ids(papers, 0), ids(papers, 1), [0.5])
+    store.add_edges(ids(papers, 0, 0), ids(papers, 1, 2), [0.3, 0.4], edge_type="similar")
+    store.compact()
+
+    assert store.get_related_ids(papers[0].id) == ids(papers, 1, 2)
+    assert store.edge_count == 6
+    with pytest.raises(ValueError):
+        store.add_edges(ids(papers, 0), ids(papers, 1), [0.5], edge_type="cites")
+
+
+def test_edges_to_unknown_papers_and_loops_are_skipped(store: CSRGraphStore, papers: list[Paper]):
+    added = store.add_edges(
+        [papers[0].id, papers[1].id, "unknown"], [papers[0].id, "unknown", papers[2].id], [1, 1, 1]
+    )
+
+    assert added == 0
+    assert store.edge_count == 0
+
+
+def test_appends_compact_automatically(
+    store: CSRGraphStore, papers: list[Paper], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(csr_graph, "COMPACT_EDGES", 4)
+    store.add_edges(ids(papers, 0), ids(papers, 1), [0.5])
+    assert store.csr_path.exists() is False
+
+    store.add_edges(ids(papers, 2), ids(papers, 3), [0.5])
+
+    assert store.csr_path.exists()
+    assert store.edges_path.stat().st_size == 0
+    assert store.get_related_ids(papers[3].id) == ids(papers, 2)
+
+
+def test_store_reloads_from_disk(tmp_path: Path, store: CSRGraphStore, papers: list[Paper]):
+    store.add_edges(ids(papers, 0, 1), ids(papers, 1, 2), [0.5, 0.7])
+    store.compact()
+    store.add_edges(ids(papers, 3), ids(papers, 4), [0.1])
+
+    reopened = CSRGraphStore(directory=tmp_path)
+
+    assert len(reopened) == len(papers)
+    assert reopened.get_related_ids(papers[1].id) == ids(papers, 2, 0)
+    assert reopened.get_related_ids(papers[4].id) == ids(papers, 3)
+    assert reopened.published[0] == int(papers[0].published.timestamp())
+    assert reopened.categories[0] == "cs.LG"
+
+
+def test_store_sees_writes_of_another_instance(
+    tmp_path: Path, store: CSRGraphStore, make_papers: Callable[..., list[Paper]]
+):
+    other = CSRGraphStore(directory=tmp_path)
+    fresh = make_papers(2, start=6)
+
+    other.add_papers(fresh)
+    other.add_edges(ids(fresh, 0), ids(fresh, 1), [0.5])
+    assert store.get_related_ids(fresh[0].id) == ids(fresh, 1)
+
+    other.compact()
+    assert store.get_related_ids(fresh[1].id) == ids(fresh, 0)
+    assert len(store) == 8
+
+
+def test_naive_dates_are_read_as_utc(
+    store: CSRGraphStore, papers: list[Paper], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    naive = papers[0].model_copy(update={"published": datetime(2024, 3, 1, 12)})
+
+    store.add_papers([naive])
+
+    monkeypatch.undo()
+    time.tzset()
+    assert store.published[0] == epoch_seconds(naive.published)
+    assert store.published[0] == int(datetime(2024, 3, 1, 12, tzinfo=timezone.utc).timestamp())
+
+
+def test_papers_by_ids_come_from_the_node_table(store: CSRGraphStore, papers: list[Paper]):
+    store.add_papers([papers[1].model_copy(update={"title": "Renamed"})])
+
+    results = store.get_papers_by_ids([papers[1].id, "unknown", papers[0].id])
+
+    assert [(r.id, r.title) for r in results] == [
+        (papers[1].id, "Renamed"),
+        (papers[0].id, "Title 0"),
+    ]
+    assert results[1].authors == ["Author 0"]
+    assert len(store) == len(papers)
+
+
+def test_graph_backends_are_registered(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(csr_graph, "CSRGraphStore", lambda: CSRGraphStore(tmp_path))
+    monkeypatch.setattr(graph, "_graph_stores", {})
+
+    store = get_graph_store("csr")
+
+    assert isinstance(store, CSRGraphStore)
+    assert store.is_healthy()
+    assert get_graph_store("csr") is store
+    assert isinstance(get_graph_store("mock"), MockStore)
+    with pytest.raises(ValueError):
+        get_graph_store("neo4j")
+
+
+@pytest.fixture
+def chain(store: CSRGraphStore, papers: list[Paper]) -> CSRGraphStore:
+    # 0 - 1 - 2 - 3 - 4, and 0 - 5 with a light edge
+    store.add_edges(
+        ids(papers, 0, 1, 2, 3, 0), ids(papers, 1, 2, 3, 4, 5), [0.9, 0.8, 0.7, 0.6, 0.1]
+    )
+    return store
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_neighbors_many_expands_hop_by_hop(
+    chain: CSRGraphStore, papers: list[Paper], compact: bool
+):
+    if compact:
+        chain.compact()
+
+    assert chain.neighbors_many(ids(papers, 0), hops=0) == ids(papers, 0)
+    assert chain.neighbors_many(ids(papers, 0), hops=1) == ids(papers, 0, 1, 5)
+    assert chain.neighbors_many(ids(papers, 0), hops=2) == ids(papers, 0, 1, 5, 2)
+    seeds = ids(papers, 0, 4, 0) + ["unknown"]
+    assert chain.neighbors_many(seeds, hops=1) == ids(papers, 0, 4, 1, 3, 5)
+
+
+def test_neighbors_many_prunes_by_weight_and_budget(chain: CSRGraphStore, papers: list[Paper]):
+    assert chain.neighbors_many(ids(papers, 0), hops=4, min_weight=0.5) == ids(
+        papers, 0, 1, 2, 3, 4
+    )
+    # The strongest edges of a hop are followed first
+    assert chain.neighbors_many(ids(papers, 0), hops=4, max_nodes=2) == ids(papers, 0, 1)
+    assert chain.neighbors_many(ids(papers, 0, 2), hops=1, max_nodes=4) == ids(papers, 0, 2, 1, 3)
+
+
+def test_neighbors_many_mixes_compacted_and_appended_edges(
+    chain: CSRGraphStore, papers: list[Paper], make_papers: Callable[..., list[Paper]]
+):
+    chain.compact()
+    fresh = make_papers(1, start=6)
+    chain.add_papers(fresh)
+    chain.add_edges(ids(papers, 1), ids(fresh, 0), [1.0])
+    chain.remove_edges(ids(papers, 1), ids(papers, 2))
+
+    assert chain.neighbors_many(ids(papers, 1), hops=2) == [
+        papers[1].id,
+        fresh[0].id,
+        papers[0].id,
+        papers[5].id,
+    ]
+    # The visited bitmap is cleared between calls
+    assert chain.neighbors_many(ids(papers, 1), hops=1) == [papers[1].id, fresh[0].id, papers[0].id]
+
+
+def test_centrality_is_served_before_compaction(
+    chain: CSRGraphStore, papers: list[Paper], monkeypatch: pytest.MonkeyPatch
+):
+    ranks = [r.centrality for r in chain.get_papers_by_ids(ids(papers, 0, 1, 2, 3, 4, 5))]
+
+    assert sum(ranks) == pytest.approx(1.0, abs=1e-5)
+    # The middle of the chain is more central than its ends
+    assert ranks[1] > ranks[0] > ranks[5] and ranks[2] > ranks[4]
+    chain.compact()
+    compacted = [r.centrality for r in chain.get_papers_by_ids(ids(papers, 0, 1, 2, 3, 4, 5))]
+    assert compacted == pytest.approx(ranks, abs=1e-5)
+
+
+def test_centrality_follows_appended_edges_and_nodes(
+    tmp_path: Path,
+    chain: CSRGraphStore,
+    papers: list[Paper],
+    make_papers: Callable[..., list[Paper]],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    chain.compact()
+    before = chain.get_papers_by_ids(ids(papers, 5))[0].centrality
+    monkeypatch.setattr(csr_graph, "CENTRALITY_REFRESH", 3600.0)
+    fresh = make_papers(2, start=6)
+    chain.add_papers(fresh)
+    chain.add_edges(ids(fresh, 0, 1), ids(papers, 5, 5), [1.0, 1.0])
+
+    # Between refreshes, new papers get a provisional rank instead of none
+    provisional = [r.centrality for r in chain.get_papers_by_ids(ids(fresh, 0, 1))]
+    assert provisional[0] == provisional[1] > 0
+    assert chain.get_papers_by_ids(ids(papers, 5))[0].centrality == before
+
+    monkeypatch.setattr(csr_graph, "CENTRALITY_REFRESH", 0.0)
+    ranks = [r.centrality for r in chain.get_papers_by_ids([p.id for p in papers + fresh])]
+    assert sum(ranks) == pytest.approx(1.0, abs=1e-5)
+    # Paper 5 gained two neighbors, without a compaction
+    assert ranks[5] > before
+    # Another process computes the same ranks from the files
+    reopened = CSRGraphStore(directory=tmp_path)
+    other = [r.centrality for r in reopened.get_papers_by_ids([p.id for p in papers + fresh])]
+    assert other == pytest.approx(ranks, abs=1e-5)
+
+
+def test_subgraph_keeps_the_edges_between_the_papers(chain: CSRGraphStore, papers: list[Paper]):
+    chain.compact()
+    chain.add_edges(ids(papers, 4), ids(papers, 5), [0.3], edge_type="similar")
+
+    offsets, neighbors, weights = chain.subgraph(ids(papers, 2, 5, 1, 4) + ["unknown"])
+
+    rows = [neighbors[lo:hi].tolist() for lo, hi in zip(offsets[:-1], offsets[1:])]
+    assert rows == [[2], [3], [0], [1], []]
+    assert weights.tolist() == pytest.approx([0.8, 0.3, 0.8, 0.3])
+    assert len(chain.subgraph([])[0]) == 1
@@ -1,5 +1,5 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
 import pytest
@@ -72,3 +72,62 @@ def test_update_existing_paper(paper_index: PaperIndex):
     assert retrieved is not None
     assert retrieved.status == PaperStatus.EMBEDDED
     assert retrieved.in_graph is True
+
+
+def test_set_many_updates_existing_papers(paper_index: PaperIndex):
+    paper_id = str(uuid.uuid4())
+    paper_index.set_many([PaperState(id=paper_id, status=PaperStatus.SEEN)])
+    paper_index.set_many([PaperState(id=paper_id, status=PaperStatus.QUEUED)])
+
+    retrieved = paper_index.get(paper_id)
+
+    assert retrieved is not None
+    assert retrieved.status == PaperStatus.QUEUED
+
+
+def test_set_many_without_overwrite_keeps_existing(paper_index: PaperIndex):
+    known, new = str(uuid.uuid4()), str(uuid.uuid4())
+    paper_index.set(PaperState(id=known, status=PaperStatus.EMBEDDED))
+
+    paper_index.set_many(
+        [
+            PaperState(id=known, status=PaperStatus.SEEN),
+            PaperState(id=new, status=PaperStatus.SEEN),
+        ],
+        overwrite=False,
+    )
+
+    assert paper_index.get(known).status == PaperStatus.EMBEDDED
+    assert paper_index.get(new).status == PaperStatus.SEEN
+
+
+def test_query_cursor_roundtrip(paper_index: PaperIndex):
+    assert paper_index.get_cursor("graph neural networks") is None
+
+    cursor = datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc)
+    paper_index.set_cursor("graph neural networks", cursor)
+    assert paper_index.get_cursor("graph neural networks") == cursor
+
+    later = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    paper_index.set_cursor("graph neural networks", later)
+    assert paper_index.get_cursor("graph neural networks") == later
+
+
+def test_get_many_returns_known_papers(paper_index: PaperIndex):
+    paper_ids = [str(uuid.uuid4()) for _ in range(3)]
+    paper_index.set_many([PaperState(id=pid, status=PaperStatus.QUEUED) for pid in paper_ids])
+
+    states = paper_index.get_many([*paper_ids, "missing"])
+
+    assert set(states) == set(paper_ids)
+    assert all(state.status == PaperStatus.QUEUED for state in states.values())
+    assert paper_index.get_many([]) == {}
+
+
+def test_get_many_spans_chunks(paper_index: PaperIndex):
+    paper_ids = [f"p{i}" for i in range(1200)]
+    paper_index.set_many([PaperState(id=pid, status=PaperStatus.SEEN) for pid in paper_ids])
+
+    states = paper_index.get_many(paper_ids + paper_ids[:10])
+
+    assert len(states) == 1200
@@ -0,0 +1,219 @@
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pytest
+
+import src.store.local_vector as local_vector
+import src.store.vector as vector
+from src.models import Paper, SearchFilter
+from src.store.local_vector import LocalVectorStore
+from src.store.vector import get_vector_store
+
+DIM = 16
+COAUTHORS = [
+    "Ada Lovelace",
+    "Alan Turing",
+    "Grace Hopper",
+    "Edsger Dijkstra",
+    "Barbara Liskov",
+    "Donald Knuth",
+    "John McCarthy",
+]
+
+
+@pytest.fixture
+def make_papers(make_papers: Callable[..., list[Paper]]) -> Callable[..., list[Paper]]:
+    return partial(
+        make_papers,
+        authors=lambda i: [f"Author {i}", COAUTHORS[i % len(COAUTHORS)]],
+        published=lambda i: datetime(2020 + i % 5, 1, 1, tzinfo=timezone.utc),
+        primary_category=lambda i: ["cs.LG", "cs.CL", None][i % 3],
+    )
+
+
+@pytest.fixture
+def vectors() -> np.ndarray:
+    return np.random.default_rng(0).standard_normal((300, DIM)).astype(np.float32)
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> LocalVectorStore:
+    return LocalVectorStore(directory=tmp_path, dim=DIM)
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> list[int]:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return list(np.argsort(-(normalized @ query))[:k])
+
+
+def test_search_matches_exact_scan_across_blocks(
+    store: LocalVectorStore,
+    vectors: np.ndarray,
+    monkeypatch: pytest.MonkeyPatch,
+    make_papers: Callable[..., list[Paper]],
+):
+    monkeypatch.setattr(local_vector, "SEARCH_BLOCK_ROWS", 64)
+    papers = make_papers(len(vectors))
+    store.index(papers[:100], vectors[:100])
+    store.index(papers[100:], vectors[100:])
+
+    query = vectors[42] + 0.1
+    results = store.search(query, top_k=5)
+
+    expected = exact_top_k(vectors, query / np.linalg.norm(query), 5)
+    assert [r.id for r in results] == [papers[i].id for i in expected]
+    assert results[0].title == papers[expected[0]].title
+    assert results[0].score == pytest.approx(
+        float(vectors[expected[0]] @ query)
+        / np.linalg.norm(vectors[expected[0]])
+        / np.linalg.norm(query),
+        rel=1e-5,
+    )
+
+
+def test_reindexing_a_paper_supersedes_its_old_row(
+    store: LocalVectorStore, vectors: np.ndarray, make_papers: Callable[..., list[Paper]]
+):
+    papers = make_papers(3)
+    store.index(papers, vectors[:3])
+    store.index([papers[0]], vectors[3:4])
+
+    assert len(store) == 3
+    results = store.search(vectors[3], top_k=3)
+    assert [r.id for r in results].count(papers[0].id) == 1
+    assert results[0].id == papers[0].id
+    assert store.search(vectors[0], top_k=1)[0].score < 0.99
+
+
+def test_store_reopens_from_disk(
+    tmp_path: Path,
+    store: LocalVectorStore,
+    vectors: np.ndarray,
+    make_papers: Callable[..., list[Paper]],
+):
+    papers = make_papers(10)
+    store.index(papers, vectors[:10])
+
+    reopened = LocalVectorStore(directory=tmp_path, dim=DIM)
+    assert len(reopened) == 10
+    assert reopened.search(vectors[7], top_k=1)[0].id == papers[7].id
+
+    # Rows appended by another instance are picked up on the next search
+    store.index(make_papers(1, start=10), vectors[10:11])
+    assert reopened.search(vectors[10], top_k=1)[0].id == "2401.00010v1"
+
+
+def test_hnsw_graph_covers_old_rows_and_scan_covers_new_ones(
+    tmp_path: Path,
+    vectors: np.ndarray,
+    monkeypatch: pytest.MonkeyPatch,
+    make_papers: Callable[..., list[Paper]],
+):
+    pytest.importorskip("hnswlib")
+    monkeypatch.setattr(local_vector, "HNSW_BATCH_ROWS", 200)
+    store = LocalVectorStore(directory=tmp_path, dim=DIM, hnsw=True)
+    papers = make_papers(len(vectors))
+
+    store.index(papers[:250], vectors[:250])
+    store.index(papers[250:], vectors[250:])
+    assert store.hnsw_path.exists()
+    assert store._graph_count() == 250
+
+    for i in (3, 249, 260, 299):
+        assert store.search(vectors[i], top_k=1)[0].id == papers[i].id
+
+
+def test_local_backend_is_registered(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(local_vector, "LocalVectorStore", lambda: LocalVectorStore(tmp_path))
+    monkeypatch.setattr(vector, "_vector_stores", {})
+
+    store = get_vector_store("local")
+
+    assert isinstance(store, LocalVectorStore)
+    assert store.is_healthy()
+    assert get_vector_store("local") is store
+
+
+def test_search_many_matches_single_searches(
+    store: LocalVectorStore, vectors: np.ndarray, make_papers: Callable[..., list[Paper]]
+):
+    papers = make_papers(len(vectors))
+    store.index(papers, vectors)
+    queries = vectors[[5, 50, 150]] + 0.05
+
+    batched = store.search_many(queries, top_k=3)
+
+    assert len(batched) == 3
+    for query, results in zip(queries, batched):
+        assert [r.id for r in results] == [r.id for r in store.search(query, top_k=3)]
+
+
+@pytest.mark.parametrize(
+    "search_filter",
+    [
+        SearchFilter(categories=["cs.CL"]),
+        SearchFilter(published_from=datetime(2023, 1, 1), categories=["cs.LG", "cs.CL"]),
+        SearchFilter(authors=["Dijkstra, Edsger"], published_to=datetime(2022, 1, 1)),
+        SearchFilter(authors=["E. Dijkstra"]),
+    ],
+)
+def test_filtered_search_matches_filtered_exact_scan(
+    tmp_path: Path,
+    vectors: np.ndarray,
+    search_filter: SearchFilter,
+    monkeypatch: pytest.MonkeyPatch,
+    make_papers: Callable[..., list[Paper]],
+):
+    pytest.importorskip("hnswlib")
+    monkeypatch.setattr(local_vector, "HNSW_BATCH_ROWS", 100)
+    store = LocalVectorStore(directory=tmp_path, dim=DIM, hnsw=True)
+    papers = make_papers(len(vectors))
+    store.index(papers, vectors)
+
+    def matches(paper: Paper) -> bool:
+        published = paper.published.replace(tzinfo=None)
+        return (
+            (search_filter.categories is None or paper.primary_category in search_filter.categories)
+            and (search_filter.published_from is None or published >= search_filter.published_from)
+            and (search_filter.published_to is None or published <= search_filter.published_to)
+            and (search_filter.authors is None or "Edsger Dijkstra" in paper.authors)
+        )
+
+    allowed = [i for i, paper in enumerate(papers) if matches(paper)]
+    query = vectors[10] + 0.1
+    expected = [allowed[i] for i in exact_top_k(vectors[allowed], query / np.linalg.norm(query), 5)]
+
+    results = store.search(query, top_k=5, search_filter=search_filter)
+
+    assert [r.id for r in results] == [papers[i].id for i in expected]
+
+
+def test_author_filter_sees_rows_appended_later(
+    store: LocalVectorStore, vectors: np.ndarray, make_papers: Callable[..., list[Paper]]
+):
+    papers = make_papers(7)
+    store.index(papers[:3], vectors[:3])
+    search_filter = SearchFilter(authors=["Edsger Dijkstra"])
+    assert store.search(vectors[3], search_filter=search_filter) == []
+
+    store.index(papers[3:], vectors[3:7])
+
+    assert [r.id for r in store.search(vectors[0], search_filter=search_filter)] == [papers[3].id]
+
+
+def test_iter_vectors_skips_superseded_rows(
+    store: LocalVectorStore, vectors: np.ndarray, make_papers: Callable[..., list[Paper]]
+):
+    papers = make_papers(5)
+    store.index(papers, vectors[:5])
+    store.index(papers[1:2], vectors[5:6])
+
+    pages = list(store.iter_vectors(batch_size=4))
+
+    ids = [i for page_ids, _ in pages for i in page_ids]
+    assert ids == [papers[i].id for i in (0, 2, 3, 4, 1)]
+    scrolled = np.concatenate([v for _, v in pages])
+    assert np.allclose(scrolled[-1], local_vector.normalize(vectors[5]))
@@ -0,0 +1,174 @@
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, VectorParams
+
+import src.store.migration as migration
+from src.embedder import MODEL_NAME
+from src.models import Paper, PaperState, PaperStatus, SearchFilter
+from src.store.index import PaperIndex
+from src.store.migration import (
+    backfill_payloads,
+    dual_write,
+    finish_migration,
+    reembed,
+    start_migration,
+)
+from src.store.vector import COLLECTION_NAME, QdrantVectorStore, get_alias_target, point_id
+
+NEW_MODEL = "org/new-model"
+NEW_DIM = 8
+
+
+@pytest.fixture
+def make_papers_by_id(
+    make_papers: Callable[..., list[Paper]],
+) -> Callable[[list[str]], list[Paper]]:
+    return lambda ids: [p for p in make_papers(10) if p.id in ids]
+
+
+def fake_embed(papers: list[Paper], model_name: str = MODEL_NAME) -> np.ndarray:
+    # One fixed random vector per paper and model
+    dim = NEW_DIM if model_name == NEW_MODEL else 384
+    return np.array(
+        [np.random.default_rng(int(p.id[5:10])).random(dim, dtype=np.float32) for p in papers]
+    )
+
+
+@pytest.fixture
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> QdrantClient:
+    index = PaperIndex(db_path=tmp_path / "index.db")
+    monkeypatch.setattr(migration, "get_paper_index", lambda: index)
+    monkeypatch.setattr(migration, "embed_papers", fake_embed)
+    monkeypatch.setattr(migration, "_active", {})
+    monkeypatch.setattr(migration, "_target_stores", {})
+    QdrantVectorStore._ensured.clear()
+    return QdrantClient(":memory:")
+
+
+@pytest.fixture
+def papers(client: QdrantClient, make_papers: Callable[..., list[Paper]]) -> list[Paper]:
+    papers = make_papers(5)
+    QdrantVectorStore(client=client).index(papers, fake_embed(papers))
+    migration.get_paper_index().set_many(
+        [PaperState(id=p.id, status=PaperStatus.EMBEDDED) for p in papers]
+    )
+    return papers
+
+
+def test_store_creates_a_versioned_collection_behind_the_alias(client: QdrantClient):
+    store = QdrantVectorStore(client=client)
+
+    assert get_alias_target(client, COLLECTION_NAME) == f"papers.{MODEL_NAME}.384"
+    assert store.embedding_model == MODEL_NAME
+
+
+def test_migration_swaps_alias_once_reembedded(
+    client: QdrantClient,
+    papers: list[Paper],
+    make_papers: Callable[..., list[Paper]],
+    make_papers_by_id: Callable[[list[str]], list[Paper]],
+):
+    old = get_alias_target(client, COLLECTION_NAME)
+    started = start_migration(NEW_MODEL, NEW_DIM, client=client)
+    assert started.target == "papers.org~new-model.8"
+
+    # Workers dual-write new papers, embedded with the new model for the new collection
+    fresh = make_papers(1, start=5)
+    dual_write(fresh, fake_embed(fresh), MODEL_NAME)
+    assert client.count(started.target).count == 1
+
+    with pytest.raises(ValueError):
+        finish_migration(client=client)
+    assert get_alias_target(client, COLLECTION_NAME) == old
+
+    assert reembed(batch_size=2, rate=1e9, fetch=make_papers_by_id, client=client) == 5
+    assert finish_migration(client=client) == started.target
+
+    assert get_alias_target(client, COLLECTION_NAME) == started.target
+    assert migration.get_paper_index().get_migration(COLLECTION_NAME) is None
+    store = QdrantVectorStore(client=client)
+    assert store.embedding_model == NEW_MODEL
+    query = fake_embed(papers, NEW_MODEL)[2]
+    assert store.search(query, top_k=1)[0].id == papers[2].id
+
+
+def test_reembed_resumes_from_its_cursor(
+    client: QdrantClient, papers: list[Paper], make_papers_by_id: Callable[[list[str]], list[Paper]]
+):
+    start_migration(NEW_MODEL, NEW_DIM, client=client)
+    stop = threading.Event()
+
+    def fetch_then_stop(ids: list[str]) -> list[Paper]:
+        stop.set()
+        return make_papers_by_id(ids)
+
+    assert reembed(batch_size=2, rate=1e9, fetch=fetch_then_stop, client=client, stop=stop) == 2
+    state = migration.get_paper_index().get_migration(COLLECTION_NAME)
+    assert state.cursor == papers[1].id and not state.done
+
+    fetched: list[str] = []
+    resumed = reembed(
+        batch_size=2,
+        rate=1e9,
+        fetch=lambda ids: fetched.extend(ids) or make_papers_by_id(ids),
+        client=client,
+    )
+    assert resumed == 3
+    assert fetched == [p.id for p in papers[2:]]
+
+
+def test_finish_refuses_to_replace_a_legacy_collection(
+    client: QdrantClient, make_papers_by_id: Callable[[list[str]], list[Paper]]
+):
+    client.create_collection(
+        COLLECTION_NAME, vectors_config=VectorParams(size=384, distance=Distance.COSINE)
+    )
+    start_migration(NEW_MODEL, NEW_DIM, client=client)
+    reembed(rate=1e9, fetch=make_papers_by_id, client=client)
+
+    with pytest.raises(ValueError):
+        finish_migration(client=client)
+    assert finish_migration(client=client, drop_legacy=True) == "papers.org~new-model.8"
+    assert get_alias_target(client, COLLECTION_NAME) == "papers.org~new-model.8"
+
+
+def test_backfill_adds_filter_fields_to_old_payloads(
+    client: QdrantClient,
+    make_papers: Callable[..., list[Paper]],
+    make_papers_by_id: Callable[[list[str]], list[Paper]],
+):
+    store = QdrantVectorStore(client=client)
+    papers = make_papers(4)
+    store.index(papers, fake_embed(papers))
+    # Points indexed before filtered search only held the ID, title and authors
+    for paper in papers[:3]:
+        client.overwrite_payload(
+            COLLECTION_NAME,
+            {"paper_id": paper.id, "title": paper.title, "authors": paper.authors},
+            points=[point_id(paper.id)],
+        )
+    published = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+    def fetch(ids: list[str]) -> list[Paper]:
+        # arXiv doesn't return the third paper
+        return [
+            p.model_copy(update={"published": published, "primary_category": "cs.LG"})
+            for p in make_papers_by_id(ids)
+            if p.id != papers[2].id
+        ]
+
+    assert backfill_payloads(batch_size=2, fetch=fetch, client=client) == 3
+    assert backfill_payloads(fetch=fetch, client=client) == 0
+
+    search_filter = SearchFilter(authors=["Author"], categories=["cs.LG"])
+    found = store.search(fake_embed(papers[:1])[0], top_k=4, search_filter=search_filter)
+    assert {r.id for r in found} == {papers[0].id, papers[1].id}
+    # Papers missing from arXiv still get the author keys of their stored authors
+    payload = client.retrieve(COLLECTION_NAME, [point_id(papers[2].id)])[0].payload
+    assert payload["author_keys"] == ["author"] and payload["published"] is None
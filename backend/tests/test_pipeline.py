@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+import src.pipeline.discovery as discovery
+import src.pipeline.pipeline as pipeline
+from src.models import Paper
+from src.pipeline import run_pipeline
+from src.store.index import PaperIndex
+
+
+def make_paper(day: int) -> Paper:
+    return Paper(
+        id=f"2401.{day:05d}v1",
+        url=f"http://arxiv.org/abs/2401.{day:05d}v1",
+        title=f"Title {day}",
+        abstract=f"Abstract {day}",
+        authors=[],
+        updated=datetime(2024, 1, day, tzinfo=timezone.utc),
+    )
+
+
+@pytest.fixture
+def paper_index(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> PaperIndex:
+    paper_index = PaperIndex(db_path=tmp_path / "papers.db")
+    monkeypatch.setattr(discovery, "get_paper_index", lambda: paper_index)
+    return paper_index
+
+
+@pytest.fixture
+def harvests(monkeypatch: pytest.MonkeyPatch) -> list[datetime | None]:
+    harvests: list[datetime | None] = []
+
+    def iter_papers(query, max_results=None, since=None, cache=None):
+        harvests.append(since)
+        return iter([make_paper(day) for day in (3, 5, 4)])
+
+    monkeypatch.setattr(discovery, "iter_papers", iter_papers)
+    monkeypatch.setattr(pipeline, "get_redis_conn", lambda: None)
+    return harvests
+
+
+def test_first_since_run_harvests_from_the_epoch(
+    paper_index: PaperIndex, harvests: list[datetime | None], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(pipeline, "enqueue_missing", lambda papers, redis_conn: None)
+
+    list(run_pipeline("Graph Networks", since=True))
+    list(run_pipeline("Graph Networks", since=True))
+
+    cursor = datetime(2024, 1, 5, tzinfo=timezone.utc)
+    assert harvests == [discovery.EPOCH, cursor]
+    assert paper_index.get_cursor("graph networks") == cursor
+
+
+def test_cursor_stays_when_enqueuing_fails(
+    paper_index: PaperIndex, harvests: list[datetime | None], monkeypatch: pytest.MonkeyPatch
+):
+    def enqueue_missing(papers, redis_conn):
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(pipeline, "enqueue_missing", enqueue_missing)
+
+    with pytest.raises(ConnectionError):
+        list(run_pipeline("graph networks", since=True))
+
+    assert paper_index.get_cursor("graph networks") is None
+    assert paper_index.get(make_paper(3).id) is not None
+
+
+def test_plain_runs_leave_the_cursor(
+    paper_index: PaperIndex, harvests: list[datetime | None], monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(pipeline, "enqueue_missing", lambda papers, redis_conn: None)
+
+    list(run_pipeline("graph networks"))
+
+    assert harvests == [None]
+    assert paper_index.get_cursor("graph networks") is None
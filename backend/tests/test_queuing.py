@@ -1,24 +1,63 @@
+from typing import Any
 from unittest.mock import MagicMock, create_autospec
 
 import pytest
 from upstash_redis import Redis
 
 from src.models import Paper, PaperState, PaperStatus
-from src.queuing import enqueue_missing
+from src.queuing import (
+    ATTEMPTS_HASH,
+    CLAIM_SCRIPT,
+    ENQUEUE_SCRIPT,
+    FAIL_SCRIPT,
+    HEARTBEAT_PREFIX,
+    HEARTBEAT_TTL,
+    QUEUE_LIST,
+    REQUEUE_SCRIPT,
+    WORKERS_SET,
+    ack_batch,
+    claim_batch,
+    enqueue_missing,
+    fail_batch,
+    processing_list,
+    register_worker,
+)
 from src.store import PaperIndex
 
 
 @pytest.fixture
-def mock_redis() -> MagicMock:
+def redis_set() -> set[str]:
+    return set()
+
+
+@pytest.fixture
+def mock_redis(redis_set: set[str]) -> MagicMock:
     mock = create_autospec(Redis, instance=True, spec_set=True)
-    mock.sismember.return_value = False
+
+    def eval_script(script, keys, args):
+        # Mimic ENQUEUE_SCRIPT against an in-memory set
+        if script != ENQUEUE_SCRIPT:
+            return None
+        added = [url for url in args[::2] if url not in redis_set]
+        redis_set.update(added)
+        return added
+
+    mock.eval.side_effect = eval_script
     return mock
 
 
+@pytest.fixture
+def fake_redis() -> Any:
+    """An in-process Redis server that runs the Lua scripts."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeRedis()
+
+
 @pytest.fixture
 def mock_paper_index() -> MagicMock:
     mock_index = create_autospec(PaperIndex, instance=True, spec_set=True)
-    mock_index.get.return_value = None
+    mock_index.get_many.return_value = {}
     mock_index.set_many.return_value = None
     return mock_index
 
@@ -55,12 +94,16 @@ def sample_papers() -> list[Paper]:
     ]
 
 
+def enqueued_urls(mock_redis: MagicMock) -> list[str]:
+    return [url for c in mock_redis.eval.call_args_list for url in c.kwargs["args"][::2]]
+
+
 def test_enqueue_missing_empty_list(
     mock_redis: MagicMock, mock_get_paper_index: None, mock_paper_index: MagicMock
 ):
     enqueue_missing([], mock_redis)
-    mock_redis.rpush.assert_not_called()
-    mock_redis.sadd.assert_not_called()
+    mock_redis.eval.assert_not_called()
+    mock_paper_index.get_many.assert_not_called()
     mock_paper_index.set_many.assert_not_called()
 
 
@@ -69,22 +112,21 @@ def test_enqueue_missing_all_new_papers(
     mock_get_paper_index: None,
     mock_paper_index: MagicMock,
     sample_papers: list[Paper],
+    redis_set: set[str],
 ):
-    # Mock PaperIndex to return None for all papers
-    mock_paper_index.get.side_effect = lambda paper_id: None
-    mock_redis.sismember.return_value = False
-
     # Call the function
     enqueue_missing(sample_papers, mock_redis)
 
-    # Assert Redis operations
-    assert mock_redis.rpush.call_count == len(sample_papers)
-    assert mock_redis.sadd.call_count == len(sample_papers)
+    # Assert a single lookup and a single Redis round-trip
+    mock_paper_index.get_many.assert_called_once_with(["1", "2", "3"])
+    mock_redis.eval.assert_called_once()
+    assert enqueued_urls(mock_redis) == [p.url for p in sample_papers]
+    assert redis_set == {p.url for p in sample_papers}
 
     # Assert PaperIndex updates
     assert mock_paper_index.set_many.call_count == 1
     queued_states = mock_paper_index.set_many.call_args[0][0]
-    assert len(queued_states) == len(sample_papers)
+    assert [s.id for s in queued_states] == ["1", "2", "3"]
     for state in queued_states:
         assert state.status == PaperStatus.QUEUED
 
@@ -95,20 +137,16 @@ def test_enqueue_missing_some_already_queued(
     mock_paper_index: MagicMock,
     sample_papers: list[Paper],
 ):
-    mock_redis.sismember.return_value = False
     # Mock PaperIndex to return some papers as already queued
-    mock_paper_index.get.side_effect = lambda paper_id: (
-        PaperState(id=paper_id, status=PaperStatus.QUEUED, in_graph=False)
-        if paper_id == "1"
-        else None
-    )
+    mock_paper_index.get_many.return_value = {
+        "1": PaperState(id="1", status=PaperStatus.QUEUED, in_graph=False)
+    }
 
     # Call the function
     enqueue_missing(sample_papers, mock_redis)
 
     # Assert Redis operations
-    assert mock_redis.rpush.call_count == len(sample_papers) - 1
-    assert mock_redis.sadd.call_count == len(sample_papers) - 1
+    assert enqueued_urls(mock_redis) == ["http://example.com/2", "http://example.com/3"]
 
     # Assert PaperIndex updates
     assert mock_paper_index.set_many.call_count == 1
@@ -121,19 +159,18 @@ def test_enqueue_missing_already_in_redis(
     mock_get_paper_index: None,
     mock_paper_index: MagicMock,
     sample_papers: list[Paper],
+    redis_set: set[str],
 ):
-    # Mock Redis to indicate some papers are already in the set
-    mock_redis.sismember.side_effect = lambda queue_set, url: url == "http://example.com/2"
+    # Some papers are already in the Redis set
+    redis_set.add("http://example.com/2")
 
     # Call the function
     enqueue_missing(sample_papers, mock_redis)
 
-    # Assert Redis operations
-    assert mock_redis.rpush.call_count == len(sample_papers) - 1
-    assert mock_redis.sadd.call_count == len(sample_papers) - 1
-
     # Assert PaperIndex updates
     assert mock_paper_index.set_many.call_count == 1
+    queued_states = mock_paper_index.set_many.call_args[0][0]
+    assert [s.id for s in queued_states] == ["1", "3"]
 
 
 def test_enqueue_missing_no_papers_to_enqueue(
@@ -142,18 +179,172 @@ def test_enqueue_missing_no_papers_to_enqueue(
     mock_paper_index: MagicMock,
     sample_papers: list[Paper],
 ):
-    # Mock PaperIndex and Redis to indicate all papers are already queued or embedded
-    mock_paper_index.get.side_effect = lambda paper_id: PaperState(
-        id=paper_id, status=PaperStatus.EMBEDDED, in_graph=True
-    )
-    mock_redis.sismember.return_value = True
+    # Mock PaperIndex to indicate all papers are already embedded
+    mock_paper_index.get_many.return_value = {
+        p.id: PaperState(id=p.id, status=PaperStatus.EMBEDDED, in_graph=True) for p in sample_papers
+    }
 
     # Call the function
     enqueue_missing(sample_papers, mock_redis)
 
     # Assert no Redis operations
-    mock_redis.rpush.assert_not_called()
-    mock_redis.sadd.assert_not_called()
+    mock_redis.eval.assert_not_called()
 
     # Assert no PaperIndex updates
     mock_paper_index.set_many.assert_not_called()
+
+
+def test_enqueue_missing_constant_round_trips(
+    mock_redis: MagicMock, mock_get_paper_index: None, mock_paper_index: MagicMock
+):
+    papers = [
+        Paper(id=str(i), url=f"http://example.com/{i}", title="T", abstract="A", authors=[])
+        for i in range(500)
+    ]
+
+    enqueue_missing(papers, mock_redis)
+
+    assert mock_paper_index.get_many.call_count == 1
+    assert mock_redis.eval.call_count == 1
+    assert mock_paper_index.set_many.call_count == 1
+    assert len(mock_paper_index.set_many.call_args[0][0]) == 500
+
+
+def test_claim_batch_single_round_trip(mock_redis: MagicMock):
+    mock_redis.eval.side_effect = None
+    mock_redis.eval.return_value = ["a", "b"]
+
+    assert claim_batch(mock_redis, 8, "host:1") == ["a", "b"]
+
+    mock_redis.eval.assert_called_once()
+    script, keys = mock_redis.eval.call_args.args[0], mock_redis.eval.call_args.kwargs["keys"]
+    assert script == CLAIM_SCRIPT
+    assert keys[:2] == ["paper_queue", processing_list("host:1")]
+
+
+def test_ack_batch_skips_empty_batches(mock_redis: MagicMock):
+    ack_batch(mock_redis, [], "host:1")
+    mock_redis.eval.assert_not_called()
+
+    ack_batch(mock_redis, ["a"], "host:1")
+    assert mock_redis.eval.call_args.kwargs["args"] == ["a"]
+
+
+def test_register_worker_requeues_dead_workers_only(mock_redis: MagicMock):
+    mock_redis.smembers.return_value = ["dead:1", "alive:2"]
+    mock_redis.exists.side_effect = lambda key: key.endswith("alive:2")
+    mock_redis.eval.side_effect = None
+    mock_redis.eval.return_value = 3
+
+    assert register_worker(mock_redis, "host:1") == 3
+
+    mock_redis.eval.assert_called_once()
+    assert mock_redis.eval.call_args.args[0] == REQUEUE_SCRIPT
+    assert mock_redis.eval.call_args.kwargs["keys"] == ["paper_queue", processing_list("dead:1")]
+    mock_redis.srem.assert_called_once_with("paper_queue:workers", "dead:1")
+    mock_redis.sadd.assert_called_once_with("paper_queue:workers", "host:1")
+
+
+def test_fail_batch_requeues_then_marks_papers_as_error(
+    mock_redis: MagicMock,
+    mock_get_paper_index: None,
+    mock_paper_index: MagicMock,
+    sample_papers: list[Paper],
+):
+    raw_items = [paper.model_dump_json() for paper in sample_papers[:2]]
+    mock_redis.eval.side_effect = None
+    mock_redis.eval.return_value = []
+
+    assert fail_batch(mock_redis, raw_items, "host:1", max_attempts=2) == 0
+    mock_paper_index.set_many.assert_not_called()
+
+    mock_redis.eval.return_value = [raw_items[1], "not a paper"]
+    assert fail_batch(mock_redis, raw_items + ["not a paper"], "host:1", max_attempts=2) == 2
+
+    script, kwargs = mock_redis.eval.call_args.args[0], mock_redis.eval.call_args.kwargs
+    assert script == FAIL_SCRIPT
+    assert kwargs["keys"][:2] == ["paper_queue", processing_list("host:1")]
+    assert kwargs["args"][0] == "2"
+    errors = mock_paper_index.set_many.call_args.args[0]
+    assert [(s.id, s.status) for s in errors] == [("2", PaperStatus.ERROR)]
+    assert fail_batch(mock_redis, [], "host:1") == 0
+
+
+def items(fake_redis: Any, key: str) -> list[bytes]:
+    return list(fake_redis.lrange(key, 0, -1))
+
+
+def test_claim_script_moves_items_to_processing_and_beats(fake_redis: Any):
+    fake_redis.rpush(QUEUE_LIST, "a", "b", "c")
+
+    assert claim_batch(fake_redis, 2, "host:1") == [b"a", b"b"]
+
+    assert items(fake_redis, QUEUE_LIST) == [b"c"]
+    assert items(fake_redis, processing_list("host:1")) == [b"a", b"b"]
+    assert 0 < fake_redis.ttl(f"{HEARTBEAT_PREFIX}host:1") <= HEARTBEAT_TTL
+    # An empty queue still refreshes the heartbeat
+    fake_redis.delete(f"{HEARTBEAT_PREFIX}host:1")
+    assert claim_batch(fake_redis, 2, "host:1") == [b"c"]
+    assert claim_batch(fake_redis, 2, "host:1") == []
+    assert fake_redis.exists(f"{HEARTBEAT_PREFIX}host:1")
+
+
+def test_ack_script_removes_the_items(fake_redis: Any):
+    fake_redis.rpush(QUEUE_LIST, "a", "b", "a")
+    claimed = claim_batch(fake_redis, 3, "host:1")
+    fake_redis.hset(ATTEMPTS_HASH, "a", 1)
+
+    ack_batch(fake_redis, claimed[:2], "host:1")
+
+    assert items(fake_redis, processing_list("host:1")) == [b"a"]
+    assert not fake_redis.hexists(ATTEMPTS_HASH, "a")
+    ack_batch(fake_redis, claimed[2:], "host:1")
+    assert not fake_redis.exists(processing_list("host:1"))
+
+
+def test_fail_script_requeues_until_max_attempts(
+    fake_redis: Any,
+    mock_get_paper_index: None,
+    mock_paper_index: MagicMock,
+    sample_papers: list[Paper],
+):
+    raw = sample_papers[0].model_dump_json()
+    fake_redis.rpush(QUEUE_LIST, raw, "other")
+
+    for attempt in range(1, 3):
+        claimed = claim_batch(fake_redis, 1, "host:1")
+        assert fail_batch(fake_redis, claimed, "host:1", max_attempts=3) == 0
+        # Retried after the items already queued
+        assert items(fake_redis, QUEUE_LIST) == [b"other", raw.encode()]
+        assert not fake_redis.exists(processing_list("host:1"))
+        assert int(fake_redis.hget(ATTEMPTS_HASH, raw)) == attempt
+        # Claim it again before the other item
+        fake_redis.lmove(QUEUE_LIST, QUEUE_LIST, "RIGHT", "LEFT")
+    mock_paper_index.set_many.assert_not_called()
+
+    claimed = claim_batch(fake_redis, 1, "host:1")
+    assert fail_batch(fake_redis, claimed, "host:1", max_attempts=3) == 1
+
+    assert items(fake_redis, QUEUE_LIST) == [b"other"]
+    assert not fake_redis.exists(processing_list("host:1"))
+    assert not fake_redis.hexists(ATTEMPTS_HASH, raw)
+    errors = mock_paper_index.set_many.call_args.args[0]
+    assert [(s.id, s.status) for s in errors] == [("1", PaperStatus.ERROR)]
+
+
+def test_register_worker_recovers_expired_processing_lists(fake_redis: Any):
+    fake_redis.rpush(QUEUE_LIST, "a", "b", "c", "d")
+    register_worker(fake_redis, "dead:1")
+    register_worker(fake_redis, "alive:2")
+    claim_batch(fake_redis, 2, "dead:1")
+    claim_batch(fake_redis, 1, "alive:2")
+    fake_redis.delete(f"{HEARTBEAT_PREFIX}dead:1")  # its heartbeat expired
+
+    assert register_worker(fake_redis, "host:3") == 2
+
+    # Recovered items go back to the head of the queue, in order
+    assert items(fake_redis, QUEUE_LIST) == [b"a", b"b", b"d"]
+    assert not fake_redis.exists(processing_list("dead:1"))
+    assert items(fake_redis, processing_list("alive:2")) == [b"c"]
+    assert fake_redis.smembers(WORKERS_SET) == {b"alive:2", b"host:3"}
+    assert fake_redis.exists(f"{HEARTBEAT_PREFIX}host:3")
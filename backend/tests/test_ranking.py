@@ -0,0 +1,124 @@
+from pathlib import Path
+from time import perf_counter, sleep
+
+import numpy as np
+import pytest
+
+from src.models import Paper, SearchResult
+from src.store.csr_graph import CSRGraphStore
+from src.store.ranking import DAMPING, pagerank, rerank
+
+
+def random_graph(nodes: int, edges: int, seed: int = 0) -> tuple[np.ndarray, ...]:
+    rng = np.random.default_rng(seed)
+    sources = np.sort(rng.integers(0, nodes, edges))
+    targets = rng.integers(0, nodes, edges).astype(np.int32)
+    weights = rng.random(edges, dtype=np.float32)
+    offsets = np.zeros(nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=nodes), out=offsets[1:])
+    return offsets, targets, weights
+
+
+def dense_pagerank(offsets: np.ndarray, targets: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    nodes = len(offsets) - 1
+    transition = np.zeros((nodes, nodes))
+    sources = np.repeat(np.arange(nodes), np.diff(offsets))
+    np.add.at(transition, (sources, targets), weights)
+    out = transition.sum(axis=1, keepdims=True)
+    # Dangling papers jump anywhere
+    transition = np.where(out > 0, transition / np.where(out > 0, out, 1), 1.0 / nodes)
+    google = DAMPING * transition + (1 - DAMPING) / nodes
+    values, vectors = np.linalg.eig(google.T)
+    ranks = np.abs(np.real(vectors[:, np.argmax(np.real(values))]))
+    return ranks / ranks.sum()
+
+
+def test_pagerank_matches_the_dense_solution():
+    graph = random_graph(50, 120)
+
+    ranks, iterations = pagerank(*graph)
+
+    assert ranks.sum() == pytest.approx(1.0, abs=1e-5)
+    assert np.allclose(ranks, dense_pagerank(*graph), atol=1e-5)
+    assert 1 < iterations < 100
+
+
+def test_warm_start_converges_in_fewer_iterations():
+    offsets, targets, weights = random_graph(2000, 20000)
+    sources = np.repeat(np.arange(2000), np.diff(offsets))
+    older = (sources < 1900) & (targets < 1900)
+    older_offsets = np.zeros(1901, dtype=np.int64)
+    np.cumsum(np.bincount(sources[older], minlength=1900), out=older_offsets[1:])
+    previous, cold = pagerank(older_offsets, targets[older], weights[older])
+
+    # 100 more papers and their edges
+    ranks, warm = pagerank(offsets, targets, weights, start=previous)
+
+    assert warm < cold
+    assert np.allclose(ranks, pagerank(offsets, targets, weights)[0], atol=1e-5)
+
+
+def test_pagerank_of_an_empty_graph():
+    empty = np.zeros(1, np.int64), np.empty(0, np.int32), np.empty(0, np.float32)
+
+    assert pagerank(*empty) == (pytest.approx(np.empty(0)), 0)
+
+
+def test_personalized_pagerank_concentrates_around_the_seeds():
+    offsets, targets, weights = random_graph(200, 400)
+    seeds = np.zeros(200)
+    seeds[:2] = 1.0
+
+    ranks, _ = pagerank(offsets, targets, weights, personalization=seeds)
+
+    assert ranks.sum() == pytest.approx(1.0, abs=1e-5)
+    assert set(np.argsort(-ranks)[:2].tolist()) == {0, 1}
+    assert ranks[:2].sum() > 1 - DAMPING
+
+
+def test_pagerank_stops_at_the_deadline():
+    graph = random_graph(50, 120)
+
+    ranks, iterations = pagerank(*graph, deadline=perf_counter())
+
+    assert iterations == 1
+    assert ranks.sum() == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.fixture
+def star(tmp_path: Path) -> tuple[CSRGraphStore, list[SearchResult]]:
+    graph = CSRGraphStore(directory=tmp_path)
+    papers = [
+        Paper(id=f"2401.{i:05d}v1", url="", title=f"Title {i}", abstract="", authors=[])
+        for i in range(5)
+    ]
+    graph.add_papers(papers)
+    # Paper 0 is linked to papers 1, 2 and 3, paper 4 to none
+    graph.add_edges([papers[0].id] * 3, [p.id for p in papers[1:4]], [1.0, 1.0, 1.0])
+    return graph, graph.get_papers_by_ids([p.id for p in papers])
+
+
+def hits(results: list[SearchResult], scores: dict[int, float]) -> list[SearchResult]:
+    return [results[i].model_copy(update={"score": score}) for i, score in scores.items()]
+
+
+def test_rerank_blends_cosine_with_graph_proximity(star):
+    graph, results = star
+    top = hits(results, {4: 0.9, 1: 0.8, 2: 0.8, 3: 0.8})
+
+    reranked = rerank(top, results, graph, blend=0.5)
+
+    # Hits linked through the hub overtake the isolated best hit, the hub being the closest
+    assert [r.id for r in reranked] == [results[i].id for i in (1, 2, 3, 4, 0)]
+    assert reranked[-1].score == pytest.approx(0.5)
+    assert [r.id for r in rerank(top, results, graph, blend=0.0)][0] == results[4].id
+
+
+def test_rerank_is_skipped_when_over_budget(star, monkeypatch: pytest.MonkeyPatch):
+    graph, results = star
+    monkeypatch.setattr(
+        graph, "subgraph", lambda ids: sleep(0.01) or CSRGraphStore.subgraph(graph, ids)
+    )
+
+    assert rerank(hits(results, {1: 0.9}), results, graph, budget_ms=5) == results
+    assert rerank([], results, graph) == results
@@ -0,0 +1,96 @@
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pytest
+
+from src.models import Paper
+from src.store.csr_graph import CSRGraphStore
+from src.store.local_vector import LocalVectorStore, normalize
+from src.store.similar import block_top_k, build_similar_edges, knn, load_state
+
+DIM = 16
+K = 4
+
+
+@pytest.fixture
+def matrix() -> np.ndarray:
+    return normalize(np.random.default_rng(0).standard_normal((300, DIM)).astype(np.float32))
+
+
+def exact_knn(matrix: np.ndarray, k: int) -> np.ndarray:
+    scores = matrix @ matrix.T
+    np.fill_diagonal(scores, -np.inf)
+    return np.sort(np.argsort(-scores, axis=1)[:, :k], axis=1)
+
+
+@pytest.mark.parametrize("columns", [5, 100, 1000, 1037])
+def test_block_top_k_selects_the_highest_scores(columns: int):
+    scores = np.random.default_rng(columns).standard_normal((50, columns)).astype(np.float32)
+
+    selected, values = block_top_k(scores, 10, groups=8)
+
+    expected = np.sort(np.argsort(-scores, axis=1)[:, : min(10, columns)], axis=1)
+    assert np.array_equal(np.sort(selected, axis=1), expected)
+    assert np.array_equal(values, np.take_along_axis(scores, selected, axis=1))
+
+
+def test_knn_matches_exact_search(matrix: np.ndarray):
+    empty = np.empty((0, K), dtype=np.int32), np.empty((0, K), dtype=np.float32)
+
+    neighbors, similarities = knn(matrix, *empty, k=K, query_block=64, corpus_block=100)
+
+    assert np.array_equal(np.sort(neighbors, axis=1), exact_knn(matrix, K))
+    assert (np.diff(similarities, axis=1) <= 0).all()
+
+
+def test_incremental_knn_patches_earlier_rows(matrix: np.ndarray):
+    empty = np.empty((0, K), dtype=np.int32), np.empty((0, K), dtype=np.float32)
+    earlier = knn(matrix[:200], *empty, k=K, query_block=64, corpus_block=100)
+
+    neighbors, _ = knn(matrix, *earlier, k=K, query_block=64, corpus_block=100)
+
+    assert np.array_equal(np.sort(neighbors, axis=1), exact_knn(matrix, K))
+
+
+def test_build_similar_edges_full_then_incremental(
+    tmp_path: Path, matrix: np.ndarray, make_papers: Callable[..., list[Paper]]
+):
+    store = LocalVectorStore(directory=tmp_path / "vectors", dim=DIM)
+    graph = CSRGraphStore(directory=tmp_path / "graph")
+    state = tmp_path / "similar.npz"
+    papers = make_papers(len(matrix))
+    graph.add_papers(papers)
+    store.index(papers[:200], matrix[:200])
+
+    assert build_similar_edges(store, graph, state, k=K) == 200 * K
+    store.index(papers[200:], matrix[200:])
+    build_similar_edges(store, graph, state, k=K)
+    graph.compact()
+
+    # Edges of earlier papers displaced by new ones are removed
+    expected = exact_knn(matrix, K)
+    for row in (0, 57, 199, 250):
+        related = {int(paper_id[5:10]) for paper_id in graph.get_related_ids(papers[row].id)}
+        assert related == set(expected[row].tolist())
+    assert graph.edge_count == len(matrix) * K
+    assert load_state(state)[0] == [p.id for p in papers]
+
+
+def test_full_rebuild_replaces_previous_edges(
+    tmp_path: Path, matrix: np.ndarray, make_papers: Callable[..., list[Paper]]
+):
+    store = LocalVectorStore(directory=tmp_path / "vectors", dim=DIM)
+    graph = CSRGraphStore(directory=tmp_path / "graph")
+    state = tmp_path / "similar.npz"
+    papers = make_papers(100)
+    graph.add_papers(papers)
+    store.index(papers, matrix[:100])
+    build_similar_edges(store, graph, state, k=K)
+
+    # Fewer neighbors per paper trigger a full rebuild
+    build_similar_edges(store, graph, state, k=2)
+    graph.compact()
+
+    assert graph.edge_count == 100 * 2
+    assert load_state(state)[1].shape == (100, 2)
@@ -0,0 +1,168 @@
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import OptimizersConfigDiff
+
+import src.store.snapshot as snapshot
+from src.models import Paper
+from src.store.snapshot import export_collection, import_collection
+from src.store.vector import QdrantVectorStore, point_id
+
+
+@pytest.fixture
+def client() -> QdrantClient:
+    QdrantVectorStore._ensured.clear()
+    return QdrantClient(":memory:")
+
+
+@pytest.fixture
+def vectors() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((25, 384)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def papers(client: QdrantClient, vectors: np.ndarray) -> list[Paper]:
+    papers = [
+        Paper(
+            id=f"2401.{i:05d}v1",
+            url=f"http://arxiv.org/abs/2401.{i:05d}v1",
+            title=f"Title {i}",
+            abstract=f"Abstract {i}",
+            authors=[f"Author {i}"],
+        )
+        for i in range(len(vectors))
+    ]
+    QdrantVectorStore(client=client).index(papers, vectors)
+    return papers
+
+
+def serialized(function: Callable[..., Any]) -> Callable[..., Any]:
+    lock = threading.Lock()
+
+    def call(*args: Any, **kwargs: Any) -> Any:
+        with lock:
+            return function(*args, **kwargs)
+
+    return call
+
+
+def stored(client: QdrantClient, collection: str, paper_id: str):
+    return client.retrieve(collection, [point_id(paper_id)], with_vectors=True)[0]
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 1e-6), ("float16", 1e-3)])
+def test_export_then_import_roundtrip(
+    client: QdrantClient,
+    papers: list[Paper],
+    vectors: np.ndarray,
+    tmp_path: Path,
+    dtype: str,
+    tolerance: float,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    manifest = export_collection(client, tmp_path, dtype=dtype, chunk_rows=10)
+
+    assert manifest["complete"] and manifest["rows"] == len(papers)
+    assert [c["rows"] for c in manifest["chunks"]] == [10, 10, 5]
+    assert np.load(tmp_path / "chunk-00000.npy").dtype == np.dtype(dtype)
+
+    # The embedded client isn't thread safe, so serialize the parallel uploads' writes
+    monkeypatch.setattr(client, "upsert", serialized(client.upsert))
+    assert import_collection(client, tmp_path, "restored", workers=3, batch_size=4) == 25
+    assert client.count("restored").count == len(papers)
+    point = stored(client, "restored", papers[7].id)
+    assert point.payload["title"] == "Title 7"
+    assert np.allclose(point.vector, vectors[7], atol=tolerance)
+    restored = QdrantVectorStore(client=client, collection="restored")
+    assert restored.search(vectors[3], top_k=1)[0].id == papers[3].id
+
+
+def test_export_resumes_after_interruption(
+    client: QdrantClient, papers: list[Paper], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    writes = 0
+    original = snapshot.write_atomic
+
+    def fail_on_second_chunk(path: Path, data: bytes) -> None:
+        nonlocal writes
+        writes += 1
+        if writes == 4:  # first chunk's vectors, payloads and manifest are written
+            raise OSError("disk full")
+        original(path, data)
+
+    monkeypatch.setattr(snapshot, "write_atomic", fail_on_second_chunk)
+    with pytest.raises(OSError):
+        export_collection(client, tmp_path, chunk_rows=10)
+    monkeypatch.setattr(snapshot, "write_atomic", original)
+
+    manifest = export_collection(client, tmp_path, chunk_rows=10)
+
+    assert [c["name"] for c in manifest["chunks"]] == ["chunk-00000", "chunk-00001", "chunk-00002"]
+    ids = "".join((tmp_path / f"{c['name']}.jsonl").read_text() for c in manifest["chunks"])
+    assert len(set(ids.splitlines())) == len(papers)
+
+
+def test_import_skips_chunks_already_imported(
+    client: QdrantClient, papers: list[Paper], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    export_collection(client, tmp_path, chunk_rows=10)
+    assert import_collection(client, tmp_path, "restored", workers=1) == 25
+
+    monkeypatch.setattr(snapshot, "upsert_chunk", pytest.fail)
+    assert import_collection(client, tmp_path, "restored") == 0
+
+
+def test_export_refuses_a_directory_of_another_export(
+    client: QdrantClient, papers: list[Paper], tmp_path: Path
+):
+    export_collection(client, tmp_path)
+
+    with pytest.raises(ValueError):
+        export_collection(client, tmp_path, dtype="float16")
+
+
+def test_killed_import_restores_the_original_indexing_threshold(
+    client: QdrantClient, papers: list[Paper], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    export_collection(client, tmp_path, chunk_rows=10)
+    QdrantVectorStore(client=client, collection="restored")
+    # The embedded client doesn't keep optimizer settings, so track the threshold here
+    state = {"threshold": 500, "killed": False}
+
+    def update_collection(collection: str, optimizers_config: OptimizersConfigDiff) -> None:
+        if state["killed"]:
+            raise ConnectionError("the import process is gone")
+        state["threshold"] = optimizers_config.indexing_threshold
+
+    def get_collection(collection: str) -> SimpleNamespace:
+        optimizer_config = SimpleNamespace(indexing_threshold=state["threshold"])
+        return SimpleNamespace(config=SimpleNamespace(optimizer_config=optimizer_config))
+
+    monkeypatch.setattr(client, "update_collection", update_collection)
+    monkeypatch.setattr(client, "get_collection", get_collection)
+    upsert_chunk, calls = snapshot.upsert_chunk, []
+
+    def killed_on_second_chunk(*args: Any) -> int:
+        calls.append(args)
+        if len(calls) == 2:
+            # Like a SIGKILL: indexing is never resumed
+            state["killed"] = True
+            raise KeyboardInterrupt
+        return upsert_chunk(*args)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(snapshot, "upsert_chunk", killed_on_second_chunk)
+        with pytest.raises(ConnectionError):
+            import_collection(client, tmp_path, "restored", workers=1)
+    assert state["threshold"] == 0
+
+    state["killed"] = False
+    assert import_collection(client, tmp_path, "restored", workers=1) == 15
+    assert state["threshold"] == 500
@@ -0,0 +1,255 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+)
+
+import src.store.vector as vector
+from src.models import Paper, SearchFilter, author_key
+from src.store.vector import COLLECTION_NAME, QdrantVectorStore, point_id
+
+
+@pytest.fixture
+def store() -> QdrantVectorStore:
+    # Each test gets a fresh in-memory Qdrant, so forget collections seen by earlier tests
+    QdrantVectorStore._ensured.clear()
+    return QdrantVectorStore(client=QdrantClient(":memory:"))
+
+
+@pytest.fixture
+def papers() -> list[Paper]:
+    return [
+        Paper(
+            id=f"2401.0000{i}v1",
+            url=f"http://arxiv.org/abs/2401.0000{i}v1",
+            title=f"Title {i}",
+            abstract=f"Abstract {i}",
+            authors=[f"Author {i}", "Yann LeCun" if i % 2 else "Geoffrey Hinton"],
+            published=datetime(2020 + i, 1, 1, tzinfo=timezone.utc),
+            primary_category="cs.LG" if i < 2 else "cs.CL",
+        )
+        for i in range(4)
+    ]
+
+
+def test_index_and_search_roundtrip(store: QdrantVectorStore, papers: list[Paper]):
+    vectors = np.random.default_rng(0).random((len(papers), 384), dtype=np.float32)
+
+    assert store.index(papers, vectors) == []
+
+    results = store.search(vectors[2][np.newaxis, :], top_k=1)
+    assert results[0].id == papers[2].id
+    assert results[0].title == "Title 2"
+
+
+def test_index_reports_papers_that_fail_individually(papers: list[Paper]):
+    client = MagicMock()
+    bad = point_id(papers[1].id)
+
+    def upsert(collection_name, points):
+        if len(points) > 1 or points[0].id == bad:
+            raise RuntimeError("rejected")
+
+    client.upsert.side_effect = upsert
+    store = QdrantVectorStore(client=client)
+
+    failed = store.index(papers, np.zeros((len(papers), 384), dtype=np.float32))
+
+    assert failed == [papers[1].id]
+
+
+def test_index_raises_when_nothing_was_written(papers: list[Paper]):
+    client = MagicMock()
+    client.upsert.side_effect = RuntimeError("down")
+    store = QdrantVectorStore(client=client)
+
+    with pytest.raises(RuntimeError):
+        store.index(papers, np.zeros((len(papers), 384), dtype=np.float32))
+
+
+def test_qdrant_client_is_shared(monkeypatch: pytest.MonkeyPatch):
+    created = []
+    monkeypatch.setattr(vector, "_clients", {})
+    monkeypatch.setattr(
+        vector, "QdrantClient", lambda **kwargs: created.append(kwargs) or MagicMock()
+    )
+
+    first = vector.get_qdrant_client("qdrant", 6333)
+    assert vector.get_qdrant_client("qdrant", 6333) is first
+    assert vector.get_qdrant_client("other", 6333) is not first
+    assert len(created) == 2
+    assert created[0]["timeout"] == vector.QDRANT_TIMEOUT
+
+
+def test_ensure_collection_applies_hnsw_and_quantization(monkeypatch: pytest.MonkeyPatch):
+    QdrantVectorStore._ensured.clear()
+    monkeypatch.setattr(vector, "QDRANT_ON_DISK", True)
+    monkeypatch.setattr(vector, "QDRANT_QUANTIZATION", "scalar")
+    client = MagicMock()
+    client.collection_exists.return_value = False
+
+    QdrantVectorStore(client=client)
+
+    kwargs = client.create_collection.call_args.kwargs
+    assert kwargs["vectors_config"].on_disk is True
+    assert kwargs["hnsw_config"].m == vector.QDRANT_HNSW_M
+    assert kwargs["quantization_config"].scalar.type == ScalarType.INT8
+    assert kwargs["quantization_config"].scalar.always_ram is True
+
+
+def test_search_params_per_call():
+    assert vector.search_params(kind="none") is None
+    assert vector.search_params(hnsw_ef=128, kind="none").hnsw_ef == 128
+
+    params = vector.search_params(rescore=True, kind="binary")
+    assert params.quantization.rescore is True
+    assert params.quantization.oversampling == vector.QDRANT_OVERSAMPLING
+    assert vector.search_params(rescore=False, kind="binary").quantization.oversampling is None
+
+
+@pytest.mark.parametrize(
+    "config, kind",
+    [
+        (None, "none"),
+        (ScalarQuantization(scalar=ScalarQuantizationConfig(type=ScalarType.INT8)), "scalar"),
+        (BinaryQuantization(binary=BinaryQuantizationConfig()), "binary"),
+    ],
+)
+def test_search_params_follow_the_collection_quantization(
+    store: QdrantVectorStore,
+    papers: list[Paper],
+    monkeypatch: pytest.MonkeyPatch,
+    config: ScalarQuantization | BinaryQuantization | None,
+    kind: str,
+):
+    vectors = np.random.default_rng(0).random((len(papers), 384), dtype=np.float32)
+    store.index(papers, vectors)
+    # The collection was created under another setting than the current one
+    monkeypatch.setattr(vector, "QDRANT_QUANTIZATION", "binary" if kind == "none" else "none")
+    collection = store.client.get_collection(store.resolve())
+    collection.config.quantization_config = config
+    monkeypatch.setattr(store.client, "get_collection", lambda name: collection)
+    query_points = MagicMock(wraps=store.client.query_points)
+    query_batch_points = MagicMock(wraps=store.client.query_batch_points)
+    monkeypatch.setattr(store.client, "query_points", query_points)
+    monkeypatch.setattr(store.client, "query_batch_points", query_batch_points)
+
+    store.search(vectors[0], top_k=1, rescore=True)
+    store.search_many(vectors[[0]], top_k=1, rescore=True)
+
+    assert store.quantization == kind
+    params = query_points.call_args.kwargs["search_params"]
+    batch_params = query_batch_points.call_args.kwargs["requests"][0].params
+    if kind == "none":
+        assert params is None and batch_params is None
+    else:
+        assert params.quantization.oversampling == vector.QDRANT_OVERSAMPLING
+        assert batch_params == params
+
+
+def test_search_accepts_hnsw_ef_and_rescore(store: QdrantVectorStore, papers: list[Paper]):
+    vectors = np.random.default_rng(0).random((len(papers), 384), dtype=np.float32)
+    store.index(papers, vectors)
+
+    results = store.search(vectors[3][np.newaxis, :], top_k=1, hnsw_ef=256, rescore=True)
+
+    assert results[0].id == papers[3].id
+
+
+def test_search_many_uses_one_batched_request(store: QdrantVectorStore, papers: list[Paper]):
+    vectors = np.random.default_rng(0).random((len(papers), 384), dtype=np.float32)
+    store.index(papers, vectors)
+    store.client.query_points = MagicMock(side_effect=AssertionError("one request per query"))
+
+    results = store.search_many(vectors[[2, 0]], top_k=1)
+
+    assert [r[0].id for r in results] == [papers[2].id, papers[0].id]
+    assert store.search_many(np.empty((0, 384), dtype=np.float32)) == []
+
+
+def test_author_key_matches_spelling_variants():
+    assert author_key("Yann LeCun") == "lecun_y"
+    assert author_key("Y. LeCun") == "lecun_y"
+    assert author_key("LeCun, Yann") == "lecun_y"
+    assert author_key("José García Jr.") == "garcia_j"
+    assert author_key("Plato") == "plato"
+
+
+def test_ensure_collection_creates_missing_payload_indexes():
+    QdrantVectorStore._ensured.clear()
+    client = MagicMock()
+    client.get_collection.return_value.payload_schema = {"published": MagicMock()}
+
+    QdrantVectorStore(client=client)
+
+    created = {
+        c.args[1]: c.kwargs["field_schema"] for c in client.create_payload_index.call_args_list
+    }
+    assert created == {k: v for k, v in vector.PAYLOAD_INDEXES.items() if k != "published"}
+
+
+def test_index_stores_filterable_payload(store: QdrantVectorStore, papers: list[Paper]):
+    store.index(papers, np.random.default_rng(0).random((len(papers), 384), dtype=np.float32))
+
+    payload = store.client.retrieve(COLLECTION_NAME, [point_id(papers[1].id)])[0].payload
+    assert payload["published"] == "2021-01-01T00:00:00+00:00"
+    assert payload["primary_category"] == "cs.LG"
+    assert payload["author_keys"] == ["author", "lecun_y"]
+
+
+@pytest.mark.parametrize(
+    "search_filter, expected",
+    [
+        (SearchFilter(categories=["cs.CL"]), [2, 3]),
+        (SearchFilter(published_from=datetime(2021, 6, 1, tzinfo=timezone.utc)), [2, 3]),
+        (SearchFilter(published_to=datetime(2021, 6, 1, tzinfo=timezone.utc)), [0, 1]),
+        (SearchFilter(authors=["LeCun, Y."]), [1, 3]),
+        (SearchFilter(authors=["Y. LeCun"], categories=["cs.LG"]), [1]),
+    ],
+)
+def test_search_applies_filter(
+    store: QdrantVectorStore, papers: list[Paper], search_filter: SearchFilter, expected: list[int]
+):
+    vectors = np.random.default_rng(0).random((len(papers), 384), dtype=np.float32)
+    store.index(papers, vectors)
+
+    results = store.search(vectors[0], top_k=4, search_filter=search_filter)
+    batched = store.search_many(vectors[[0]], top_k=4, search_filter=search_filter)
+
+    assert sorted(r.id for r in results) == [papers[i].id for i in expected]
+    assert [r.id for r in batched[0]] == [r.id for r in results]
+
+
+def test_iter_vectors_scrolls_every_point(store: QdrantVectorStore, papers: list[Paper]):
+    vectors = np.random.default_rng(0).random((len(papers), 384), dtype=np.float32)
+    store.index(papers, vectors)
+
+    pages = list(store.iter_vectors(batch_size=3))
+
+    assert [len(ids) for ids, _ in pages] == [3, 1]
+    scrolled = dict(
+        zip([i for ids, _ in pages for i in ids], np.concatenate([v for _, v in pages]))
+    )
+    assert scrolled.keys() == {p.id for p in papers}
+    # Cosine collections store normalized vectors
+    expected = vectors[1] / np.linalg.norm(vectors[1])
+    assert np.allclose(scrolled[papers[1].id], expected, atol=1e-6)
+
+
+def test_collections_are_ensured_per_server():
+    QdrantVectorStore._ensured.clear()
+    first, second = QdrantClient(":memory:"), QdrantClient(":memory:")
+
+    QdrantVectorStore(client=first)
+    QdrantVectorStore(client=second)
+
+    assert second.get_aliases().aliases == first.get_aliases().aliases != []
+    assert vector.client_url(QdrantClient(host="qdrant", port=6333)) == "http://qdrant:6333"
@@ -1,10 +1,12 @@
+import threading
 from unittest.mock import MagicMock, call, patch
 
 import numpy as np
 import pytest
-from backend.src.worker import get_batch, process_batch
 
+from src.embedder import MODEL_NAME
 from src.models import Paper, PaperState, PaperStatus
+from src.worker import PipelinedWorker, process_batch, run_worker_once
 
 
 @pytest.fixture
@@ -23,32 +25,66 @@ def sample_paper():
     )
 
 
-def test_get_batch_valid_papers(mock_redis, sample_paper):
-    raw = sample_paper.model_dump_json()
-    mock_redis.lpop.side_effect = [raw, None]
-
-    batch = get_batch(mock_redis, max_items=5)
+@patch("src.worker.index_batch")
+@patch("src.worker.embed_papers")
+@patch("src.worker.get_redis_conn")
+@patch("src.worker.register_worker")
+@patch("src.worker.ack_batch")
+@patch("src.worker.claim_batch")
+def test_run_worker_once_acks_after_indexing(
+    mock_claim, mock_ack, mock_register, mock_get_conn, mock_embed, mock_index_batch, sample_paper
+):
+    raw_items = [sample_paper.model_dump_json()]
+    mock_claim.return_value = raw_items
+    mock_embed.return_value = np.zeros((1, 384), dtype=np.float32)
 
-    assert len(batch) == 1
-    assert batch[0].id == "paper-123"
-    mock_redis.lpop.assert_called()
+    assert run_worker_once() == 1
 
+    mock_register.assert_called_once()
+    mock_index_batch.assert_called_once()
+    assert mock_ack.call_args.args[1] == raw_items
 
-def test_get_batch_with_invalid_paper(mock_redis):
-    mock_redis.lpop.side_effect = ['{"bad": "data"}', None]
 
-    batch = get_batch(mock_redis, max_items=2)
+@pytest.mark.parametrize("failing", ["embed", "index"])
+@patch("src.worker.index_batch")
+@patch("src.worker.embed_papers")
+@patch("src.worker.get_redis_conn")
+@patch("src.worker.register_worker")
+@patch("src.worker.fail_batch")
+@patch("src.worker.ack_batch")
+@patch("src.worker.claim_batch")
+def test_run_worker_once_requeues_failed_batch(
+    mock_claim,
+    mock_ack,
+    mock_fail,
+    mock_register,
+    mock_get_conn,
+    mock_embed,
+    mock_index_batch,
+    sample_paper,
+    failing,
+):
+    raw_items = [sample_paper.model_dump_json()]
+    mock_claim.return_value = raw_items
+    mock_embed.return_value = np.zeros((1, 384), dtype=np.float32)
+    {"embed": mock_embed, "index": mock_index_batch}[failing].side_effect = RuntimeError("boom")
 
-    assert len(batch) == 0  # should skip invalid input
+    assert run_worker_once() == 0
+    mock_ack.assert_not_called()
+    assert mock_fail.call_args.args[1] == raw_items
 
 
-@patch("backend.src.worker.get_vector_store")
-@patch("backend.src.worker.get_paper_index")
-@patch("backend.src.worker.embed_papers")
-def test_process_batch_happy_path(mock_embed, mock_get_index, mock_get_store, sample_paper):
+@patch("src.worker.add_coauthor_edges")
+@patch("src.worker.get_vector_store")
+@patch("src.worker.get_paper_index")
+@patch("src.worker.embed_papers")
+def test_process_batch_happy_path(
+    mock_embed, mock_get_index, mock_get_store, mock_add_edges, sample_paper
+):
     mock_embed.return_value = np.random.rand(1, 384).astype(np.float32)
     mock_index = MagicMock()
-    mock_store = MagicMock()
+    mock_store = MagicMock(embedding_model=MODEL_NAME)
+    mock_store.index.return_value = []
     mock_get_store.return_value = mock_store
     mock_get_index.return_value = mock_index
 
@@ -56,15 +92,187 @@ def test_process_batch_happy_path(mock_embed, mock_get_index, mock_get_store, sa
 
     mock_embed.assert_called_once()
     mock_store.index.assert_called_once()
-    mock_index.set.assert_called_once_with(
-        PaperState(
-            id=sample_paper.id,
-            status=PaperStatus.EMBEDDED,
-            in_graph=False,
-        )
+    mock_add_edges.assert_called_once_with([sample_paper])
+    mock_index.set_many.assert_called_once_with(
+        [
+            PaperState(
+                id=sample_paper.id,
+                status=PaperStatus.EMBEDDED,
+                in_graph=True,
+            )
+        ]
     )
 
 
+@patch("src.worker.add_coauthor_edges")
+@patch("src.worker.get_vector_store")
+@patch("src.worker.get_paper_index")
+@patch("src.worker.embed_papers")
+def test_process_batch_survives_graph_failure(
+    mock_embed, mock_get_index, mock_get_store, mock_add_edges, sample_paper
+):
+    mock_embed.return_value = np.random.rand(1, 384).astype(np.float32)
+    mock_store = MagicMock(embedding_model=MODEL_NAME)
+    mock_store.index.return_value = []
+    mock_get_store.return_value = mock_store
+    mock_add_edges.side_effect = OSError("disk full")
+
+    process_batch([sample_paper])
+
+    states = mock_get_index.return_value.set_many.call_args.args[0]
+    assert [(s.status, s.in_graph) for s in states] == [(PaperStatus.EMBEDDED, False)]
+
+
+@patch("src.worker.add_coauthor_edges")
+@patch("src.worker.get_vector_store")
+@patch("src.worker.get_paper_index")
+@patch("src.worker.embed_papers")
+def test_process_batch_single_bulk_write(
+    mock_embed, mock_get_index, mock_get_store, mock_add_edges
+):
+    papers = [
+        Paper(id=f"p{i}", title="T", abstract="A", authors=["X"], url=f"http://x/{i}")
+        for i in range(8)
+    ]
+    mock_embed.return_value = np.random.rand(8, 384).astype(np.float32)
+    mock_store = MagicMock(embedding_model=MODEL_NAME)
+    mock_store.index.return_value = ["p3"]
+    mock_get_store.return_value = mock_store
+    mock_index = MagicMock()
+    mock_get_index.return_value = mock_index
+
+    process_batch(papers)
+
+    mock_store.index.assert_called_once()
+    assert mock_store.index.call_args.args[1].shape == (8, 384)
+    mock_index.set.assert_not_called()
+    states = mock_index.set_many.call_args.args[0]
+    assert [s.status for s in states].count(PaperStatus.ERROR) == 1
+    assert next(s for s in states if s.status == PaperStatus.ERROR).id == "p3"
+    # Only embedded papers join the graph
+    assert [p.id for p in mock_add_edges.call_args.args[0]] == [
+        p.id for p in papers if p.id != "p3"
+    ]
+    assert [s.id for s in states if s.in_graph] == [p.id for p in papers if p.id != "p3"]
+
+
 def test_process_batch_empty():
     # Should do nothing and not crash
     assert process_batch([]) is None
+
+
+@patch("src.worker.register_worker")
+@patch("src.worker.ack_batch")
+@patch("src.worker.index_batch")
+@patch("src.worker.embed_papers")
+@patch("src.worker.claim_batch")
+def test_pipelined_worker_drains_in_flight_batches(
+    mock_claim, mock_embed, mock_index_batch, mock_ack, mock_register, mock_redis, sample_paper
+):
+    raw = sample_paper.model_dump_json()
+    batches = [[raw], [raw, raw]]
+    worker = PipelinedWorker(mock_redis, queue_size=1)
+
+    def next_batch(redis_conn, max_items, worker_id):
+        if batches:
+            return batches.pop(0)
+        # Queue is exhausted: ask the worker to stop while batches are in flight
+        worker.stop()
+        return []
+
+    mock_claim.side_effect = next_batch
+    mock_embed.side_effect = lambda papers: np.zeros((len(papers), 384), dtype=np.float32)
+
+    worker.start()
+    worker.join(timeout=10)
+
+    assert not worker.is_alive()
+    indexed = [len(c.args[0]) for c in mock_index_batch.call_args_list]
+    assert indexed == [1, 2]
+    acked = [len(c.args[1]) for c in mock_ack.call_args_list]
+    assert acked == [1, 2]
+    stats = worker.snapshot()
+    for stage in PipelinedWorker.STAGES:
+        assert stats[stage]["batches"] == 2
+        assert stats[stage]["papers"] == 3
+
+
+@patch("src.worker.register_worker")
+@patch("src.worker.fail_batch")
+@patch("src.worker.ack_batch")
+@patch("src.worker.index_batch")
+@patch("src.worker.embed_papers")
+@patch("src.worker.claim_batch")
+def test_pipelined_worker_requeues_failed_embeddings(
+    mock_claim,
+    mock_embed,
+    mock_index_batch,
+    mock_ack,
+    mock_fail,
+    mock_register,
+    mock_redis,
+    sample_paper,
+):
+    raw = sample_paper.model_dump_json()
+    batches = [[raw], [raw]]
+    worker = PipelinedWorker(mock_redis)
+
+    def next_batch(redis_conn, max_items, worker_id):
+        if batches:
+            return batches.pop(0)
+        worker.stop()
+        return []
+
+    mock_claim.side_effect = next_batch
+    mock_embed.side_effect = [RuntimeError("boom"), np.zeros((1, 384), dtype=np.float32)]
+
+    worker.start()
+    worker.join(timeout=10)
+
+    # The failed batch is released for a retry rather than kept until restart
+    assert mock_index_batch.call_count == 1
+    assert mock_ack.call_count == 1
+    assert mock_fail.call_args.args[1] == [raw]
+    assert worker.snapshot()["embed"]["batches"] == 1
+
+
+@patch("src.worker.HEARTBEAT_INTERVAL", 0.01)
+@patch("src.worker.heartbeat")
+@patch("src.worker.register_worker")
+@patch("src.worker.ack_batch")
+@patch("src.worker.index_batch")
+@patch("src.worker.embed_papers")
+@patch("src.worker.claim_batch")
+def test_pipelined_worker_heartbeat_outlives_slow_batches(
+    mock_claim,
+    mock_embed,
+    mock_index_batch,
+    mock_ack,
+    mock_register,
+    mock_heartbeat,
+    mock_redis,
+    sample_paper,
+):
+    raw = sample_paper.model_dump_json()
+    worker = PipelinedWorker(mock_redis)
+    beats = threading.Semaphore(0)
+    mock_heartbeat.side_effect = lambda redis_conn, worker_id: beats.release()
+
+    def next_batch(redis_conn, max_items, worker_id):
+        worker.stop()
+        return [raw]
+
+    def slow_embed(papers):
+        # No claim happens while the batch embeds, yet the heartbeat keeps beating
+        assert all(beats.acquire(timeout=5) for _ in range(3))
+        return np.zeros((len(papers), 384), dtype=np.float32)
+
+    mock_claim.side_effect = next_batch
+    mock_embed.side_effect = slow_embed
+
+    worker.start()
+    worker.join(timeout=10)
+
+    assert mock_claim.call_count == 1
+    assert mock_index_batch.call_count == 1
+    assert mock_heartbeat.call_args.args[1] == worker.worker